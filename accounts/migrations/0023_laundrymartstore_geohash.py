@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:23
+
+from django.db import migrations, models
+
+from common_utils.geo_index import encode_geohash
+
+
+def backfill_geohash(apps, schema_editor):
+    LaundrymartStore = apps.get_model('accounts', 'LaundrymartStore')
+    stores = LaundrymartStore.objects.filter(lat__isnull=False, lng__isnull=False).only('id', 'lat', 'lng')
+    for store in stores.iterator():
+        store.geohash = encode_geohash(store.lat, store.lng)
+        store.save(update_fields=['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_user_approved_by_admin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='laundrymartstore',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='laundrymartstore',
+            index=models.Index(fields=['lat', 'lng'], name='accounts_la_lat_0b120c_idx'),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
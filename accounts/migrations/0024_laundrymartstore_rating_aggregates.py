@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_laundrymartstore_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='laundrymartstore',
+            name='rating_average',
+            field=models.FloatField(db_index=True, default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='laundrymartstore',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='laundrymartstore',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:27
+
+import accounts.schedule
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0024_laundrymartstore_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='laundrymartstore',
+            name='timezone',
+            field=models.CharField(db_index=True, default='UTC', max_length=64, validators=[accounts.schedule.validate_timezone]),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+STORE_SEARCH_TABLE = 'accounts_store_search_fts'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    LaundrymartStore = apps.get_model('accounts', 'LaundrymartStore')
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {STORE_SEARCH_TABLE} "
+        f"USING fts5(laundrymart_name, location, tokenize='trigram')"
+    )
+    for store in LaundrymartStore.objects.only('id', 'laundrymart_name', 'location').iterator():
+        schema_editor.execute(
+            f"INSERT INTO {STORE_SEARCH_TABLE} (rowid, laundrymart_name, location) VALUES (%s, %s, %s)",
+            [store.id, store.laundrymart_name or '', store.location or '']
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {STORE_SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0025_laundrymartstore_timezone'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
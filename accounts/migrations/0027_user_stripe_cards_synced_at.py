@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0026_store_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='stripe_cards_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -4,8 +4,16 @@ import uuid
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.conf import settings
 from django.db.models import Avg, FloatField
 from django.utils import timezone
+from django.utils.functional import cached_property
+
+from accounts.schedule import (
+  closes_in_minutes_expression, compile_weekly_schedule, open_now_expression, store_local_now,
+  turnaround_minimum_expression, validate_timezone
+)
+from common_utils.geo_index import encode_geohash
 
 
 # Create your models here.
@@ -78,6 +86,8 @@ class User(AbstractUser):
 
   preference = models.CharField(max_length=50, blank=True, null=True, choices=PREFERENCE_CHOICES, default='Auto-assign another LaundryMart (fastest)')
   stripe_customer_id = models.CharField(max_length=200, blank=True, null=True)
+  # Set once the customer's cards have been copied into SavedPaymentMethod; webhooks keep them current after that
+  stripe_cards_synced_at = models.DateTimeField(blank=True, null=True)
 
   created_at=models.DateTimeField(auto_now_add=True)
   updated_at=models.DateTimeField(auto_now=True)
@@ -95,15 +105,10 @@ class User(AbstractUser):
     return f"store_{self.store_id}"
 
   def average_rating(self):
-
-    avg = self.received_reviews.aggregate(
-      avg_rating=Avg('rating', output_field=FloatField())
-    )['avg_rating']
-
-    if avg is None:
+    store = self.laundrymart_store
+    if store is None:
       return None
-
-    return round(avg, 2)
+    return store.average_rating()
 
   @property
   def get_turnaround_time(self):
@@ -215,6 +220,40 @@ class User(AbstractUser):
     verbose_name = 'User'
     verbose_name_plural = 'Users'
 
+class LaundrymartStoreQuerySet(models.QuerySet):
+  def timezones_in_use(self):
+    """Distinct store timezones (one WHEN branch each in the open/ETA expressions)."""
+    return list(
+      self.model._default_manager.order_by().values_list('timezone', flat=True).distinct()
+    )
+
+  def open_now(self, now=None):
+    """Stores open right now in their own timezone, evaluated in SQL."""
+    return self.annotate_open_now(now).filter(open_now=True)
+
+  def annotate_open_now(self, now=None, timezones=None):
+    """Adds an `open_now` boolean annotation usable for filtering and ordering."""
+    if timezones is None:
+      timezones = self.timezones_in_use()
+    return self.annotate(open_now=open_now_expression(timezones, now))
+
+  def annotate_closes_in(self, now=None, timezones=None):
+    """Adds `closes_in_minutes` (NULL for stores that are closed right now)."""
+    if timezones is None:
+      timezones = self.timezones_in_use()
+    return self.annotate(closes_in_minutes=closes_in_minutes_expression(timezones, now))
+
+  def annotate_turnaround_minimum(self, now=None, timezones=None):
+    """Adds `turnaround_minimum`: today's minimum turnaround (hours), today being the store's local weekday."""
+    if timezones is None:
+      timezones = self.timezones_in_use()
+    return self.annotate(turnaround_minimum=turnaround_minimum_expression(timezones, now))
+
+  def annotate_open_status(self, now=None):
+    """Both open_now and closes_in_minutes, sharing one timezone lookup."""
+    timezones = self.timezones_in_use()
+    return self.annotate_open_now(now, timezones).annotate_closes_in(now, timezones)
+
 class LaundrymartStore(models.Model):
   admin = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name='owned_stores')
   laundrymart_name = models.CharField(max_length=255, blank=False, null=False)
@@ -235,6 +274,12 @@ class LaundrymartStore(models.Model):
   secondary_lat = models.FloatField(blank=True, null=True)
   secondary_lng = models.FloatField(blank=True, null=True)
 
+  # IANA name; opening hours are wall-clock times in this zone
+  timezone = models.CharField(max_length=64, default=settings.TIME_ZONE, validators=[validate_timezone], db_index=True)
+
+  # Kept in sync with lat/lng on save, used for index-backed nearby lookups
+  geohash = models.CharField(max_length=12, blank=True, null=True, db_index=True, editable=False)
+
   minimum_order_weight = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
   daily_capacity_limit = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
 
@@ -290,106 +335,58 @@ class LaundrymartStore(models.Model):
   push_and_email_alerts = models.BooleanField(default=True)
   auto_accept_orders = models.BooleanField(default=False)
 
+  # Denormalized from customer.Review, maintained by customer.signals
+  rating_sum = models.PositiveIntegerField(default=0, editable=False)
+  rating_count = models.PositiveIntegerField(default=0, editable=False)
+  rating_average = models.FloatField(default=0.0, db_index=True, editable=False)
+
+  objects = LaundrymartStoreQuerySet.as_manager()
+
   def __str__(self):
     return self.laundrymart_name
 
   class Meta:
     verbose_name = 'LaundryMart Store'
     verbose_name_plural = 'LaundryMart Stores'
+    indexes = [
+      models.Index(fields=['lat', 'lng']),
+    ]
   def average_rating(self):
-
-    avg = self.received_reviews.aggregate(
-      avg_rating=Avg('rating', output_field=FloatField())
-    )['avg_rating']
-
-    if avg is None:
+    if not self.rating_count:
       return None
 
-    return round(avg, 2)
+    return round(self.rating_sum / self.rating_count, 2)
 
-  @property
-  def get_turnaround_time(self):
-    weekday = datetime.today().weekday()  # 0: Monday, ..., 6: Sunday
-    day_map = {
-      0: 'monday',
-      1: 'tuesday',
-      2: 'wednesday',
-      3: 'thursday',
-      4: 'friday',
-      5: 'saturday',
-      6: 'sunday',
-    }
-    day_name = day_map[weekday]
+  @cached_property
+  def weekly_schedule(self):
+    # Dropped on save()/refresh_from_db() so edits are picked up
+    return compile_weekly_schedule(self)
 
-    min_field = f'turnaround_time_minimum_{day_name}'
-    max_field = f'turnaround_time_maximum_{day_name}'
+  def local_now(self):
+    return store_local_now(self.timezone)
 
-    min_val = getattr(self, min_field)
-    max_val = getattr(self, max_field)
+  def _today(self):
+    return self.weekly_schedule[self.local_now().weekday()]
 
-    # If both are set, return formatted string
-    if min_val is not None and max_val is not None:
-      # Ensure proper formatting (e.g., 24.00 → 24, 24.50 → 24.5)
-      min_str = str(float(min_val)).rstrip('0').rstrip('.') if '.' in str(min_val) else str(min_val)
-      max_str = str(float(max_val)).rstrip('0').rstrip('.') if '.' in str(max_val) else str(max_val)
-      return f'{min_str}-{max_str}'
-    return None
+  @property
+  def get_turnaround_time(self):
+    return self._today().turnaround
 
   @property
   def is_open_now(self):
-    weekday = datetime.now().weekday()  # 0: Monday, ..., 6: Sunday
-    day_map = {
-      0: 'monday',
-      1: 'tuesday',
-      2: 'wednesday',
-      3: 'thursday',
-      4: 'friday',
-      5: 'saturday',
-      6: 'sunday',
-    }
-    day_name = day_map[weekday]
-
-    # Check if explicitly closed today
-    is_closed_field = f'is_closed_{day_name}'
-    if getattr(self, is_closed_field):
-      return False
-
-    # Get start and end times
-    start_field = f'operating_hours_start_{day_name}'
-    end_field = f'operating_hours_end_{day_name}'
-
-    start_time = getattr(self, start_field)
-    end_time = getattr(self, end_field)
-
-    if start_time is None or end_time is None:
-      return False
-
-    now_time = datetime.now().time()
-
-    return start_time <= now_time < end_time
+    now = self.local_now()
+    return self.weekly_schedule[now.weekday()].is_open_at(now.hour * 60 + now.minute)
 
   @property
   def closes_at(self):
-    weekday = datetime.now().weekday()
-    day_map = {
-      0: 'monday',
-      1: 'tuesday',
-      2: 'wednesday',
-      3: 'thursday',
-      4: 'friday',
-      5: 'saturday',
-      6: 'sunday',
-    }
-    day_name = day_map[weekday]
-
-    is_closed_field = f'is_closed_{day_name}'
-    if getattr(self, is_closed_field):
+    today = self._today()
+    if today.closed:
       return None
+    return today.close_time
 
-    end_field = f'operating_hours_end_{day_name}'
-    end_time = getattr(self, end_field)
-
-    return end_time
+  def refresh_from_db(self, *args, **kwargs):
+    self.__dict__.pop('weekly_schedule', None)
+    super().refresh_from_db(*args, **kwargs)
 
   def save(self, *args, **kwargs):
     # Validate first
@@ -398,6 +395,15 @@ class LaundrymartStore(models.Model):
     if not self.store_id:
       self.store_id = uuid.uuid4()
 
+    if self.lat is not None and self.lng is not None:
+      self.geohash = encode_geohash(self.lat, self.lng)
+    else:
+      self.geohash = None
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and ('lat' in update_fields or 'lng' in update_fields):
+      kwargs['update_fields'] = set(update_fields) | {'geohash'}
+
+    self.__dict__.pop('weekly_schedule', None)
     super().save(*args, **kwargs)
 
 class SecondaryLocation(models.Model):
@@ -0,0 +1,124 @@
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.core.exceptions import ValidationError
+from django.db.models import BooleanField, Case, DecimalField, F, IntegerField, Q, Value, When
+from django.db.models.functions import ExtractHour, ExtractMinute
+from django.utils import timezone
+
+# Index matches datetime.weekday(): 0 = Monday ... 6 = Sunday
+DAY_NAMES = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+
+class DaySchedule(NamedTuple):
+  open_minute: Optional[int]
+  close_minute: Optional[int]
+  close_time: Optional[object]
+  turnaround: Optional[str]
+  closed: bool
+
+  def is_open_at(self, minute: int) -> bool:
+    if self.closed or self.open_minute is None or self.close_minute is None:
+      return False
+    return self.open_minute <= minute < self.close_minute
+
+
+def _minute_of_day(value) -> Optional[int]:
+  if value is None:
+    return None
+  return value.hour * 60 + value.minute
+
+
+def _format_hours(value) -> str:
+  # Ensure proper formatting (e.g., 24.00 → 24, 24.50 → 24.5)
+  return str(float(value)).rstrip('0').rstrip('.') if '.' in str(value) else str(value)
+
+
+def compile_weekly_schedule(store) -> tuple[DaySchedule, ...]:
+  """
+  Packs the 42 per-day columns of a LaundrymartStore into 7 DaySchedule
+  entries, so hot properties do a tuple index instead of string-built getattr.
+  """
+  days = []
+  for day_name in DAY_NAMES:
+    min_val = getattr(store, f'turnaround_time_minimum_{day_name}')
+    max_val = getattr(store, f'turnaround_time_maximum_{day_name}')
+    turnaround = None
+    if min_val is not None and max_val is not None:
+      turnaround = f'{_format_hours(min_val)}-{_format_hours(max_val)}'
+
+    end_time = getattr(store, f'operating_hours_end_{day_name}')
+    days.append(DaySchedule(
+      open_minute=_minute_of_day(getattr(store, f'operating_hours_start_{day_name}')),
+      close_minute=_minute_of_day(end_time),
+      close_time=end_time,
+      turnaround=turnaround,
+      closed=bool(getattr(store, f'is_closed_{day_name}')),
+    ))
+  return tuple(days)
+
+
+def validate_timezone(value):
+  try:
+    ZoneInfo(value)
+  except (ZoneInfoNotFoundError, ValueError):
+    raise ValidationError(f'"{value}" is not a valid IANA timezone name.')
+
+
+def store_local_now(tz_name: str, now: Optional[datetime] = None) -> datetime:
+  """Current time (or `now`, if aware) converted to the store's wall clock."""
+  now = now or timezone.now()
+  if timezone.is_naive(now):
+    now = timezone.make_aware(now, timezone.get_default_timezone())
+  return now.astimezone(ZoneInfo(tz_name))
+
+
+def open_now_q(local_now: datetime) -> Q:
+  """
+  SQL condition for "open at this wall-clock time", using the weekday's
+  operating_hours_* / is_closed_* columns. local_now must already be in the
+  store's timezone.
+  """
+  day_name = DAY_NAMES[local_now.weekday()]
+  now_time = local_now.time().replace(tzinfo=None)
+  return Q(**{
+    f'is_closed_{day_name}': False,
+    f'operating_hours_start_{day_name}__lte': now_time,
+    f'operating_hours_end_{day_name}__gt': now_time,
+  })
+
+
+def open_now_expression(timezones: Iterable[str], now: Optional[datetime] = None) -> Case:
+  """
+  Boolean "open now" expression evaluated per row in each store's own
+  timezone: one WHEN branch per distinct timezone, each comparing against
+  that zone's local weekday and time.
+  """
+  whens = []
+  for tz_name in timezones:
+    local_now = store_local_now(tz_name, now)
+    whens.append(When(Q(timezone=tz_name) & open_now_q(local_now), then=Value(True)))
+  return Case(*whens, default=Value(False), output_field=BooleanField())
+
+
+def closes_in_minutes_expression(timezones: Iterable[str], now: Optional[datetime] = None) -> Case:
+  """Minutes until closing for stores open now (NULL when closed)."""
+  whens = []
+  for tz_name in timezones:
+    local_now = store_local_now(tz_name, now)
+    end_field = f'operating_hours_end_{DAY_NAMES[local_now.weekday()]}'
+    whens.append(When(
+      Q(timezone=tz_name) & open_now_q(local_now),
+      then=ExtractHour(end_field) * 60 + ExtractMinute(end_field) - Value(local_now.hour * 60 + local_now.minute),
+    ))
+  return Case(*whens, default=Value(None), output_field=IntegerField())
+
+
+def turnaround_minimum_expression(timezones: Iterable[str], now: Optional[datetime] = None) -> Case:
+  """Today's turnaround_time_minimum_* (hours) per row, "today" being the store's local weekday."""
+  whens = []
+  for tz_name in timezones:
+    day_name = DAY_NAMES[store_local_now(tz_name, now).weekday()]
+    whens.append(When(Q(timezone=tz_name), then=F(f'turnaround_time_minimum_{day_name}')))
+  return Case(*whens, default=Value(None), output_field=DecimalField(max_digits=10, decimal_places=2))
@@ -0,0 +1,137 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+
+STORE_SEARCH_TABLE = 'accounts_store_search_fts'
+FUZZY_MATCH_LIMIT = 50
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_words(term):
+  return [word.lower() for word in _WORD_RE.findall(term or '')]
+
+
+def _trigrams(word):
+  return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+class BaseStoreSearchBackend:
+  """
+  Keeps a search index of LaundrymartStore name/location and narrows
+  querysets by a free-text term. Backends are picked with the
+  STORE_SEARCH_BACKEND setting (dotted path).
+  """
+
+  def index_store(self, store):
+    pass
+
+  def remove_store(self, store_id):
+    pass
+
+  def filter_queryset(self, queryset, term):
+    raise NotImplementedError
+
+
+class DatabaseLikeSearchBackend(BaseStoreSearchBackend):
+  """No index: every word must appear in the name or location (icontains)."""
+
+  def filter_queryset(self, queryset, term):
+    for word in search_words(term):
+      queryset = queryset.filter(Q(laundrymart_name__icontains=word) | Q(location__icontains=word))
+    return queryset
+
+
+class SQLiteFTS5SearchBackend(BaseStoreSearchBackend):
+  """
+  SQLite FTS5 table with the trigram tokenizer (rowid = store id).
+
+  Words of 3+ characters are matched as substrings, so prefixes work. If no
+  store in the queryset matches every word, the query falls back to stores
+  sharing at least one trigram with every word, which absorbs most typos;
+  the best FUZZY_MATCH_LIMIT of those by bm25 are kept. Both steps only look
+  at stores already in the queryset (e.g. within the search radius).
+  """
+
+  def index_store(self, store):
+    with connection.cursor() as cursor:
+      cursor.execute(f'DELETE FROM {STORE_SEARCH_TABLE} WHERE rowid = %s', [store.pk])
+      cursor.execute(
+        f'INSERT INTO {STORE_SEARCH_TABLE} (rowid, laundrymart_name, location) VALUES (%s, %s, %s)',
+        [store.pk, store.laundrymart_name or '', store.location or '']
+      )
+
+  def remove_store(self, store_id):
+    with connection.cursor() as cursor:
+      cursor.execute(f'DELETE FROM {STORE_SEARCH_TABLE} WHERE rowid = %s', [store_id])
+
+  def _strict_query(self, words):
+    # Quoted so user input can't inject FTS5 operators
+    return ' AND '.join(f'"{word}"' for word in words)
+
+  def _fuzzy_query(self, words):
+    # Every word has to share a trigram with the store, so one unknown word ("zzz laundry") matches nothing
+    groups = []
+    for word in words:
+      groups.append('(' + ' OR '.join(f'"{gram}"' for gram in sorted(_trigrams(word))) + ')')
+    return ' AND '.join(groups)
+
+  def filter_queryset(self, queryset, term):
+    words = search_words(term)
+    if not words:
+      return queryset
+
+    # The trigram tokenizer can't match words shorter than 3 characters
+    short_words = [word for word in words if len(word) < 3]
+    words = [word for word in words if len(word) >= 3]
+    if short_words:
+      queryset = DatabaseLikeSearchBackend().filter_queryset(queryset, ' '.join(short_words))
+    if not words:
+      return queryset
+
+    subquery = f'SELECT rowid FROM {STORE_SEARCH_TABLE} WHERE {STORE_SEARCH_TABLE} MATCH %s'
+    strict = queryset.filter(id__in=RawSQL(subquery, [self._strict_query(words)]))
+    if strict.exists():
+      return strict
+
+    # Restricted to the queryset's ids before ranking, so the limit doesn't cut off nearby stores
+    candidates_sql, candidates_params = queryset.order_by().values('id').query.sql_with_params()
+    fuzzy = (
+      f'{subquery} AND rowid IN ({candidates_sql}) '
+      f'ORDER BY rank LIMIT {FUZZY_MATCH_LIMIT}'
+    )
+    return queryset.filter(id__in=RawSQL(fuzzy, [self._fuzzy_query(words), *candidates_params]))
+
+
+def get_store_search_backend():
+  backend_path = getattr(settings, 'STORE_SEARCH_BACKEND', None)
+  if backend_path:
+    return import_string(backend_path)()
+  if connection.vendor == 'sqlite':
+    return SQLiteFTS5SearchBackend()
+  return DatabaseLikeSearchBackend()
+
+
+class StoreSearchFilter(BaseFilterBackend):
+  """Drop-in for DRF SearchFilter on the `search` param, backed by the store search index."""
+  search_param = 'search'
+
+  def filter_queryset(self, request, queryset, view):
+    term = request.query_params.get(self.search_param, '').strip()
+    if not term:
+      return queryset
+    return get_store_search_backend().filter_queryset(queryset, term)
+
+  def get_schema_operation_parameters(self, view):
+    return [{
+      'name': self.search_param,
+      'required': False,
+      'in': 'query',
+      'description': 'Search vendors by name or location (prefix and typo tolerant)',
+      'schema': {'type': 'string'},
+    }]
@@ -1,4 +1,5 @@
 from datetime import timedelta
+from zoneinfo import available_timezones
 
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
@@ -210,7 +211,7 @@ class VendorProfileSerializer(serializers.ModelSerializer):
     fields = [
               'id', 'laundrymart_name', 'store_id', 'image', 'laundrymart_logo', 'location', 'lat', 'lng',
               'vendor_description', 'price_per_pound', 'service_fee', 'minimum_order_weight', 'store_id',
-              'daily_capacity_limit', 'vendor_services',
+              'daily_capacity_limit', 'vendor_services', 'timezone',
 
               'turnaround_time_minimum_sunday', 'turnaround_time_maximum_sunday',
               'turnaround_time_minimum_monday', 'turnaround_time_maximum_monday',
@@ -229,6 +230,13 @@ class VendorProfileSerializer(serializers.ModelSerializer):
               'operating_hours_start_saturday', 'operating_hours_end_saturday', 'is_closed_saturday'
               ]
     read_only_fields = ('is_verified', 'store_id')
+
+  def validate_timezone(self, value):
+    # IANA names only; open-now and ETA are evaluated in this zone
+    if value not in available_timezones():
+      raise serializers.ValidationError(f'"{value}" is not a valid IANA timezone name.')
+    return value
+
   def update(self, instance, validated_data):
     request = self.context['request']
 
@@ -1,8 +1,14 @@
-from django.db.models.signals import post_save, pre_save, pre_delete
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete
 from django.dispatch import receiver
-from .models import User
+from .models import LaundrymartStore, User
+from .search import get_store_search_backend
 
 
+@receiver(post_save, sender=LaundrymartStore)
+def index_store_for_search(sender, instance, **kwargs):
+  get_store_search_backend().index_store(instance)
 
-        
-    
\ No newline at end of file
+
+@receiver(post_delete, sender=LaundrymartStore)
+def remove_store_from_search(sender, instance, **kwargs):
+  get_store_search_backend().remove_store(instance.pk)
@@ -1,3 +1,73 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import LaundrymartStore, User
+from accounts.search import SQLiteFTS5SearchBackend
 
 # Create your tests here.
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VendorProfileTimezoneTests(TestCase):
+  def setUp(self):
+    self.store = LaundrymartStore.objects.create(laundrymart_name='Tz Laundry', lat=40.7128, lng=-74.0060)
+    self.vendor = User.objects.create_user(email='tz-vendor@example.com', password=None, is_active=True)
+    self.vendor.is_staff = True
+    self.vendor.laundrymart_store = self.store
+    self.vendor.save()
+    self.client = APIClient()
+    self.client.force_authenticate(self.vendor)
+
+  def test_vendor_can_set_store_timezone(self):
+    response = self.client.patch(reverse('vendor_profile'), {'timezone': 'America/Chicago'})
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.data['timezone'], 'America/Chicago')
+    self.store.refresh_from_db()
+    self.assertEqual(self.store.timezone, 'America/Chicago')
+
+  def test_unknown_timezone_is_rejected(self):
+    response = self.client.patch(reverse('vendor_profile'), {'timezone': 'Mars/Olympus_Mons'})
+    self.assertEqual(response.status_code, 400)
+    self.store.refresh_from_db()
+    self.assertNotEqual(self.store.timezone, 'Mars/Olympus_Mons')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StoreSearchTests(TestCase):
+  def setUp(self):
+    self.backend = SQLiteFTS5SearchBackend()
+    # "Nearby" is lat < 41 in these tests
+    for name, lat in (('Bubbles Laundry', 40.71), ('Wash 24 Hours', 40.72), ('Clean Corner', 40.73),
+                      ('Bubbels Laundromat', 40.74), ('Bubbless Suds', 42.0)):
+      LaundrymartStore.objects.create(laundrymart_name=name, lat=lat, lng=-74.0)
+    self.nearby = LaundrymartStore.objects.filter(lat__lt=41)
+
+  def search(self, term, queryset=None):
+    queryset = LaundrymartStore.objects.all() if queryset is None else queryset
+    return sorted(self.backend.filter_queryset(queryset, term).values_list('laundrymart_name', flat=True))
+
+  def test_strict_match_on_every_word(self):
+    self.assertEqual(self.search('bubbles laun'), ['Bubbles Laundry'])
+
+  def test_typo_falls_back_to_fuzzy(self):
+    self.assertEqual(self.search('clen corner'), ['Clean Corner'])
+
+  def test_short_words_use_icontains(self):
+    self.assertEqual(self.search('24 wash'), ['Wash 24 Hours'])
+
+  def test_unknown_word_matches_nothing(self):
+    self.assertEqual(self.search('zzz laundry'), [])
+
+  def test_strict_match_outside_the_queryset_still_falls_back(self):
+    # Only the far-away store matches "bubbless" exactly; nearby users get the fuzzy matches
+    self.assertEqual(self.search('bubbless'), ['Bubbless Suds'])
+    self.assertEqual(self.search('bubbless', self.nearby), ['Bubbels Laundromat', 'Bubbles Laundry'])
+
+  def test_fuzzy_limit_applies_after_the_queryset_filter(self):
+    far = LaundrymartStore.objects.filter(lat__gt=41)
+    with mock.patch('accounts.search.FUZZY_MATCH_LIMIT', 1):
+      self.assertEqual(self.search('bubbes', far), ['Bubbless Suds'])
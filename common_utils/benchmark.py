@@ -0,0 +1,57 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def isolated_database():
+  """
+  Runs the block against a freshly migrated throwaway test database (like
+  `manage.py test`), so benchmarks never touch real data.
+  """
+  setup_test_environment()
+  old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+  try:
+    yield
+  finally:
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+    teardown_test_environment()
+
+
+def measure(func, runs, warmup=1):
+  """
+  Calls func() `runs` times and returns latency percentiles (ms) and the
+  query count of the last call.
+  """
+  for _ in range(warmup):
+    func()
+
+  timings = []
+  queries = 0
+  for _ in range(runs):
+    with CaptureQueriesContext(connection) as ctx:
+      started = time.perf_counter()
+      func()
+      timings.append((time.perf_counter() - started) * 1000)
+    queries = len(ctx.captured_queries)
+
+  timings.sort()
+  return {
+    'runs': runs,
+    'queries': queries,
+    'mean_ms': statistics.fmean(timings),
+    'p50_ms': timings[len(timings) // 2],
+    'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    'max_ms': timings[-1],
+  }
+
+
+def format_result(label, result):
+  return (
+    f"{label}: {result['queries']} queries | mean {result['mean_ms']:.1f}ms | "
+    f"p50 {result['p50_ms']:.1f}ms | p95 {result['p95_ms']:.1f}ms | max {result['max_ms']:.1f}ms "
+    f"({result['runs']} runs)"
+  )
@@ -1,11 +1,17 @@
-from math import radians, sin, cos, sqrt, atan2
-from typing import Optional
+from math import radians, sin, cos, sqrt, asin, atan2
+from typing import Optional, Sequence
 
 from django.db.models import ExpressionWrapper, FloatField
 from django.db.models.expressions import RawSQL
 from django.db.models.functions import ACos, Cos, Radians, Sin
 
+try:
+  import numpy as np
+except ImportError:  # numpy is optional, batch helpers fall back to pure Python
+  np = None
+
 EARTH_RADIUS_MILES = 3959.0
+EARTH_RADIUS_KM = 6371.0
 def calculate_distance_km(
     lat1: Optional[float],
     lng1: Optional[float],
@@ -121,4 +127,106 @@ def calculate_distance_sql(user_lat, user_lng):
     """,
     (EARTH_RADIUS_MILES, user_lat, user_lng, user_lat),
     output_field=FloatField()
-  )
\ No newline at end of file
+  )
+
+def _earth_radius(unit: str) -> float:
+  if unit == 'miles':
+    return EARTH_RADIUS_MILES
+  if unit == 'km':
+    return EARTH_RADIUS_KM
+  raise ValueError("unit must be 'miles' or 'km'")
+
+
+def _to_float(value) -> Optional[float]:
+  if value is None:
+    return None
+  try:
+    return float(value)
+  except (ValueError, TypeError):
+    return None
+
+
+def _haversine_python(lat1, lng1, lats, lngs, radius):
+  lat1_rad = radians(lat1)
+  lng1_rad = radians(lng1)
+  cos_lat1 = cos(lat1_rad)
+  out = []
+  for lat2, lng2 in zip(lats, lngs):
+    if lat2 is None or lng2 is None:
+      out.append(None)
+      continue
+    lat2_rad = radians(lat2)
+    a = sin((lat2_rad - lat1_rad) / 2) ** 2 + cos_lat1 * cos(lat2_rad) * sin((radians(lng2) - lng1_rad) / 2) ** 2
+    out.append(2 * radius * asin(min(1.0, sqrt(a))))
+  return out
+
+
+def _haversine_numpy(lat1, lng1, lats, lngs, radius):
+  lat2 = np.radians(np.array([v if v is not None else np.nan for v in lats], dtype=float))
+  lng2 = np.radians(np.array([v if v is not None else np.nan for v in lngs], dtype=float))
+  lat1_rad = np.radians(lat1)
+  a = np.sin((lat2 - lat1_rad) / 2) ** 2 + np.cos(lat1_rad) * np.cos(lat2) * np.sin((lng2 - np.radians(lng1)) / 2) ** 2
+  dist = 2 * radius * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+  return [None if np.isnan(d) else float(d) for d in dist]
+
+
+def calculate_distances(
+    origin_lat: Optional[float],
+    origin_lng: Optional[float],
+    lats: Sequence[Optional[float]],
+    lngs: Sequence[Optional[float]],
+    unit: str = 'miles',
+    precision: Optional[int] = 1,
+) -> list[Optional[float]]:
+  """
+  Distances from one origin to N points in a single vectorized pass.
+
+  Uses NumPy when installed, otherwise a pure-Python loop with the origin's
+  trig hoisted out. Missing/invalid coordinates give None in that slot, and a
+  missing origin gives all None, matching calculate_distance_km/miles.
+
+  Args:
+      origin_lat, origin_lng: Origin point (e.g. the customer)
+      lats, lngs: Equal-length sequences of point coordinates (e.g. stores)
+      unit: 'miles' or 'km'
+      precision: Decimal places to round to, or None to skip rounding
+  """
+  if len(lats) != len(lngs):
+    raise ValueError("lats and lngs must be the same length")
+
+  radius = _earth_radius(unit)
+  origin_lat = _to_float(origin_lat)
+  origin_lng = _to_float(origin_lng)
+  if origin_lat is None or origin_lng is None:
+    return [None] * len(lats)
+
+  lats = [_to_float(v) for v in lats]
+  lngs = [_to_float(v) for v in lngs]
+
+  if np is not None and lats:
+    distances = _haversine_numpy(origin_lat, origin_lng, lats, lngs, radius)
+  else:
+    distances = _haversine_python(origin_lat, origin_lng, lats, lngs, radius)
+
+  if precision is None:
+    return distances
+  return [round(d, precision) if d is not None else None for d in distances]
+
+
+def calculate_distance_matrix(
+    origins: Sequence[tuple[Optional[float], Optional[float]]],
+    destinations: Sequence[tuple[Optional[float], Optional[float]]],
+    unit: str = 'miles',
+    precision: Optional[int] = 1,
+) -> list[list[Optional[float]]]:
+  """
+  N x M distance matrix between (lat, lng) origins and destinations,
+  e.g. customers against stores for dispatch planning. Row i holds the
+  distances from origins[i] to every destination.
+  """
+  dest_lats = [lat for lat, _ in destinations]
+  dest_lngs = [lng for _, lng in destinations]
+  return [
+    calculate_distances(lat, lng, dest_lats, dest_lngs, unit=unit, precision=precision)
+    for lat, lng in origins
+  ]
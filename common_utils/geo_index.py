@@ -0,0 +1,143 @@
+from math import cos, radians
+from typing import Optional
+
+from django.db.models import Q
+
+from common_utils.distance_utils import EARTH_RADIUS_MILES
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # ~5m cells, plenty for store lookups
+MILES_PER_DEGREE_LAT = 69.0
+
+
+def encode_geohash(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+  """
+  Encode a coordinate into a geohash string.
+
+  Neighbouring points share a common prefix, so a prefix is a rectangular
+  grid cell that can be looked up with an index range scan.
+  """
+  lat_lo, lat_hi = -90.0, 90.0
+  lng_lo, lng_hi = -180.0, 180.0
+  chars = []
+  bits = 0
+  bit_count = 0
+  even = True  # geohash interleaves lng, lat, lng, ...
+
+  while len(chars) < precision:
+    if even:
+      mid = (lng_lo + lng_hi) / 2
+      if lng >= mid:
+        bits = (bits << 1) | 1
+        lng_lo = mid
+      else:
+        bits <<= 1
+        lng_hi = mid
+    else:
+      mid = (lat_lo + lat_hi) / 2
+      if lat >= mid:
+        bits = (bits << 1) | 1
+        lat_lo = mid
+      else:
+        bits <<= 1
+        lat_hi = mid
+    even = not even
+    bit_count += 1
+    if bit_count == 5:
+      chars.append(GEOHASH_BASE32[bits])
+      bits = 0
+      bit_count = 0
+
+  return ''.join(chars)
+
+
+def geohash_cell_size(precision: int) -> tuple[float, float]:
+  """Returns (lat_degrees, lng_degrees) spanned by one cell at this precision."""
+  total_bits = precision * 5
+  lng_bits = (total_bits + 1) // 2
+  lat_bits = total_bits // 2
+  return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def precision_for_radius(lat: float, radius_miles: float) -> int:
+  """
+  Finest precision whose cells are still at least radius_miles on each side,
+  so the 3x3 block around the origin cell always covers the search circle.
+  """
+  lng_miles_per_degree = max(MILES_PER_DEGREE_LAT * cos(radians(lat)), 0.01)
+  for precision in range(GEOHASH_PRECISION, 0, -1):
+    lat_deg, lng_deg = geohash_cell_size(precision)
+    if lat_deg * MILES_PER_DEGREE_LAT >= radius_miles and lng_deg * lng_miles_per_degree >= radius_miles:
+      return precision
+  return 1
+
+
+def geohash_cells_around(lat: float, lng: float, precision: int) -> list[str]:
+  """
+  The origin cell plus its 8 neighbours at the given precision.
+  Neighbours are found by re-encoding points offset by one cell width,
+  which also handles wrapping at the antimeridian.
+  """
+  lat_deg, lng_deg = geohash_cell_size(precision)
+  cells = []
+  for dlat in (-1, 0, 1):
+    for dlng in (-1, 0, 1):
+      cell_lat = min(max(lat + dlat * lat_deg, -90.0), 90.0)
+      cell_lng = ((lng + dlng * lng_deg + 180.0) % 360.0) - 180.0
+      cell = encode_geohash(cell_lat, cell_lng, precision)
+      if cell not in cells:
+        cells.append(cell)
+  return cells
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+  """Smallest string greater than every string starting with prefix."""
+  for i in range(len(prefix) - 1, -1, -1):
+    idx = GEOHASH_BASE32.index(prefix[i])
+    if idx < len(GEOHASH_BASE32) - 1:
+      return prefix[:i] + GEOHASH_BASE32[idx + 1]
+  return None
+
+
+def geohash_prefix_q(prefixes, field='geohash') -> Q:
+  """
+  OR of half-open ranges [prefix, next_prefix) on the geohash column.
+  Ranges (unlike LIKE 'abc%') use the b-tree index on every backend.
+  """
+  q = Q()
+  for prefix in prefixes:
+    upper = _prefix_upper_bound(prefix)
+    cond = Q(**{f'{field}__gte': prefix})
+    if upper is not None:
+      cond &= Q(**{f'{field}__lt': upper})
+    q |= cond
+  return q
+
+
+def bounding_box(lat: float, lng: float, radius_miles: float) -> tuple[float, float, float, float]:
+  """Returns (min_lat, max_lat, min_lng, max_lng) enclosing the search circle."""
+  lat_delta = radius_miles / MILES_PER_DEGREE_LAT
+  lng_miles_per_degree = MILES_PER_DEGREE_LAT * cos(radians(lat))
+  if lng_miles_per_degree < 0.01:
+    lng_delta = 180.0
+  else:
+    lng_delta = min(radius_miles / lng_miles_per_degree, 180.0)
+  return lat - lat_delta, lat + lat_delta, lng - lng_delta, lng + lng_delta
+
+
+def nearby_q(lat: float, lng: float, radius_miles: float) -> Q:
+  """
+  Cheap index-backed prefilter for stores within radius_miles of (lat, lng):
+  geohash cell ranges narrowed by a lat/lng bounding box. Callers still need
+  the exact distance (calculate_distance_sql) for the final cut and sort.
+  """
+  radius_miles = min(radius_miles, EARTH_RADIUS_MILES)
+  precision = precision_for_radius(lat, radius_miles)
+  q = geohash_prefix_q(geohash_cells_around(lat, lng, precision))
+
+  min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_miles)
+  q &= Q(lat__gte=min_lat, lat__lte=max_lat)
+  # Skip the lng box when it would wrap around the antimeridian
+  if min_lng >= -180.0 and max_lng <= 180.0:
+    q &= Q(lng__gte=min_lng, lng__lte=max_lng)
+  return q
@@ -0,0 +1,74 @@
+"""
+Lease/retry plumbing shared by the webhook inboxes (uber.UberWebhookEvent,
+payment.StripeWebhookEvent). An inbox model needs lease_expires_at,
+lease_token, attempts, processed_at, result and last_error columns.
+"""
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+def claim_batch(model, batch_size, lease_seconds):
+  """
+  Leases up to batch_size pending rows to the caller, oldest first.
+  The claim is a compare-and-set: one UPDATE stamps a fresh lease_token on
+  the candidate rows that are still unleased, and only rows carrying that
+  token are returned. Two workers never get the same row, even on backends
+  without SELECT ... FOR UPDATE (sqlite), where SKIP LOCKED is a no-op.
+  """
+  now = timezone.now()
+  unleased = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+  token = uuid.uuid4()
+  with transaction.atomic():
+    ids = list(
+      model.objects.select_for_update(skip_locked=True)
+      .filter(processed_at__isnull=True)
+      .filter(unleased)
+      .order_by('id')
+      .values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+      return []
+    claimed = model.objects.filter(id__in=ids, processed_at__isnull=True).filter(unleased).update(
+      lease_token=token,
+      lease_expires_at=now + timedelta(seconds=lease_seconds),
+      attempts=F('attempts') + 1,
+    )
+  if not claimed:
+    return []
+  return list(model.objects.filter(lease_token=token).order_by('id'))
+
+
+def mark_processed(model, ids, result, now=None):
+  if ids:
+    model.objects.filter(id__in=ids).update(
+      processed_at=now or timezone.now(), result=result, lease_expires_at=None, last_error=None,
+    )
+
+
+def retry_later(model, events, error, max_attempts, retry_delay_seconds):
+  """Backs the rows off for another attempt, or parks them as 'failed' once out of attempts."""
+  now = timezone.now()
+  by_outcome = defaultdict(list)
+  for event in events:
+    by_outcome[event.attempts >= max_attempts].append(event.id)
+
+  if by_outcome[True]:
+    print(f"Giving up on {model.__name__} rows {by_outcome[True]}: {error}")
+    model.objects.filter(id__in=by_outcome[True]).update(
+      processed_at=now, result='failed', lease_expires_at=None, last_error=error,
+    )
+  if by_outcome[False]:
+    attempts = max(event.attempts for event in events)
+    model.objects.filter(id__in=by_outcome[False]).update(
+      lease_expires_at=now + timedelta(seconds=retry_delay_seconds * attempts), last_error=error,
+    )
+
+
+def prune_processed(model, older_than):
+  deleted, _ = model.objects.filter(processed_at__lt=timezone.now() - older_than).delete()
+  return deleted
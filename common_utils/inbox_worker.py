@@ -0,0 +1,83 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+PRUNE_EVERY_SECONDS = 3600
+
+
+class InboxWorkerCommand(BaseCommand):
+  """
+  Base for the commands that drain a webhook inbox (see common_utils.inbox):
+  a few worker threads call process_batch until stopped (or until the inbox
+  is empty with --once), and processed rows are pruned once an hour.
+  Subclasses set the defaults, a label for output, and the two functions.
+  """
+  label = 'webhook events'
+  default_batch_size = 100
+  default_lease_seconds = 60
+  default_keep_days = 7
+
+  def process_batch(self, batch_size, lease_seconds):
+    raise NotImplementedError
+
+  def prune_processed_events(self, older_than):
+    raise NotImplementedError
+
+  def add_arguments(self, parser):
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=self.default_batch_size)
+    parser.add_argument('--lease-seconds', type=int, default=self.default_lease_seconds)
+    parser.add_argument('--poll-interval', type=float, default=0.5, help="Sleep when the inbox is empty")
+    parser.add_argument('--keep-days', type=int, default=self.default_keep_days, help="Delete processed events older than this")
+    parser.add_argument('--once', action='store_true', help="Exit once the inbox is empty")
+
+  def handle(self, *args, **options):
+    self.stop = threading.Event()
+    self.processed = 0
+    self.lock = threading.Lock()
+
+    threads = [
+      threading.Thread(target=self._work, args=(options,), daemon=True)
+      for _ in range(options['workers'])
+    ]
+    for thread in threads:
+      thread.start()
+
+    last_prune = 0
+    try:
+      while any(thread.is_alive() for thread in threads):
+        if not options['once'] and time.monotonic() - last_prune > PRUNE_EVERY_SECONDS:
+          deleted = self.prune_processed_events(timedelta(days=options['keep_days']))
+          if deleted:
+            self.stdout.write(f"Pruned {deleted} processed {self.label}")
+          last_prune = time.monotonic()
+        for thread in threads:
+          thread.join(timeout=1)
+    except KeyboardInterrupt:
+      self.stop.set()
+      for thread in threads:
+        thread.join()
+
+    self.stdout.write(self.style.SUCCESS(f"Processed {self.processed} {self.label}"))
+
+  def _work(self, options):
+    try:
+      while not self.stop.is_set():
+        close_old_connections()
+        try:
+          claimed = self.process_batch(options['batch_size'], options['lease_seconds'])
+        except Exception as e:
+          print(f"{self.label.capitalize()} batch failed: {str(e)}")
+          claimed = 0
+
+        with self.lock:
+          self.processed += claimed
+        if not claimed:
+          if options['once']:
+            return
+          self.stop.wait(options['poll_interval'])
+    finally:
+      connection.close()
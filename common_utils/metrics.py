@@ -0,0 +1,86 @@
+import threading
+from bisect import bisect_left
+
+# Upper bounds in milliseconds; the last bucket is open-ended
+DEFAULT_LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+  """
+  Thread-safe in-process latency histogram (Prometheus-style buckets).
+  Cheap enough to record on every call; percentiles are bucket estimates.
+  """
+
+  def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS_MS):
+    self.buckets = tuple(buckets)
+    self._lock = threading.Lock()
+    self.reset()
+
+  def reset(self):
+    with self._lock:
+      self.counts = [0] * (len(self.buckets) + 1)
+      self.count = 0
+      self.total_ms = 0.0
+      self.max_ms = 0.0
+
+  def observe(self, elapsed_ms):
+    with self._lock:
+      self.counts[bisect_left(self.buckets, elapsed_ms)] += 1
+      self.count += 1
+      self.total_ms += elapsed_ms
+      self.max_ms = max(self.max_ms, elapsed_ms)
+
+  def percentile(self, fraction):
+    """Upper bound of the bucket holding the given fraction of observations."""
+    with self._lock:
+      if not self.count:
+        return None
+      target = fraction * self.count
+      seen = 0
+      for bound, count in zip(self.buckets + (self.max_ms,), self.counts):
+        seen += count
+        if seen >= target:
+          return min(bound, self.max_ms)
+      return self.max_ms
+
+  def snapshot(self):
+    with self._lock:
+      buckets = {f'le_{bound}': count for bound, count in zip(self.buckets, self.counts)}
+      buckets['inf'] = self.counts[-1]
+      count, total_ms, max_ms = self.count, self.total_ms, self.max_ms
+    return {
+      'count': count,
+      'mean_ms': total_ms / count if count else None,
+      'p50_ms': self.percentile(0.5),
+      'p95_ms': self.percentile(0.95),
+      'p99_ms': self.percentile(0.99),
+      'max_ms': max_ms,
+      'buckets': buckets,
+    }
+
+
+class HistogramRegistry:
+  """Lazily created histograms keyed by name (e.g. one per endpoint)."""
+
+  def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS_MS):
+    self.buckets = buckets
+    self._lock = threading.Lock()
+    self._histograms = {}
+
+  def __getitem__(self, name):
+    with self._lock:
+      if name not in self._histograms:
+        self._histograms[name] = LatencyHistogram(self.buckets)
+      return self._histograms[name]
+
+  def observe(self, name, elapsed_ms):
+    self[name].observe(elapsed_ms)
+
+  def snapshot(self):
+    with self._lock:
+      histograms = dict(self._histograms)
+    return {name: histogram.snapshot() for name, histogram in sorted(histograms.items())}
+
+  def reset(self):
+    with self._lock:
+      self._histograms.clear()
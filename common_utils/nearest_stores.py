@@ -0,0 +1,71 @@
+from django.db.models import ExpressionWrapper, F, FloatField
+
+from common_utils.distance_utils import calculate_distance_sql
+from common_utils.geo_index import nearby_q
+
+# Rings searched in order; the last one is always clamped to max_radius_miles
+RING_RADII_MILES = (1, 2.5, 5, 10, 25, 50)
+ASSUMED_COURIER_MPH = 15.0
+
+RANKINGS = {
+  'distance': ['distance'],
+  'price': ['price_per_pound', 'distance'],
+  'rating': ['-rating', 'distance'],
+  'eta': ['eta_hours', 'distance'],
+}
+
+
+def _rank_queryset(queryset, lat, lng, radius, rank_by, k, now=None, timezones=None):
+  qs = queryset.filter(nearby_q(lat, lng, radius)).annotate(
+    distance=calculate_distance_sql(lat, lng)
+  ).filter(distance__lte=radius)
+
+  if rank_by == 'price':
+    qs = qs.filter(price_per_pound__isnull=False)
+  elif rank_by == 'rating':
+    qs = qs.annotate(rating=F('rating_average'))
+  elif rank_by == 'eta':
+    # Today's minimum turnaround (hours, on the store's local weekday) plus courier travel time
+    qs = qs.annotate_turnaround_minimum(now, timezones).filter(turnaround_minimum__isnull=False).annotate(
+      eta_hours=ExpressionWrapper(
+        F('turnaround_minimum') + F('distance') / ASSUMED_COURIER_MPH,
+        output_field=FloatField()
+      )
+    )
+
+  return list(qs.order_by(*RANKINGS[rank_by])[:k])
+
+
+def nearest_stores(lat, lng, k=1, max_radius_miles=10, rank_by='distance', expand=True, queryset=None, now=None):
+  """
+  Top-k LaundrymartStores around (lat, lng), ranked by distance, price,
+  rating or ETA.
+
+  With expand=True the search starts in a small ring and widens until a ring
+  holds k stores, so dense areas are answered from a handful of rows; ranking
+  then applies within that ring. With expand=False a single query covers the
+  whole max_radius_miles. Every query goes through the geohash/bbox prefilter
+  and is sorted and limited in SQL.
+
+  Each returned store carries a `distance` annotation in miles. ETA ranking
+  uses each store's schedule for its own local weekday at `now` (default: now).
+  """
+  from accounts.models import LaundrymartStore
+
+  if rank_by not in RANKINGS:
+    raise ValueError(f"rank_by must be one of {', '.join(RANKINGS)}")
+  if queryset is None:
+    queryset = LaundrymartStore.objects.all()
+  # One distinct-timezone lookup for all rings
+  timezones = queryset.timezones_in_use() if rank_by == 'eta' else None
+
+  if not expand:
+    return _rank_queryset(queryset, lat, lng, max_radius_miles, rank_by, k, now, timezones)
+
+  radii = [r for r in RING_RADII_MILES if r < max_radius_miles] + [max_radius_miles]
+  stores = []
+  for radius in radii:
+    stores = _rank_queryset(queryset, lat, lng, radius, rank_by, k, now, timezones)
+    if len(stores) >= k:
+      break
+  return stores
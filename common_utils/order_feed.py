@@ -0,0 +1,192 @@
+from decimal import Decimal
+
+import humanize
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from customer.models import OrderReport as CustomerOrderReport, OrderReportImage as CustomerOrderReportImage
+from customer.serializers import CustomerOrderReportSerializer
+from laundrymart.pagination import MergedFeedPagination, paginator_for_request
+from uber.serializers import ManifestItemSerializer
+from vendor.models import OrderReport as VendorOrderReport, OrderReportImage as VendorOrderReportImage
+from vendor.serializers import VendorOrderReportSerializer
+
+QUOTE = 'quote'
+ORDER = 'order'
+
+ACTIVE_ORDER_STATUSES = ['card_saved', 'picked_up', 'weighed', 'charged', 'return_scheduled']
+COMPLETED_ORDER_STATUSES = ['completed']
+
+# Reverse one-to-ones on both DeliveryQuote and Order
+REPORT_RELATIONS = {
+  'vendor_filed_report': (VendorOrderReport, VendorOrderReportImage, VendorOrderReportSerializer),
+  'customer_filed_report': (CustomerOrderReport, CustomerOrderReportImage, CustomerOrderReportSerializer),
+}
+
+# Columns the row templates read; everything else stays deferred
+QUOTE_FIELDS = (
+  'id', 'status', 'service_type', 'quote_id', 'customer_note', 'pickup_address', 'dropoff_address',
+  'fee', 'dropoff_eta', 'duration', 'expires', 'saved_at',
+)
+ORDER_FIELDS = (
+  'id', 'uuid', 'status', 'customer_note', 'pickup_address', 'dropoff_address',
+  'final_total_cents', 'delivery_fee_cents', 'created_at',
+)
+USER_FIELDS = ('id', 'full_name', 'email', 'phone_number')
+
+
+def cents_to_dollars(value):
+  return value / Decimal('100') if value else None
+
+
+def _related_fields(relation, model):
+  return [f'{relation}__{field.attname}' for field in model._meta.concrete_fields]
+
+
+def with_report_prefetch(queryset):
+  """
+  Joins both reverse one-to-one reports and prefetches their images, so
+  building a page of rows costs a fixed number of queries.
+  """
+  return queryset.select_related(*REPORT_RELATIONS).prefetch_related(*[
+    Prefetch(f'{relation}__images', queryset=image_model.objects.order_by('id'))
+    for relation, (_, image_model, _) in REPORT_RELATIONS.items()
+  ])
+
+
+def serialize_page_reports(page, request):
+  """
+  Serializes the vendor/customer reports for every row of a page in one pass.
+  Returns a list of (vendor_report_data, customer_report_data) aligned with `page`.
+  """
+  context = {'request': request}
+  columns = []
+  for relation, (_, _, serializer_class) in REPORT_RELATIONS.items():
+    # Cached by select_related, so hasattr costs no query even when the report is missing
+    reports = [getattr(row, relation) if hasattr(row, relation) else None for row in page]
+    data = iter(serializer_class([report for report in reports if report], many=True, context=context).data)
+    columns.append([next(data) if report else None for report in reports])
+  return list(zip(*columns))
+
+
+class TimeAgo:
+  """
+  humanize.naturaltime with a memo keyed on the unit it will print, so rows
+  created within the same minute/hour/day share one formatted string.
+  """
+
+  def __init__(self, now=None):
+    self.now = now or timezone.now()
+    self._memo = {}
+
+  @staticmethod
+  def bucket(delta):
+    # Mirrors naturaldelta's rounding so every delta in a bucket renders the same
+    future = delta.total_seconds() < 0
+    delta = abs(delta)
+    if delta.days:
+      return future, 'days', delta.days
+    if delta.seconds < 60:
+      return future, 'seconds', delta.seconds
+    if delta.seconds < 3600:
+      return future, 'minutes', round(delta.seconds / 60)
+    return future, 'hours', round(delta.seconds / 3600)
+
+  def __call__(self, timestamp):
+    delta = self.now - timestamp
+    key = self.bucket(delta)
+    if key not in self._memo:
+      self._memo[key] = humanize.naturaltime(delta)
+    return self._memo[key]
+
+
+class OrderFeed:
+  """
+  Shared engine behind the customer and vendor order lists. Subclasses
+  provide the base querysets and the quote/order row templates; the feed
+  projects the queries, batches reports, paginates and builds rows in one pass.
+
+  The 'all' filter merges pending quotes with active and completed orders,
+  newest first, through MergedFeedPagination.
+  """
+  completed_filter = 'completed'
+  quote_reports = True
+  order_reports = True
+
+  def __init__(self, request):
+    self.request = request
+    self.time_ago = TimeAgo()
+
+  @property
+  def filters(self):
+    return {
+      'pending': [(QUOTE, ['pending'])],
+      'active': [(ORDER, ACTIVE_ORDER_STATUSES)],
+      self.completed_filter: [(ORDER, COMPLETED_ORDER_STATUSES)],
+      'all': [(QUOTE, ['pending']), (ORDER, ACTIVE_ORDER_STATUSES + COMPLETED_ORDER_STATUSES)],
+    }
+
+  def get_quotes(self):
+    raise NotImplementedError
+
+  def get_orders(self):
+    raise NotImplementedError
+
+  def quote_row(self, quote, vendor_report, customer_report):
+    raise NotImplementedError
+
+  def order_row(self, order, vendor_report, customer_report):
+    raise NotImplementedError
+
+  def _project(self, queryset, fields, user_relation, with_reports):
+    fields = list(fields) + [f'{user_relation}__{name}' for name in USER_FIELDS]
+    queryset = queryset.select_related(user_relation).prefetch_related('manifest_items')
+    if with_reports:
+      for relation, (report_model, _, _) in REPORT_RELATIONS.items():
+        fields += _related_fields(relation, report_model)
+      queryset = with_report_prefetch(queryset)
+    return queryset.only(*fields)
+
+  def sources(self, filter_type):
+    sources = []
+    for kind, statuses in self.filters[filter_type]:
+      if kind == QUOTE:
+        queryset = self._project(self.get_quotes(), QUOTE_FIELDS, 'customer', self.quote_reports)
+        sources.append((QUOTE, queryset.filter(status__in=statuses), 'saved_at'))
+      else:
+        queryset = self._project(self.get_orders(), ORDER_FIELDS, 'user', self.order_reports)
+        sources.append((ORDER, queryset.filter(status__in=statuses), 'created_at'))
+    return sources
+
+  def paginate(self, filter_type, pagination_class):
+    """Returns (paginator, page); page is None if pagination failed."""
+    sources = self.sources(filter_type)
+    if len(sources) > 1:
+      paginator = MergedFeedPagination(pagination_class)
+      return paginator, paginator.paginate_sources(sources, self.request)
+
+    _, queryset, timestamp_field = sources[0]
+    paginator = paginator_for_request(self.request, pagination_class)
+    return paginator, paginator.paginate_queryset(queryset.order_by(f'-{timestamp_field}'), self.request)
+
+  def rows(self, page):
+    with_reports = [row for row in page if self._has_reports(row)]
+    reports = dict(zip(map(id, with_reports), serialize_page_reports(with_reports, self.request)))
+
+    results = []
+    for row in page:
+      vendor_report, customer_report = reports.get(id(row), (None, None))
+      if self._is_quote(row):
+        results.append(self.quote_row(row, vendor_report, customer_report))
+      else:
+        results.append(self.order_row(row, vendor_report, customer_report))
+    return results
+
+  def _is_quote(self, row):
+    return row._meta.model_name == 'deliveryquote'
+
+  def _has_reports(self, row):
+    return self.quote_reports if self._is_quote(row) else self.order_reports
+
+  def manifest_items(self, row):
+    return ManifestItemSerializer(row.manifest_items.all(), many=True).data
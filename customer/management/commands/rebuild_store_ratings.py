@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from accounts.models import LaundrymartStore
+from customer.models import Review
+
+
+class Command(BaseCommand):
+  help = "Recompute LaundrymartStore rating_sum/rating_count/rating_average from reviews"
+
+  def add_arguments(self, parser):
+    parser.add_argument('--batch-size', type=int, default=500)
+
+  def handle(self, *args, **options):
+    batch_size = options['batch_size']
+
+    totals = {
+      row['laundrymart_id']: (row['total'], row['count'])
+      for row in Review.objects.values('laundrymart_id').annotate(total=Sum('rating'), count=Count('id'))
+    }
+
+    updated = []
+    with transaction.atomic():
+      for store in LaundrymartStore.objects.only('id', 'rating_sum', 'rating_count', 'rating_average').iterator():
+        rating_sum, rating_count = totals.get(store.id, (0, 0))
+        store.rating_sum = rating_sum
+        store.rating_count = rating_count
+        store.rating_average = rating_sum / rating_count if rating_count else 0.0
+        updated.append(store)
+
+      LaundrymartStore.objects.bulk_update(
+        updated, ['rating_sum', 'rating_count', 'rating_average'], batch_size=batch_size
+      )
+
+    self.stdout.write(self.style.SUCCESS(f"Rebuilt ratings for {len(updated)} stores"))
@@ -17,13 +17,16 @@ class VendorLocation(serializers.ModelSerializer):
 
 class VendorSerializer(serializers.ModelSerializer):
   distance=serializers.SerializerMethodField()
+  average_rating=serializers.SerializerMethodField()
+  is_open_now=serializers.SerializerMethodField()
+  closes_in_minutes=serializers.SerializerMethodField()
   vendor_services = ServiceSerializer(many=True, read_only=True)
 
   class Meta:
     model = LaundrymartStore
     fields = ['id', 'laundrymart_name','store_id','image','laundrymart_logo', 'location','lat', 'lng', 'vendor_description',
               'distance','price_per_pound','average_rating','get_turnaround_time','is_open_now',
-              'closes_at', 'vendor_services',
+              'closes_at', 'closes_in_minutes', 'timezone', 'vendor_services',
 
               'operating_hours_start_sunday', 'operating_hours_end_sunday', 'is_closed_sunday',
               'operating_hours_start_monday', 'operating_hours_end_monday', 'is_closed_monday',
@@ -39,6 +42,23 @@ class VendorSerializer(serializers.ModelSerializer):
       return None
     return round(value, 1)
 
+  def get_average_rating(self, obj):
+    # Annotated by VendorAPIView; otherwise read the denormalized columns
+    annotated = obj.__dict__.get("average_rating")
+    if annotated is not None:
+      return annotated
+    return obj.average_rating()
+
+  def get_is_open_now(self, obj):
+    annotated = obj.__dict__.get("open_now")
+    if annotated is not None:
+      return annotated
+    return obj.is_open_now
+
+  def get_closes_in_minutes(self, obj):
+    # Only present when the queryset was annotated (VendorAPIView)
+    return getattr(obj, "closes_in_minutes", None)
+
 
   # def get_distance(self, obj):
   #   annotated_distance = getattr(obj, 'distance', None)
@@ -79,8 +99,8 @@ class CustomerOrderReportSerializer(serializers.ModelSerializer):
     if not request:
       raise ValidationError("Request context is missing, can't generate image URLs.")
 
-    # Fetch images related to the report
-    images = OrderReportImage.objects.filter(report=obj).values_list('image', flat=True)
+    # Fetch images related to the report (served from prefetch when the list views batch them)
+    images = [report_image.image.name for report_image in obj.images.all()]
 
     # Construct the full URL for each image using the request's host and scheme (HTTP/HTTPS)
     image_urls = [
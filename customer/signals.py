@@ -0,0 +1,68 @@
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import LaundrymartStore, Service
+from customer.models import Review
+from customer.vendor_cache import invalidate_vendor_list_cache
+
+
+def _apply_rating_delta(store_id, rating_delta, count_delta):
+  """
+  Single UPDATE adjusting the store's denormalized rating columns.
+  All right-hand sides see the pre-update row, so the average is computed
+  from the new sum/count in the same statement.
+  """
+  new_sum = F('rating_sum') + rating_delta
+  new_count = F('rating_count') + count_delta
+  LaundrymartStore.objects.filter(pk=store_id).update(
+    rating_sum=new_sum,
+    rating_count=new_count,
+    rating_average=Case(
+      When(rating_count__gt=-count_delta, then=Cast(new_sum, FloatField()) / new_count),
+      default=Value(0.0),
+      output_field=FloatField(),
+    ),
+  )
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+  # Edits (e.g. through the admin) need the stored rating/store to apply the difference
+  instance._previous_rating = None
+  if instance.pk:
+    instance._previous_rating = Review.objects.filter(pk=instance.pk).values_list('laundrymart_id', 'rating').first()
+
+
+@receiver(post_save, sender=Review)
+def add_review_to_store_rating(sender, instance, created, **kwargs):
+  previous = None if created else getattr(instance, '_previous_rating', None)
+  if previous is None:
+    _apply_rating_delta(instance.laundrymart_id, instance.rating, 1)
+  else:
+    old_store_id, old_rating = previous
+    if (old_store_id, old_rating) == (instance.laundrymart_id, instance.rating):
+      return
+    if old_store_id == instance.laundrymart_id:
+      _apply_rating_delta(instance.laundrymart_id, instance.rating - old_rating, 0)
+    else:
+      # Review moved to another store
+      _apply_rating_delta(old_store_id, -old_rating, -1)
+      _apply_rating_delta(instance.laundrymart_id, instance.rating, 1)
+  instance._previous_rating = (instance.laundrymart_id, instance.rating)
+  invalidate_vendor_list_cache()
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_store_rating(sender, instance, **kwargs):
+  _apply_rating_delta(instance.laundrymart_id, -instance.rating, -1)
+  invalidate_vendor_list_cache()
+
+
+@receiver(post_save, sender=LaundrymartStore)
+@receiver(post_delete, sender=LaundrymartStore)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_vendor_list_on_store_change(sender, **kwargs):
+  invalidate_vendor_list_cache()
@@ -1,3 +1,199 @@
-from django.test import TestCase
+import math
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import LaundrymartStore, Service, User
+from common_utils import distance_utils, geo_index
+from common_utils.nearest_stores import nearest_stores
+from customer.models import Review
 
 # Create your tests here.
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VendorListQueryCountTests(TestCase):
+  @classmethod
+  def setUpTestData(cls):
+    cls.customer = User.objects.create_user(
+      password='secret', email='customer@example.com', lat=23.80, lng=90.40, is_active=True
+    )
+    for i in range(12):
+      store = LaundrymartStore.objects.create(
+        laundrymart_name=f'Store {i}', lat=23.80 + i * 0.001, lng=90.40, price_per_pound='2.50'
+      )
+      Service.objects.create(vendor=store, service_name='Wash & Fold', price_per_pound='2.50')
+      Service.objects.create(vendor=store, service_name='Dry Clean', price_per_pound='4.00')
+
+  def setUp(self):
+    cache.clear()
+    self.client = APIClient()
+    self.client.force_authenticate(self.customer)
+
+  def _count_queries(self, page_size):
+    cache.clear()
+    with CaptureQueriesContext(connection) as ctx:
+      response = self.client.get('/customers/api/vendors', {'page_size': page_size})
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(len(response.data['results']), page_size)
+    return len(ctx.captured_queries)
+
+  def test_query_count_does_not_grow_with_page_size(self):
+    self.assertEqual(self._count_queries(2), self._count_queries(10))
+
+  def test_distance_and_radius_use_the_exact_point(self):
+    # ~0.99 miles north of the exact point, ~1.02 from the point snapped to the cache grid
+    LaundrymartStore.objects.create(laundrymart_name='Edge Store', lat=23.8148, lng=91.0)
+    response = self.client.get('/customers/api/vendors', {'lat': 23.8004, 'lng': 91.0, 'radius': 1})
+    self.assertEqual([vendor['laundrymart_name'] for vendor in response.data['results']], ['Edge Store'])
+
+  def test_fuzzy_search_within_the_radius(self):
+    response = self.client.get('/customers/api/vendors', {'search': 'stoer 11', 'radius': 1})
+    self.assertEqual([vendor['laundrymart_name'] for vendor in response.data['results']], ['Store 11'])
+
+  def test_non_finite_radius_is_rejected(self):
+    for radius in ('nan', 'inf', '-1'):
+      response = self.client.get('/customers/api/vendors', {'radius': radius})
+      self.assertEqual(response.status_code, 400, radius)
+
+  def test_services_and_rating_are_serialized(self):
+    response = self.client.get('/customers/api/vendors', {'page_size': 1})
+    vendor = response.data['results'][0]
+    self.assertEqual(len(vendor['vendor_services']), 2)
+    self.assertEqual(vendor['average_rating'], 0.0)
+    self.assertIn('is_open_now', vendor)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StoreRatingTests(TestCase):
+  def setUp(self):
+    self.customer = User.objects.create_user(password='secret', email='reviewer@example.com', is_active=True)
+    self.store = LaundrymartStore.objects.create(laundrymart_name='Rated Store', lat=23.80, lng=90.40)
+    self.other_store = LaundrymartStore.objects.create(laundrymart_name='Other Store', lat=23.81, lng=90.40)
+
+  def rating(self, store):
+    store.refresh_from_db()
+    return store.rating_sum, store.rating_count, store.rating_average
+
+  def test_new_reviews_are_added(self):
+    Review.objects.create(user=self.customer, laundrymart=self.store, rating=4)
+    Review.objects.create(user=self.customer, laundrymart=self.store, rating=2)
+    self.assertEqual(self.rating(self.store), (6, 2, 3.0))
+
+  def test_edited_rating_applies_the_difference(self):
+    review = Review.objects.create(user=self.customer, laundrymart=self.store, rating=5)
+    Review.objects.create(user=self.customer, laundrymart=self.store, rating=3)
+
+    review.rating = 1
+    review.save()
+    self.assertEqual(self.rating(self.store), (4, 2, 2.0))
+    # Saving again without a change (e.g. comment edit) leaves the totals alone
+    review.comment = 'Changed my mind'
+    review.save()
+    self.assertEqual(self.rating(self.store), (4, 2, 2.0))
+
+  def test_review_moved_to_another_store(self):
+    review = Review.objects.create(user=self.customer, laundrymart=self.store, rating=4)
+    review.laundrymart = self.other_store
+    review.rating = 5
+    review.save()
+    self.assertEqual(self.rating(self.store), (0, 0, 0.0))
+    self.assertEqual(self.rating(self.other_store), (5, 1, 5.0))
+
+
+class NearestStoresEtaTests(TestCase):
+  def test_eta_uses_each_stores_local_weekday(self):
+    # Monday 02:00 UTC is still Sunday evening in New York
+    now = datetime(2026, 3, 9, 2, 0, tzinfo=dt_timezone.utc)
+    LaundrymartStore.objects.create(
+      laundrymart_name='Local Sunday', lat=40.7128, lng=-74.0060, timezone='America/New_York',
+      turnaround_time_minimum_sunday=Decimal('48'), turnaround_time_minimum_monday=Decimal('2'),
+    )
+    LaundrymartStore.objects.create(
+      laundrymart_name='Local Monday', lat=40.7130, lng=-74.0062, timezone='UTC',
+      turnaround_time_minimum_sunday=Decimal('1'), turnaround_time_minimum_monday=Decimal('24'),
+    )
+
+    stores = nearest_stores(40.7128, -74.0060, k=2, rank_by='eta', now=now)
+    self.assertEqual([store.laundrymart_name for store in stores], ['Local Monday', 'Local Sunday'])
+    self.assertEqual([store.turnaround_minimum for store in stores], [Decimal('24'), Decimal('48')])
+
+
+class BatchDistanceTests(SimpleTestCase):
+  lats = [23.81, '23.95', None, 40.7128, -33.8688, 23.80]
+  lngs = [90.41, 90.30, 90.4, -74.0060, 151.2093, 90.40]
+
+  def test_matches_the_single_pair_helper(self):
+    distances = distance_utils.calculate_distances(23.80, 90.40, self.lats, self.lngs)
+    expected = [distance_utils.calculate_distance_miles(23.80, 90.40, lat, lng) for lat, lng in zip(self.lats, self.lngs)]
+    self.assertEqual(distances, expected)
+
+  @skipIf(distance_utils.np is None, "numpy not installed")
+  def test_numpy_and_pure_python_paths_agree(self):
+    origins = [(23.80, 90.40), (40.7, -74.0), (None, 90.4)]
+    destinations = list(zip(self.lats, self.lngs))
+    with_numpy = distance_utils.calculate_distance_matrix(origins, destinations, unit='km', precision=None)
+    with mock.patch.object(distance_utils, 'np', None):
+      pure_python = distance_utils.calculate_distance_matrix(origins, destinations, unit='km', precision=None)
+
+    for numpy_row, python_row in zip(with_numpy, pure_python):
+      self.assertEqual([d is None for d in numpy_row], [d is None for d in python_row])
+      for a, b in zip(numpy_row, python_row):
+        if a is not None:
+          self.assertAlmostEqual(a, b, places=6)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GeoIndexTests(TestCase):
+  def test_encode_geohash_known_values(self):
+    self.assertEqual(geo_index.encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+    self.assertEqual(geo_index.encode_geohash(42.6, -5.6, 5), 'ezs42')
+    # Points on a cell edge belong to the cell above/east of it
+    self.assertEqual(geo_index.encode_geohash(0.0, 0.0, 1), 's')
+    self.assertEqual(geo_index.encode_geohash(-0.000001, -0.000001, 1), '7')
+
+  def test_precision_for_radius_is_the_finest_covering_cell(self):
+    for lat in (0.0, 23.8, 60.0, 85.0):
+      for radius in (0.1, 1, 5, 25, 100):
+        precision = geo_index.precision_for_radius(lat, radius)
+        lat_deg, lng_deg = geo_index.geohash_cell_size(precision)
+        lng_miles = lng_deg * geo_index.MILES_PER_DEGREE_LAT * math.cos(math.radians(lat))
+        self.assertGreaterEqual(min(lat_deg * geo_index.MILES_PER_DEGREE_LAT, lng_miles), radius, (lat, radius))
+        if precision < geo_index.GEOHASH_PRECISION:
+          finer_lat, finer_lng = geo_index.geohash_cell_size(precision + 1)
+          finer_lng_miles = finer_lng * geo_index.MILES_PER_DEGREE_LAT * math.cos(math.radians(lat))
+          self.assertLess(min(finer_lat * geo_index.MILES_PER_DEGREE_LAT, finer_lng_miles), radius, (lat, radius))
+
+  def nearby(self, lat, lng, radius):
+    return set(LaundrymartStore.objects.filter(geo_index.nearby_q(lat, lng, radius))
+               .values_list('laundrymart_name', flat=True))
+
+  def test_nearby_q_reaches_across_cell_edges(self):
+    radius = 1
+    precision = geo_index.precision_for_radius(23.8, radius)
+    lat_deg, lng_deg = geo_index.geohash_cell_size(precision)
+    # The south-west corner of the cell holding (23.8, 90.4); the origin sits just outside it
+    edge_lat = -90 + lat_deg * math.floor((23.8 + 90) / lat_deg)
+    edge_lng = -180 + lng_deg * math.floor((90.4 + 180) / lng_deg)
+    origin = (edge_lat - 0.002, edge_lng - 0.002)
+    for name, lat, lng in (('north', edge_lat + 0.002, edge_lng - 0.002), ('east', edge_lat - 0.002, edge_lng + 0.002),
+                           ('diagonal', edge_lat + 0.002, edge_lng + 0.002), ('far', edge_lat + 0.05, edge_lng)):
+      LaundrymartStore.objects.create(laundrymart_name=name, lat=lat, lng=lng)
+    self.assertNotEqual(geo_index.encode_geohash(*origin, precision),
+                        geo_index.encode_geohash(edge_lat + 0.002, edge_lng + 0.002, precision))
+    self.assertEqual(self.nearby(*origin, radius), {'north', 'east', 'diagonal'})
+
+  def test_nearby_q_reaches_across_the_antimeridian(self):
+    LaundrymartStore.objects.create(laundrymart_name='west of the line', lat=0.0, lng=-179.995)
+    self.assertEqual(self.nearby(0.0, 179.995, 1), {'west of the line'})
+
+  def test_stores_without_coordinates_are_not_matched(self):
+    LaundrymartStore.objects.create(laundrymart_name='no location')
+    self.assertEqual(self.nearby(0.0, 0.0, 100), set())
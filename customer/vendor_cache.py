@@ -0,0 +1,67 @@
+import hashlib
+from uuid import uuid4
+
+from django.core.cache import cache
+
+VENDOR_LIST_CACHE_PREFIX = 'vendor_list'
+VENDOR_LIST_VERSION_KEY = f'{VENDOR_LIST_CACHE_PREFIX}:version'
+# Short TTL: open_now / closes_in_minutes drift with the clock
+VENDOR_LIST_CACHE_TTL = 60
+# ~110m cells; requests inside one cell share a cached page
+LOCATION_QUANTIZE_DECIMALS = 3
+
+# Query params that change the response body
+CACHE_KEY_PARAMS = ('search', 'ordering', 'open_now', 'page', 'page_size', 'pagination', 'cursor')
+
+
+def quantize_point(lat, lng):
+  return round(lat, LOCATION_QUANTIZE_DECIMALS), round(lng, LOCATION_QUANTIZE_DECIMALS)
+
+
+def _current_version():
+  version = cache.get(VENDOR_LIST_VERSION_KEY)
+  if version is None:
+    version = uuid4().hex
+    cache.add(VENDOR_LIST_VERSION_KEY, version, timeout=None)
+    version = cache.get(VENDOR_LIST_VERSION_KEY, version)
+  return version
+
+
+def vendor_list_cache_key(query_params, lat, lng, radius):
+  # Requests inside one grid cell share a page; the query itself uses the exact point
+  lat, lng = quantize_point(lat, lng)
+  parts = [f'{lat:.{LOCATION_QUANTIZE_DECIMALS}f}', f'{lng:.{LOCATION_QUANTIZE_DECIMALS}f}', f'{radius:g}']
+  parts += [f'{name}={query_params.get(name, "")}' for name in CACHE_KEY_PARAMS]
+  digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+  try:
+    version = _current_version()
+  except Exception as e:
+    print(f"Vendor list cache unavailable: {str(e)}")
+    return None
+  return f'{VENDOR_LIST_CACHE_PREFIX}:{version}:{digest}'
+
+
+def get_cached_vendor_list(key):
+  try:
+    return cache.get(key)
+  except Exception as e:
+    print(f"Vendor list cache read failed: {str(e)}")
+    return None
+
+
+def set_cached_vendor_list(key, data):
+  try:
+    cache.set(key, data, timeout=VENDOR_LIST_CACHE_TTL)
+  except Exception as e:
+    print(f"Vendor list cache write failed: {str(e)}")
+
+
+def invalidate_vendor_list_cache():
+  """
+  Drop every cached vendor page by rotating the version embedded in the keys;
+  old entries simply expire.
+  """
+  try:
+    cache.set(VENDOR_LIST_VERSION_KEY, uuid4().hex, timeout=None)
+  except Exception as e:
+    print(f"Vendor list cache invalidation failed: {str(e)}")
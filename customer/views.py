@@ -1,10 +1,8 @@
-from decimal import Decimal
+import math
 
-import humanize
-from django.db.models import Avg, Case, FloatField, IntegerField, Value, When
+from django.db.models import Avg, Case, F, FloatField, IntegerField, Value, When
 
 from django.db.models.functions import Coalesce
-from django.utils import timezone
 
 from drf_spectacular.utils import OpenApiExample, OpenApiParameter, extend_schema
 from rest_framework import status
@@ -17,13 +15,17 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from accounts.models import LaundrymartStore, User
+from accounts.search import StoreSearchFilter
 from common_utils.distance_utils import calculate_distance_miles, calculate_distance_sql, get_best_location
+from common_utils.geo_index import nearby_q
+from common_utils.nearest_stores import nearest_stores
+from common_utils.order_feed import OrderFeed, cents_to_dollars
 from customer.serializers import CustomerOrderReportSerializer, ReviewSerializer, VendorSerializer
+from customer.vendor_cache import get_cached_vendor_list, set_cached_vendor_list, vendor_list_cache_key
+from laundrymart.pagination import paginator_for_request
 from laundrymart.permissions import IsCustomer
 from payment.models import Order
 from uber.models import Delivery, DeliveryQuote
-from uber.serializers import ManifestItemSerializer
-from vendor.serializers import VendorOrderReportSerializer
 from vendor.views import StandardResultsSetPagination
 
 
@@ -32,16 +34,17 @@ class VendorPagination(PageNumberPagination):
   page_size_query_param = 'page_size'
   max_page_size = 50
 
+DEFAULT_VENDOR_RADIUS_MILES = 25
+MAX_VENDOR_RADIUS_MILES = 100
+
 # Create your views here.
 class VendorAPIView(ListAPIView):
   serializer_class = VendorSerializer
   permission_classes = [IsCustomer]
   pagination_class = VendorPagination
-  filter_backends = [SearchFilter, OrderingFilter]
-
-  search_fields = ['laundrymart_name','location']
+  filter_backends = [StoreSearchFilter, OrderingFilter]
 
-  ordering_fields = ['average_rating','price_per_pound','distance']
+  ordering_fields = ['average_rating','price_per_pound','distance','open_now']
 
   ordering = ['distance']  # default
 
@@ -60,6 +63,18 @@ class VendorAPIView(ListAPIView):
         type=float
 
       ),
+      OpenApiParameter(
+        name='radius',
+        description=f'Search radius in miles (default {DEFAULT_VENDOR_RADIUS_MILES}, max {MAX_VENDOR_RADIUS_MILES})',
+        required=False,
+        type=float
+      ),
+      OpenApiParameter(
+        name='open_now',
+        description="Only return vendors that are currently open in their local time (true/false)",
+        required=False,
+        type=bool
+      ),
     ]
   )
   def get(self, request, *args, **kwargs):
@@ -68,7 +83,27 @@ class VendorAPIView(ListAPIView):
     context = super().get_serializer_context()
     context["request"] = self.request   # already included, but explicit is fine
     return context
-  def get_queryset(self):
+  @property
+  def paginator(self):
+    # ?pagination=cursor switches to keyset pages over the active ordering
+    if not hasattr(self, '_paginator'):
+      self._paginator = paginator_for_request(self.request, self.pagination_class)
+    return self._paginator
+
+  def list(self, request, *args, **kwargs):
+    lat, lng = self.get_search_point()
+    cache_key = vendor_list_cache_key(request.query_params, lat, lng, self.get_radius())
+    if cache_key:
+      cached = get_cached_vendor_list(cache_key)
+      if cached is not None:
+        return Response(cached)
+
+    response = super().list(request, *args, **kwargs)
+    if cache_key and response.status_code == 200:
+      set_cached_vendor_list(cache_key, response.data)
+    return response
+
+  def get_search_point(self):
     user = self.request.user
     lat_param = self.request.query_params.get('lat')
     lng_param = self.request.query_params.get('lng')
@@ -80,6 +115,8 @@ class VendorAPIView(ListAPIView):
         lng = float(lng_param)
       except (TypeError, ValueError):
         raise ValidationError({"error": "Invalid latitude or longitude format."})
+      if not (math.isfinite(lat) and math.isfinite(lng)):
+        raise ValidationError({"error": "Invalid latitude or longitude format."})
     else:
       # Fallback to user's saved location
       if not user.lat or not user.lng:
@@ -94,11 +131,40 @@ class VendorAPIView(ListAPIView):
           "error": "Your saved location is invalid. Please update it."
         })
 
-    qs = LaundrymartStore.objects.annotate(
-      average_rating=Coalesce(
-        Avg("received_reviews__rating", output_field=FloatField()),
-        Value(0.0)
-      ),
+    # Exact point for distances; only the cache key is snapped to a grid
+    return lat, lng
+
+  def get_radius(self):
+    radius_param = self.request.query_params.get('radius')
+    if not radius_param:
+      return DEFAULT_VENDOR_RADIUS_MILES
+    try:
+      radius = float(radius_param)
+    except (TypeError, ValueError):
+      raise ValidationError({"error": "Invalid radius format."})
+    # nan compares False to everything, so it would slip past the check below
+    if not math.isfinite(radius):
+      raise ValidationError({"error": "Invalid radius format."})
+    if radius <= 0:
+      raise ValidationError({"error": "Radius must be greater than 0."})
+    return min(radius, MAX_VENDOR_RADIUS_MILES)
+
+  def get_queryset(self):
+    lat, lng = self.get_search_point()
+    radius = self.get_radius()
+
+    # Index-backed geohash/bounding-box prefilter, so the trig below only
+    # runs on stores that can actually be inside the radius. Stores without
+    # coordinates can't be placed inside any radius, so they aren't listed.
+    qs = LaundrymartStore.objects.filter(nearby_q(lat, lng, radius)).prefetch_related('vendor_services')
+
+    # Open/closed is evaluated in SQL so it can be filtered and sorted on
+    qs = qs.annotate_open_status()
+    if self.request.query_params.get('open_now', '').lower() in ('1', 'true'):
+      qs = qs.filter(open_now=True)
+    qs = qs.annotate(
+      # Denormalized column kept current by customer.signals
+      average_rating=F("rating_average"),
 
       # Flag vendors missing location
       has_no_location=Case(
@@ -120,7 +186,7 @@ class VendorAPIView(ListAPIView):
           default=Value(None),
           output_field=FloatField()
         )
-      )
+      ).filter(distance__lte=radius)
 
     return qs
 
@@ -130,7 +196,7 @@ class ChooseForCustomer(APIView):
   within a 10-mile radius of the customer's saved location (user.lat / user.lng).
 
   - Uses the customer's saved lat/lng directly (no query params needed)
-  - Uses your existing calculate_distance_sql function for distance calculation
+  - Uses the nearest_stores engine (geohash prefilter + SQL ranking, one query)
   - Prioritizes lowest price_per_pound among vendors with valid price and coordinates
   - Returns 404 if no vendor found within 10 miles
   """
@@ -155,27 +221,16 @@ class ChooseForCustomer(APIView):
         status=status.HTTP_400_BAD_REQUEST
       )
 
-    # Optimized single query using your existing calculate_distance_sql
-    candidates = (
-      User.objects.filter(
-        is_staff=True,
-        is_superuser=False,
-        price_per_pound__isnull=False,
-        lat__isnull=False,
-        lng__isnull=False,
-      )
-      .annotate(distance=calculate_distance_sql(lat, lng))
-      .filter(distance__lte=10)  # within 10 miles
-      .order_by('price_per_pound')  # lowest price first
-    )
+    # Cheapest store within 10 miles, ties broken by distance
+    candidates = nearest_stores(lat, lng, k=1, max_radius_miles=10, rank_by='price', expand=False)
 
-    if not candidates.exists():
+    if not candidates:
       return Response(
         {"detail": "No LaundryMart found within 10 miles with available pricing."},
         status=status.HTTP_404_NOT_FOUND
       )
 
-    selected_vendor = candidates.first()
+    selected_vendor = candidates[0]
     serializer = VendorSerializer(selected_vendor, context={'request': request})
 
     return Response(serializer.data, status=status.HTTP_200_OK)
@@ -233,6 +288,66 @@ class ReviewAPIView(APIView):
 #       'error': str(e)
 #     }, status=400)
 
+class CustomerOrderFeed(OrderFeed):
+  # Customers see reports on their quotes only
+  order_reports = False
+
+  def get_quotes(self):
+    return DeliveryQuote.objects.filter(customer=self.request.user)
+
+  def get_orders(self):
+    return Order.objects.filter(user=self.request.user)
+
+  def quote_row(self, quote, vendor_report, customer_report):
+    customer = quote.customer
+    return {
+      "id": None,
+      "uuid": None,  # no UUID for quotes
+      "order_id": None,  # frontend uses this as identifier
+      "phone_number": customer.phone_number,
+      "email": customer.email,
+      "time_ago": self.time_ago(quote.saved_at),
+      "customer_note": quote.customer_note,
+      "status": quote.get_status_display(),
+      "user": customer.full_name or customer.phone_number or customer.email,
+      "vendor_report": vendor_report,
+      "customer_report": customer_report,
+      # "service_provider": store.laundrymart_name or user.full_name,  # if needed
+      "manifest_items": self.manifest_items(quote),
+      "service": quote.get_service_type_display(),
+      "total_cost": None,
+      "vendor_fee": cents_to_dollars(quote.fee),
+      "address": quote.dropoff_address or quote.pickup_address,
+      "is_quote": True,
+      "quote_id": quote.quote_id,
+      "expires": quote.expires.isoformat() if quote.expires else None,
+      "created_at": quote.saved_at.isoformat(),
+    }
+
+  def order_row(self, order, vendor_report, customer_report):
+    return {
+      "id": order.id,
+      "uuid": str(order.uuid),
+      "order_id": str(order.uuid),  # consistent with frontend expectation
+      "phone_number": order.user.phone_number or order.user.email,
+      "customer_note": order.customer_note,
+      "email": order.user.email,
+      "time_ago": self.time_ago(order.created_at),
+      "status": order.get_status_display(),
+      "user": str(order.user),  # or order.user.full_name / email if you prefer
+      # "service_provider": store.laundrymart_name,
+      "tracking_url": None,
+      "manifest_items": self.manifest_items(order),
+      "service": "full_service",  # or add a field later if needed
+      "total_cost": cents_to_dollars(order.final_total_cents),
+      "vendor_fee": cents_to_dollars(order.delivery_fee_cents),
+      "address": order.dropoff_address or order.pickup_address,
+      "is_quote": False,
+      "quote_id": None,
+      "expires": None,
+      "created_at": order.created_at.isoformat(),
+    }
+
 class CustomerOrdersListAPIView(APIView):
   permission_classes = [IsCustomer]
   pagination_class = StandardResultsSetPagination
@@ -240,7 +355,7 @@ class CustomerOrdersListAPIView(APIView):
     parameters=[
       OpenApiParameter(
         name='filter',
-        description='Filter orders by status: pending, active, completed',
+        description='Filter orders by status: pending, active, completed, all (quotes and orders merged newest first)',
         required=False,
         type=str
       )
@@ -250,104 +365,16 @@ class CustomerOrdersListAPIView(APIView):
   def get(self, request):
     filter_type = request.query_params.get('filter', 'pending').lower()
 
-    user = request.user
-
+    feed = CustomerOrderFeed(request)
+    if filter_type not in feed.filters:
+      return Response({"error": "Invalid filter. Use: pending, active, completed, all"}, status=400)
 
-    # We'll collect unified results with a creation timestamp for sorting
-    results = []
-
-    if filter_type == 'pending':
-      quotes_qs = DeliveryQuote.objects.filter(
-        customer=user,
-        status='pending'
-      ).select_related('customer').prefetch_related('manifest_items').order_by('-saved_at')
-
-      paginator = self.pagination_class()
-      page = paginator.paginate_queryset(quotes_qs, request)
-      if page is None:
-        return Response({"error": "Pagination error"}, status=400)
-
-      for quote in page:
-        time_ago = humanize.naturaltime(timezone.now() - quote.saved_at)
-
-        results.append({
-          "id": None,
-          "uuid": None,  # no UUID for quotes
-          "order_id": None,  # frontend uses this as identifier
-          "phone_number": quote.customer.phone_number,
-          "email": quote.customer.email,
-          "time_ago": time_ago,
-          "customer_note": quote.customer_note,
-          "status": quote.get_status_display(),
-          "user": quote.customer.full_name or quote.customer.phone_number or quote.customer.email,
-          "vendor_report": VendorOrderReportSerializer(quote.vendor_filed_report,context={'request': request}).data if hasattr(quote,
-                                                                                                     'vendor_filed_report') else None,
-          "customer_report": CustomerOrderReportSerializer(quote.customer_filed_report,
-                                                           context={'request': request}).data if hasattr(quote,
-                                                                                                         'customer_filed_report') else None,
-          # "service_provider": store.laundrymart_name or user.full_name,  # if needed
-          "manifest_items": ManifestItemSerializer(quote.manifest_items.all(), many=True).data,
-          "service": quote.get_service_type_display(),
-          "total_cost": None,
-          "vendor_fee": quote.fee / Decimal('100') if quote.fee else None,
-          "address": quote.dropoff_address or quote.pickup_address,
-          "is_quote": True,
-          "quote_id": quote.quote_id,
-          "expires": quote.expires.isoformat() if quote.expires else None,
-          "created_at": quote.saved_at.isoformat(),
-        })
-
-    elif filter_type in ['active', 'completed']:
-      status_list = (
-        ['card_saved', 'picked_up', 'weighed', 'charged', 'return_scheduled']
-        if filter_type == 'active'
-        else ['completed']
-      )
-
-      orders_qs = Order.objects.filter(
-        user=user,
-        status__in=status_list
-      ).select_related('user', 'service_provider').prefetch_related('manifest_items') \
-        .order_by('-created_at')
-
-      paginator = self.pagination_class()
-      page = paginator.paginate_queryset(orders_qs, request)
-      if page is None:
-        return Response({"error": "Pagination error"}, status=400)
-
-      for order in page:
-        time_ago = humanize.naturaltime(timezone.now() - order.created_at)
-
-        tracking_url = None
-
-        results.append({
-          "id": order.id,
-          "uuid": str(order.uuid),
-          "order_id": str(order.uuid),  # consistent with frontend expectation
-          "phone_number": order.user.phone_number or order.user.email,
-          "customer_note": order.customer_note,
-          "email": order.user.email,
-          "time_ago": time_ago,
-          "status": order.get_status_display(),
-          "user": str(order.user),  # or order.user.full_name / email if you prefer
-          # "service_provider": store.laundrymart_name,
-          "tracking_url": None,
-          "manifest_items": ManifestItemSerializer(order.manifest_items.all(), many=True).data,
-          "service": "full_service",  # or add a field later if needed
-          "total_cost": order.final_total_cents / Decimal('100') if order.final_total_cents else None,
-          "vendor_fee": order.delivery_fee_cents / Decimal('100') if order.delivery_fee_cents else None,
-          "address": order.dropoff_address or order.pickup_address,
-          "is_quote": False,
-          "quote_id": None,
-          "expires": None,
-          "created_at": order.created_at.isoformat(),
-        })
-
-    else:
-      return Response({"error": "Invalid filter. Use: pending, active, delivered"}, status=400)
+    paginator, page = feed.paginate(filter_type, self.pagination_class)
+    if page is None:
+      return Response({"error": "Pagination error"}, status=400)
 
     return paginator.get_paginated_response({
-      "results": results,
+      "results": feed.rows(page),
       "filter": filter_type,
     })
 
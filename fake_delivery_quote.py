@@ -2,6 +2,7 @@ import random
 from faker import Faker
 from datetime import datetime, timedelta
 from accounts.models import LaundrymartStore, User
+from common_utils.distance_utils import calculate_distances
 from fake_data import d, random_lat_lng
 from uber.models import DeliveryQuote, SERVICE_TYPE_CHOICE, STATUS_CHOICES
 
@@ -27,12 +28,15 @@ def generate_fake_delivery_quote():
     fee = d(random.uniform(10.0, 100.0))
     currency = "USD"
 
-    # Get a random LaundrymartStore and its external_store_id
-    laundrymart_store = LaundrymartStore.objects.order_by('?').first()  # Get a random laundry mart store
-
-    if not laundrymart_store:
+    # The LaundrymartStore nearest to the pickup point (one batch distance pass over all stores)
+    stores = list(LaundrymartStore.objects.filter(lat__isnull=False, lng__isnull=False))
+    if not stores:
         print("No LaundrymartStore found.")
         return None  # Ensure you handle this case if no store is available
+    distances = calculate_distances(
+        pickup_lat, pickup_lng, [store.lat for store in stores], [store.lng for store in stores], precision=None
+    )
+    laundrymart_store = min(zip(distances, stores), key=lambda pair: float('inf') if pair[0] is None else pair[0])[1]
 
     # Extract store details
     external_store_id = laundrymart_store.store_id  # Use the store's external_store_id
@@ -54,7 +58,7 @@ def generate_fake_delivery_quote():
         currency=currency,
         dropoff_eta=dropoff_eta,
         expires=expires,
-        external_store_id='46d6e35d-3ca4-4092-8526-24a4bcd814a0',  # Store external_id here
+        external_store_id=external_store_id,
     )
     return delivery_quote
 
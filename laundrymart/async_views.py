@@ -0,0 +1,41 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+  """
+  APIView whose handlers are coroutines (`async def post(...)`), so they can
+  await network calls without holding a worker thread under ASGI.
+
+  Authentication, permissions and throttling are DRF's regular sync code
+  (JWT auth loads the user from the DB), so they run in a thread via
+  sync_to_async. Handlers must do the same for ORM access.
+  """
+
+  async def dispatch(self, request, *args, **kwargs):
+    self.args = args
+    self.kwargs = kwargs
+    request = self.initialize_request(request, *args, **kwargs)
+    self.request = request
+    self.headers = self.default_response_headers
+
+    try:
+      await sync_to_async(self.initial)(request, *args, **kwargs)
+
+      if request.method.lower() in self.http_method_names:
+        handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+      else:
+        handler = self.http_method_not_allowed
+
+      response = handler(request, *args, **kwargs)
+      # DRF's own options/http_method_not_allowed are sync
+      if asyncio.iscoroutine(response):
+        response = await response
+
+    except Exception as exc:
+      response = self.handle_exception(exc)
+
+    self.response = self.finalize_response(request, response, *args, **kwargs)
+    return self.response
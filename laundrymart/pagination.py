@@ -0,0 +1,276 @@
+import base64
+import datetime
+import heapq
+import json
+from collections import OrderedDict
+from itertools import islice
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+CURSOR_MODE_PARAM = 'pagination'
+CURSOR_MODE_VALUE = 'cursor'
+
+
+class KeysetPagination(BasePagination):
+  """
+  Cursor pagination keyed on the queryset's own ordering plus the primary key,
+  e.g. (-saved_at, -id). The next page is fetched with a WHERE on the last row's
+  key instead of OFFSET, and no COUNT(*) is run, so deep pages cost the same
+  as the first one. NULLs always sort last so nullable keys stay stable.
+  """
+  page_size = 10
+  page_size_query_param = 'page_size'
+  max_page_size = 100
+  cursor_query_param = 'cursor'
+  invalid_cursor_message = 'Invalid cursor'
+
+  def get_page_size(self, request):
+    try:
+      size = int(request.query_params[self.page_size_query_param])
+      if size > 0:
+        return min(size, self.max_page_size)
+    except (KeyError, ValueError):
+      pass
+    return self.page_size
+
+  def get_ordering(self, queryset):
+    ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+    if not ordering:
+      ordering = [field for field in queryset.model._meta.ordering if isinstance(field, str)]
+    pk_name = queryset.model._meta.pk.name
+    names = {field.lstrip('-') for field in ordering}
+    if not names & {'pk', 'id', pk_name}:
+      descending = ordering[0].startswith('-') if ordering else False
+      ordering.append(f'-{pk_name}' if descending else pk_name)
+    return ordering
+
+  def _order_expressions(self, ordering):
+    return [
+      F(field[1:]).desc(nulls_last=True) if field.startswith('-') else F(field).asc(nulls_last=True)
+      for field in ordering
+    ]
+
+  def _after_q(self, ordering, values):
+    """Rows strictly after `values` under `ordering` (lexicographic, NULLs last)."""
+    condition = Q(pk__in=[])
+    equal_so_far = Q()
+    for field, value in zip(ordering, values):
+      name = field.lstrip('-')
+      if value is None:
+        # Nothing sorts after NULL except other NULLs, which tie
+        equal_so_far &= Q(**{f'{name}__isnull': True})
+        continue
+      lookup = 'lt' if field.startswith('-') else 'gt'
+      after = Q(**{f'{name}__{lookup}': value}) | Q(**{f'{name}__isnull': True})
+      condition |= equal_so_far & after
+      equal_so_far &= Q(**{name: value})
+    return condition
+
+  @staticmethod
+  def _json_default(value):
+    # Full microsecond precision; DjangoJSONEncoder truncates to milliseconds,
+    # which would skip or repeat rows sharing a timestamp prefix
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+      return value.isoformat()
+    return str(value)  # Decimal, UUID
+
+  def encode_cursor(self, values):
+    raw = json.dumps(values, default=self._json_default).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+  def decode_cursor(self, request):
+    encoded = request.query_params.get(self.cursor_query_param)
+    if not encoded:
+      return None
+    try:
+      values = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+    except (TypeError, ValueError, UnicodeDecodeError):
+      raise NotFound(self.invalid_cursor_message)
+    if not isinstance(values, list) or len(values) != len(self.ordering):
+      raise NotFound(self.invalid_cursor_message)
+    return values
+
+  def paginate_queryset(self, queryset, request, view=None):
+    self.request = request
+    self.ordering = self.get_ordering(queryset)
+    page_size = self.get_page_size(request)
+
+    queryset = queryset.order_by(*self._order_expressions(self.ordering))
+    values = self.decode_cursor(request)
+    if values is not None:
+      queryset = queryset.filter(self._after_q(self.ordering, values))
+
+    # One extra row tells us whether there is a next page
+    rows = list(queryset[:page_size + 1])
+    self.has_next = len(rows) > page_size
+    self.page = rows[:page_size]
+    return self.page
+
+  def get_next_link(self):
+    if not self.has_next or not self.page:
+      return None
+    last = self.page[-1]
+    values = [getattr(last, field.lstrip('-')) for field in self.ordering]
+    url = self.request.build_absolute_uri()
+    url = replace_query_param(url, CURSOR_MODE_PARAM, CURSOR_MODE_VALUE)
+    url = remove_query_param(url, 'page')
+    return replace_query_param(url, self.cursor_query_param, self.encode_cursor(values))
+
+  def get_paginated_response(self, data):
+    return Response(OrderedDict([
+      ('next', self.get_next_link()),
+      ('previous', None),
+      ('results', data),
+    ]))
+
+  def get_paginated_response_schema(self, schema):
+    return {
+      'type': 'object',
+      'required': ['results'],
+      'properties': {
+        'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+        'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+        'results': schema,
+      },
+    }
+
+
+def wants_cursor_pagination(request):
+  """Cursor mode is opt-in (?pagination=cursor) so page-number clients keep working."""
+  params = request.query_params
+  return params.get(CURSOR_MODE_PARAM) == CURSOR_MODE_VALUE or KeysetPagination.cursor_query_param in params
+
+
+def paginator_for_request(request, default_class):
+  if wants_cursor_pagination(request):
+    paginator = KeysetPagination()
+    if default_class is not None:
+      paginator.page_size = getattr(default_class, 'page_size', paginator.page_size)
+      paginator.max_page_size = getattr(default_class, 'max_page_size', paginator.max_page_size)
+    return paginator
+  return default_class()
+
+
+class MergedFeedPagination(BasePagination):
+  """
+  Paginates several sources as one newest-first feed, e.g. pending quotes
+  and orders. Each source is a (kind, queryset, timestamp_field) tuple and is
+  already filtered; rows are ordered by (timestamp, kind, pk) descending.
+
+  Only (timestamp, pk) pairs are read while merging: each source contributes
+  at most offset + page_size keys, heapq.merge streams them in order, and
+  full rows are then loaded for the chosen page only. Supports both
+  ?page=N (with count) and ?pagination=cursor like the single-source lists.
+  """
+  page_size = 10
+  page_size_query_param = 'page_size'
+  max_page_size = 100
+  page_query_param = 'page'
+  cursor_query_param = KeysetPagination.cursor_query_param
+  invalid_page_message = 'Invalid page.'
+
+  def __init__(self, default_class=None):
+    if default_class is not None:
+      self.page_size = getattr(default_class, 'page_size', self.page_size)
+      self.max_page_size = getattr(default_class, 'max_page_size', self.max_page_size)
+
+  get_page_size = KeysetPagination.get_page_size
+
+  def _keys(self, kind, queryset, timestamp_field, limit, after=None):
+    if after is not None:
+      queryset = queryset.filter(self._after_q(kind, timestamp_field, after))
+    rows = queryset.prefetch_related(None).order_by(f'-{timestamp_field}', '-pk') \
+      .values_list(timestamp_field, 'pk')[:limit]
+    return ((timestamp, kind, pk) for timestamp, pk in rows.iterator())
+
+  @staticmethod
+  def _after_q(kind, timestamp_field, after):
+    """Rows of `kind` strictly after the cursor key under (timestamp, kind, pk) desc."""
+    timestamp, cursor_kind, pk = after
+    before = Q(**{f'{timestamp_field}__lt': timestamp})
+    if kind < cursor_kind:
+      return before | Q(**{timestamp_field: timestamp})
+    if kind == cursor_kind:
+      return before | Q(**{timestamp_field: timestamp, 'pk__lt': pk})
+    return before
+
+  def _merge(self, sources, limit, after=None):
+    streams = [self._keys(kind, queryset, field, limit, after) for kind, queryset, field in sources]
+    return list(islice(heapq.merge(*streams, reverse=True), limit))
+
+  def _load(self, sources, keys):
+    """Full rows for `keys`, in key order, one query (plus prefetches) per source."""
+    loaded = {}
+    for kind, queryset, _ in sources:
+      pks = [pk for _, key_kind, pk in keys if key_kind == kind]
+      if pks:
+        loaded.update({(kind, row.pk): row for row in queryset.filter(pk__in=pks)})
+    return [loaded[(kind, pk)] for _, kind, pk in keys if (kind, pk) in loaded]
+
+  def decode_cursor(self, request):
+    encoded = request.query_params.get(self.cursor_query_param)
+    if not encoded:
+      return None
+    try:
+      values = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+    except (TypeError, ValueError, UnicodeDecodeError):
+      raise NotFound(KeysetPagination.invalid_cursor_message)
+    if not isinstance(values, list) or len(values) != 3:
+      raise NotFound(KeysetPagination.invalid_cursor_message)
+    return values
+
+  def paginate_sources(self, sources, request):
+    self.request = request
+    self.cursor_mode = wants_cursor_pagination(request)
+    page_size = self.get_page_size(request)
+
+    if self.cursor_mode:
+      keys = self._merge(sources, page_size + 1, self.decode_cursor(request))
+      self.has_next = len(keys) > page_size
+      self.keys = keys[:page_size]
+    else:
+      try:
+        self.page_number = int(request.query_params.get(self.page_query_param, 1))
+      except ValueError:
+        raise NotFound(self.invalid_page_message)
+      if self.page_number < 1:
+        raise NotFound(self.invalid_page_message)
+      self.count = sum(queryset.count() for _, queryset, _ in sources)
+      offset = (self.page_number - 1) * page_size
+      if offset and offset >= self.count:
+        raise NotFound(self.invalid_page_message)
+      self.keys = self._merge(sources, offset + page_size)[offset:]
+      self.has_next = offset + page_size < self.count
+
+    return self._load(sources, self.keys)
+
+  def get_next_link(self):
+    if not self.has_next or not self.keys:
+      return None
+    url = self.request.build_absolute_uri()
+    if self.cursor_mode:
+      url = replace_query_param(url, CURSOR_MODE_PARAM, CURSOR_MODE_VALUE)
+      url = remove_query_param(url, self.page_query_param)
+      cursor = base64.urlsafe_b64encode(
+        json.dumps(list(self.keys[-1]), default=KeysetPagination._json_default).encode()
+      ).decode()
+      return replace_query_param(url, self.cursor_query_param, cursor)
+    return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+  def get_previous_link(self):
+    if self.cursor_mode or self.page_number <= 1:
+      return None
+    url = self.request.build_absolute_uri()
+    if self.page_number == 2:
+      return remove_query_param(url, self.page_query_param)
+    return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+  def get_paginated_response(self, data):
+    fields = [('next', self.get_next_link()), ('previous', self.get_previous_link()), ('results', data)]
+    if not self.cursor_mode:
+      fields.insert(0, ('count', self.count))
+    return Response(OrderedDict(fields))
@@ -26,6 +26,11 @@ SECRET_KEY = 'django-insecure-_fxcmxqehq047c^6^mbu$e$3n#skx*$+pc761^wzj6npqlw=v9
 UBER_CUSTOMER_ID=os.getenv('UBER_CUSTOMER_ID')
 UBER_CLIENT_ID=os.getenv('UBER_CLIENT_ID')
 UBER_CLIENT_SECRET=os.getenv('UBER_CLIENT_SECRET')
+# Point these at a local stub/simulator in development
+UBER_BASE_URL=os.getenv('UBER_BASE_URL', 'https://api.uber.com/v1')
+UBER_AUTH_URL=os.getenv('UBER_AUTH_URL', 'https://auth.uber.com/oauth/v2/token')
+# Webhook signing key from the Uber Direct dashboard; unsigned delivery_status calls are rejected
+UBER_WEBHOOK_SIGNING_KEY=os.getenv('UBER_WEBHOOK_SIGNING_KEY')
 STRIPE_SECRET_KEY=os.getenv('STRIPE_SECRET_KEY')
 STRIPE_PUBLISHABLE_KEY=os.getenv('STRIPE_PUBLISHABLE_KEY')
 CUSTOMER_CONFIRM_ORDER_STRIPE_WEBHOOK_SECRET=os.getenv('CUSTOMER_CONFIRM_ORDER_STRIPE_WEBHOOK_SECRET')
@@ -28,6 +28,7 @@ urlpatterns = [
     path('message/api/',include('messaging.urls')),
     path('payment/api/',include('payment.urls')),
     path('vendor/api/',include('vendor.urls')),
+    path('uber/api/',include('uber.urls')),
     #path('api-auth/', include('rest_framework.urls')),
 
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
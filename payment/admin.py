@@ -1,7 +1,13 @@
 from django.contrib import admin
 
-from payment.models import Order, Payment
+from payment.models import Order, Payment, StripeWebhookEvent
 
 # Register your models here.
 admin.site.register(Payment)
-admin.site.register(Order)
\ No newline at end of file
+admin.site.register(Order)
+
+class StripeWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event_type', 'object_id', 'result', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('result', 'event_type')
+    search_fields = ('event_id', 'object_id')
+admin.site.register(StripeWebhookEvent, StripeWebhookEventAdmin)
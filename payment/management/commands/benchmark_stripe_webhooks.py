@@ -0,0 +1,174 @@
+import hashlib
+import hmac
+import io
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext, redirect_stdout
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from accounts.models import LaundrymartStore, User
+from common_utils.benchmark import isolated_database
+from common_utils.metrics import LatencyHistogram
+from payment.models import Order, Payment, SavedPaymentMethod, StripeWebhookEvent
+from payment.stripe_events import process_batch
+from uber.models import DeliveryQuote
+
+BENCHMARK_SECRET = 'whsec_benchmark'
+# Keep the saved-card cache in-process so the run doesn't need Redis
+BENCHMARK_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def sign(body, secret=BENCHMARK_SECRET, timestamp=None):
+  """Stripe-Signature header for body, as Stripe computes it."""
+  timestamp = timestamp or int(time.time())
+  signature = hmac.new(secret.encode(), f'{timestamp}.{body}'.encode(), hashlib.sha256).hexdigest()
+  return f't={timestamp},v1={signature}'
+
+
+class Command(BaseCommand):
+  help = (
+    "Post synthetic signed Stripe events (payment_intent, payment_method, checkout.session) "
+    "to the webhook, then drain the event store; report ingestion and processing throughput"
+  )
+
+  def add_arguments(self, parser):
+    parser.add_argument('--orders', type=int, default=500, help="Each order produces ~5 events")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duplicate-rate', type=float, default=0.1, help="Fraction of events Stripe sends twice")
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help="Show the handlers' print output")
+
+  def handle(self, *args, **options):
+    random.seed(options['seed'])
+    with override_settings(CACHES=BENCHMARK_CACHES, CUSTOMER_CONFIRM_ORDER_STRIPE_WEBHOOK_SECRET=BENCHMARK_SECRET), \
+        isolated_database():
+      quiet = nullcontext() if options['verbose'] else redirect_stdout(io.StringIO())
+      with quiet:
+        events = self._seed(options['orders'])
+      sent = events + random.sample(events, int(len(events) * options['duplicate_rate']))
+      # Stripe doesn't guarantee order
+      random.shuffle(sent)
+      with quiet:
+        ingest = self._ingest(sent, options['concurrency'])
+        drain = self._drain(options['batch_size'])
+      self._report(options, events, sent, ingest, drain)
+
+  def _seed(self, orders):
+    store = LaundrymartStore.objects.create(
+      laundrymart_name='Benchmark Laundry', lat=40.7128, lng=-74.0060, store_id=uuid.uuid4(),
+      price_per_pound=Decimal('1.75'), service_fee=Decimal('2.50'),
+    )
+    events = []
+    created = int(time.time()) - 600
+    for i in range(orders):
+      customer = User.objects.create_user(email=f'bench-stripe-{i}@example.com', password=None, is_active=True)
+      customer.stripe_customer_id = f'cus_bench{i}'
+      customer.save(update_fields=['stripe_customer_id'])
+      quote = DeliveryQuote.objects.create(customer=customer, quote_id=f'dqt_bench{i}', external_store_id=str(store.store_id))
+      order = Order.objects.create(user=customer, service_provider=store, status='card_saved')
+
+      pm = {
+        'id': f'pm_bench{i}', 'object': 'payment_method', 'type': 'card', 'customer': customer.stripe_customer_id,
+        'card': {'brand': 'visa', 'last4': f'{i % 10000:04d}', 'exp_month': 12, 'exp_year': 2030, 'country': 'US'},
+        'billing_details': {'name': f'Customer {i}'},
+      }
+      events.append(self._event('checkout.session.completed', created, {
+        'id': f'cs_bench{i}', 'object': 'checkout.session', 'mode': 'setup',
+        'metadata': {'pending_quote_id': str(quote.id)},
+      }))
+      events.append(self._event('payment_method.attached', created, pm))
+      events.append(self._event('payment_method.updated', created + 1, dict(pm, card=dict(pm['card'], exp_year=2031))))
+      for step, status in enumerate(('requires_capture', 'succeeded')):
+        events.append(self._event(f'payment_intent.{"amount_capturable_updated" if status == "requires_capture" else status}', created + 60 * (step + 1), {
+          'id': f'pi_bench{i}', 'object': 'payment_intent', 'status': status, 'amount': 2500,
+          'amount_received': 2500 if status == 'succeeded' else 0, 'last_payment_error': None,
+          'metadata': {'order_uuid': str(order.uuid)},
+        }))
+    return events
+
+  def _event(self, event_type, created, obj):
+    return json.dumps({
+      'id': f'evt_{uuid.uuid4().hex}', 'object': 'event', 'type': event_type, 'created': created,
+      'livemode': False, 'data': {'object': obj},
+    })
+
+  def _ingest(self, bodies, concurrency):
+    # sqlite (the throwaway test DB) can't take concurrent writers; serialize DB work there
+    db_lock = threading.Lock() if connection.vendor == 'sqlite' else nullcontext()
+    path = reverse('webhook-request-sent')
+    latency = LatencyHistogram()
+    statuses = Counter()
+
+    def post(chunk):
+      client = Client()
+      try:
+        for body in chunk:
+          started = time.perf_counter()
+          with db_lock:
+            response = client.post(path, data=body, content_type='application/json', HTTP_STRIPE_SIGNATURE=sign(body))
+          latency.observe((time.perf_counter() - started) * 1000)
+          statuses[response.status_code] += 1
+      finally:
+        connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+      list(pool.map(post, [bodies[i::concurrency] for i in range(concurrency)]))
+    return {'elapsed': time.perf_counter() - started, 'latency': latency, 'statuses': statuses}
+
+  def _drain(self, batch_size):
+    latency = LatencyHistogram()
+    batches = 0
+    started = time.perf_counter()
+    while True:
+      batch_started = time.perf_counter()
+      claimed = process_batch(batch_size)
+      if not claimed:
+        break
+      batches += 1
+      latency.observe((time.perf_counter() - batch_started) * 1000)
+    return {'elapsed': time.perf_counter() - started, 'latency': latency, 'batches': batches}
+
+  def _format(self, label, histogram):
+    snapshot = histogram.snapshot()
+    if not snapshot['count']:
+      return f"{label}: no samples"
+    return (
+      f"{label}: n={snapshot['count']} | mean {snapshot['mean_ms']:.1f}ms | p50 <={snapshot['p50_ms']:.0f}ms | "
+      f"p95 <={snapshot['p95_ms']:.0f}ms | max {snapshot['max_ms']:.1f}ms"
+    )
+
+  def _report(self, options, events, sent, ingest, drain):
+    stored = StripeWebhookEvent.objects.count()
+    results = Counter(StripeWebhookEvent.objects.values_list('result', flat=True))
+    self.stdout.write(self.style.SUCCESS(
+      f"{len(sent)} signed events posted in {ingest['elapsed']:.2f}s "
+      f"({len(sent) / ingest['elapsed']:.0f} events/s, concurrency {options['concurrency']}); "
+      f"{stored} stored, {len(sent) - stored} duplicates dropped"
+    ))
+    self.stdout.write(self._format("webhook (verify + store)", ingest['latency']))
+    self.stdout.write(
+      f"processed {stored} events in {drain['batches']} batches, {drain['elapsed']:.2f}s "
+      f"({stored / drain['elapsed']:.0f} events/s)" if drain['elapsed'] else "nothing processed"
+    )
+    self.stdout.write(self._format("handler batch", drain['latency']))
+    self.stdout.write(f"responses: {dict(ingest['statuses'])}; results: {dict(results)}")
+    self.stdout.write(
+      f"state: {Payment.objects.filter(status='succeeded').count()}/{options['orders']} payments succeeded | "
+      f"{DeliveryQuote.objects.filter(status='pending').count()}/{options['orders']} quotes pending | "
+      f"{SavedPaymentMethod.objects.filter(exp_year=2031).count()}/{options['orders']} cards up to date"
+    )
+    if stored != len(events):
+      self.stdout.write(self.style.WARNING(f"expected {len(events)} unique events, stored {stored}"))
@@ -0,0 +1,17 @@
+from common_utils.inbox_worker import InboxWorkerCommand
+from payment.stripe_events import STRIPE_EVENT_BATCH_SIZE, STRIPE_EVENT_LEASE_SECONDS, process_batch, prune_processed_events
+
+
+class Command(InboxWorkerCommand):
+  help = "Drain the Stripe event store: run the typed handlers (payment_intent, payment_method, checkout) in batches"
+  label = 'Stripe events'
+  default_batch_size = STRIPE_EVENT_BATCH_SIZE
+  default_lease_seconds = STRIPE_EVENT_LEASE_SECONDS
+  # Past Stripe's 3-day retry window, so late retries still dedupe
+  default_keep_days = 30
+
+  def process_batch(self, batch_size, lease_seconds):
+    return process_batch(batch_size, lease_seconds)
+
+  def prune_processed_events(self, older_than):
+    return prune_processed_events(older_than)
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+import stripe
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payment.models import Payment
+from payment.payment_intents import TERMINAL_PAYMENT_INTENT_STATUSES, apply_payment_intent, handle_payment_delivery_sync
+
+
+class Command(BaseCommand):
+  help = (
+    "Compare the local PaymentIntent mirror (Payment) with Stripe and fix drift "
+    "from missed or failed payment_intent webhooks"
+  )
+
+  def add_arguments(self, parser):
+    parser.add_argument('--since-hours', type=int, default=72,
+                        help="List every PaymentIntent created in this window (100 per API call)")
+    parser.add_argument('--max-retrieve', type=int, default=200,
+                        help="Older payments still in a non-terminal status are retrieved one by one, up to this many")
+    parser.add_argument('--dry-run', action='store_true')
+
+  def handle(self, *args, **options):
+    self.dry_run = options['dry_run']
+    self.checked = self.drifted = self.missing = 0
+    since = timezone.now() - timedelta(hours=options['since_hours'])
+
+    # Recent intents: one list call per 100 instead of one retrieve per payment
+    local = {
+      payment.stripe_payment_intent_id: payment
+      for payment in Payment.objects.filter(created_at__gte=since - timedelta(hours=1)).select_related('order')
+    }
+    seen = set()
+    unmatched = {}
+    for intent in stripe.PaymentIntent.list(created={'gte': int(since.timestamp())}, limit=100).auto_paging_iter():
+      payment = local.get(intent['id'])
+      if payment is not None:
+        seen.add(intent['id'])
+        self._reconcile(payment, intent)
+      else:
+        unmatched[intent['id']] = intent
+
+    # Payment rows come from the first payment_intent webhook; if that was missed there is no row yet
+    for payment in Payment.objects.filter(stripe_payment_intent_id__in=list(unmatched)).select_related('order'):
+      seen.add(payment.stripe_payment_intent_id)
+      self._reconcile(payment, unmatched.pop(payment.stripe_payment_intent_id))
+    for intent in unmatched.values():
+      self._backfill(intent)
+
+    # Older payments Stripe may still move (e.g. requires_capture)
+    stragglers = Payment.objects.exclude(status__in=TERMINAL_PAYMENT_INTENT_STATUSES) \
+      .exclude(stripe_payment_intent_id__in=seen).select_related('order').order_by('created_at')[:options['max_retrieve']]
+    for payment in stragglers:
+      try:
+        intent = stripe.PaymentIntent.retrieve(payment.stripe_payment_intent_id)
+      except stripe.error.StripeError as e:
+        print(f"Could not retrieve PI {payment.stripe_payment_intent_id}: {str(e)}")
+        continue
+      self._reconcile(payment, intent)
+
+    verb = "would fix" if self.dry_run else "fixed"
+    self.stdout.write(self.style.SUCCESS(
+      f"Checked {self.checked} payments, {verb} {self.drifted} drifted; "
+      f"{'would create' if self.dry_run else 'created'} {self.missing} missing"
+    ))
+
+  def _reconcile(self, payment, intent):
+    self.checked += 1
+    if payment.status == intent['status'] and payment.amount_received_cents == intent.get('amount_received'):
+      return
+
+    self.drifted += 1
+    self.stdout.write(f"PI {intent['id']}: mirror {payment.status} → stripe {intent['status']}")
+    if self.dry_run:
+      return
+    # A retrieve/list is Stripe's current state, so it outranks any event seen so far
+    updated, changed = apply_payment_intent(intent, observed_at=timezone.now())
+    if updated and changed:
+      handle_payment_delivery_sync(updated.order, updated.status)
+
+  def _backfill(self, intent):
+    metadata = intent.get('metadata') or {}
+    if not (metadata.get('order_uuid') or metadata.get('order_id')):
+      return  # Not created by this app
+
+    if self.dry_run:
+      self.missing += 1
+      self.stdout.write(f"PI {intent['id']}: no local payment → stripe {intent['status']}")
+      return
+    # Creates the Payment from the intent's order metadata
+    payment, changed = apply_payment_intent(intent, observed_at=timezone.now())
+    if payment is None:
+      return
+    self.missing += 1
+    self.stdout.write(f"PI {intent['id']}: no local payment → stripe {intent['status']}")
+    if changed:
+      handle_payment_delivery_sync(payment.order, payment.status)
@@ -0,0 +1,34 @@
+import stripe
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from payment.saved_cards import refresh_saved_cards
+
+
+class Command(BaseCommand):
+  help = (
+    "Copy customers' Stripe cards into the SavedPaymentMethod mirror. Run once to backfill, "
+    "or with --all to repair drift from missed payment_method webhooks"
+  )
+
+  def add_arguments(self, parser):
+    parser.add_argument('--all', action='store_true', help="Resync customers that were already mirrored too")
+    parser.add_argument('--user', type=int, action='append', dest='user_ids')
+
+  def handle(self, *args, **options):
+    users = User.objects.exclude(stripe_customer_id__isnull=True).exclude(stripe_customer_id='')
+    if options['user_ids']:
+      users = users.filter(id__in=options['user_ids'])
+    elif not options['all']:
+      users = users.filter(stripe_cards_synced_at__isnull=True)
+
+    synced = cards = failed = 0
+    for user in users.iterator():
+      try:
+        cards += len(refresh_saved_cards(user))
+        synced += 1
+      except stripe.error.StripeError as e:
+        failed += 1
+        print(f"Could not sync cards for user {user.id}: {str(e)}")
+
+    self.stdout.write(self.style.SUCCESS(f"Synced {cards} cards for {synced} customers ({failed} failed)"))
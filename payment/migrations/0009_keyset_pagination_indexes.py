@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0026_store_search_index'),
+        ('payment', '0008_order_parent_deivery_order_pickup_deivery_and_more'),
+        ('uber', '0016_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['service_provider', 'status', 'created_at'], name='payment_ord_service_06fae1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'status', 'created_at'], name='payment_ord_user_id_22a1c8_idx'),
+        ),
+    ]
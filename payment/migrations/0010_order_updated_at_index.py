@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0026_store_search_index'),
+        ('payment', '0009_keyset_pagination_indexes'),
+        ('uber', '0016_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='payment_ord_updated_c3aaf3_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0010_order_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='amount_received_cents',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='last_payment_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='stripe_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='status',
+            field=models.CharField(default='pending', max_length=30),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0011_payment_intent_mirror'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedpaymentmethod',
+            name='country',
+            field=models.CharField(blank=True, max_length=2, null=True),
+        ),
+        migrations.AddField(
+            model_name='savedpaymentmethod',
+            name='name_on_card',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='savedpaymentmethod',
+            name='synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='savedpaymentmethod',
+            name='stripe_payment_method_id',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0012_saved_card_mirror'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('event_type', models.CharField(db_index=True, max_length=100)),
+                ('object_id', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('stripe_created', models.DateTimeField(blank=True, null=True)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.CharField(blank=True, choices=[('applied', 'Applied'), ('coalesced', 'Coalesced'), ('ignored', 'Ignored'), ('failed', 'Failed')], max_length=20, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['processed_at', 'id'], name='payment_str_process_da9c59_idx')],
+            },
+        ),
+    ]
@@ -13,13 +13,15 @@ from accounts.models import LaundrymartStore, User
 class SavedPaymentMethod(models.Model):
   """Store references to user's payment methods in Stripe"""
   user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payment_methods')
-  stripe_payment_method_id = models.CharField(max_length=100)
+  stripe_payment_method_id = models.CharField(max_length=100, db_index=True)
 
   # Store display info only (non-sensitive)
   last4 = models.CharField(max_length=4)
   card_brand = models.CharField(max_length=20)  # visa, mastercard, etc.
   exp_month = models.IntegerField()
   exp_year = models.IntegerField()
+  name_on_card = models.CharField(max_length=100, blank=True, null=True)
+  country = models.CharField(max_length=2, blank=True, null=True)
 
   # Optional: store a recognizable name for the card
   nickname = models.CharField(max_length=50, blank=True, null=True)
@@ -29,6 +31,8 @@ class SavedPaymentMethod(models.Model):
 
   # When the card was added
   created_at = models.DateTimeField(auto_now_add=True)
+  # When Stripe produced the state we mirror (event.created, or the time of a list); older events are ignored
+  synced_at = models.DateTimeField(blank=True, null=True)
 
   class Meta:
     ordering = ['-is_default', '-created_at']
@@ -100,6 +104,11 @@ class Order(models.Model):
       models.Index(fields=['status']),
       models.Index(fields=['user']),
       models.Index(fields=['stripe_customer_id']),
+      # Keyset pagination of the vendor/customer order lists
+      models.Index(fields=['service_provider', 'status', 'created_at']),
+      models.Index(fields=['user', 'status', 'created_at']),
+      # Incremental vendor analytics rollups
+      models.Index(fields=['updated_at']),
     ]
     ordering = ['-created_at']
 
@@ -132,8 +141,51 @@ class Payment(models.Model):
   order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='payment')
   stripe_payment_intent_id = models.CharField(max_length=100, unique=True)
   amount_cents = models.PositiveIntegerField()
-  status = models.CharField(max_length=20, default='pending')  # succeeded, failed, etc.
+  status = models.CharField(max_length=30, default='pending')  # PaymentIntent status, mirrored from Stripe webhooks
+  amount_received_cents = models.PositiveIntegerField(blank=True, null=True)
+  last_payment_error = models.TextField(blank=True, null=True)
+  # When Stripe produced the state we mirror (event.created); older events are ignored
+  stripe_updated_at = models.DateTimeField(blank=True, null=True)
+  synced_at = models.DateTimeField(blank=True, null=True)
   created_at = models.DateTimeField(auto_now_add=True)
 
   def __str__(self):
-    return f"Payment {self.stripe_payment_intent_id} for Order {self.order.uuid}"
\ No newline at end of file
+    return f"Payment {self.stripe_payment_intent_id} for Order {self.order.uuid}"
+
+STRIPE_EVENT_RESULT_CHOICES=[
+  ('applied', 'Applied'),
+  ('coalesced', 'Coalesced'),
+  ('ignored', 'Ignored'),
+  ('failed', 'Failed'),
+]
+class StripeWebhookEvent(models.Model):
+  """
+  Stripe event store, one row per event id. The webhook view only verifies
+  the signature and inserts here (retries of the same event are no-ops);
+  process_stripe_webhooks runs the typed handlers in batches.
+  """
+  event_id = models.CharField(max_length=255, unique=True)
+  event_type = models.CharField(max_length=100, db_index=True)
+  # data.object.id (pi_..., pm_..., cs_...), for grouping a batch per Stripe object
+  object_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
+  stripe_created = models.DateTimeField(blank=True, null=True)
+  payload = models.JSONField()
+  received_at = models.DateTimeField(auto_now_add=True)
+
+  # Set while a worker holds the row; expired leases get picked up again
+  lease_expires_at = models.DateTimeField(blank=True, null=True)
+  # Written by the claiming UPDATE; a worker only processes rows carrying its own token
+  lease_token = models.UUIDField(blank=True, null=True)
+  attempts = models.PositiveIntegerField(default=0)
+  processed_at = models.DateTimeField(blank=True, null=True)
+  result = models.CharField(max_length=20, blank=True, null=True, choices=STRIPE_EVENT_RESULT_CHOICES)
+  last_error = models.TextField(blank=True, null=True)
+
+  class Meta:
+    ordering = ['id']
+    indexes = [
+      models.Index(fields=['processed_at', 'id']),
+    ]
+
+  def __str__(self):
+    return f"{self.event_type} {self.event_id} ({self.result or 'pending'})"
@@ -0,0 +1,130 @@
+from datetime import datetime, timezone as dt_timezone
+
+import stripe
+from django.db import transaction
+from django.utils import timezone
+
+from laundrymart import settings
+from payment.models import Order, Payment
+
+stripe.api_key = settings.STRIPE_SECRET_KEY
+
+# Same-second Stripe events are ordered by how far along the intent is
+PAYMENT_INTENT_STATUS_RANK = {
+  'requires_payment_method': 0,
+  'requires_confirmation': 1,
+  'requires_action': 2,
+  'processing': 3,
+  'requires_capture': 4,
+  'succeeded': 5,
+  'canceled': 5,
+}
+TERMINAL_PAYMENT_INTENT_STATUSES = ('succeeded', 'canceled')
+
+
+def _from_unix(value):
+  return datetime.fromtimestamp(value, tz=dt_timezone.utc) if value else None
+
+
+def _order_for_intent(intent):
+  metadata = intent.get('metadata') or {}
+  if metadata.get('order_uuid'):
+    return Order.objects.filter(uuid=metadata['order_uuid']).first()
+  if metadata.get('order_id'):
+    return Order.objects.filter(pk=metadata['order_id']).first()
+  return None
+
+
+def _is_stale(payment, status, observed_at):
+  if payment.stripe_updated_at is None or observed_at is None:
+    return False
+  if observed_at != payment.stripe_updated_at:
+    return observed_at < payment.stripe_updated_at
+  return PAYMENT_INTENT_STATUS_RANK.get(status, -1) < PAYMENT_INTENT_STATUS_RANK.get(payment.status, -1)
+
+
+def apply_payment_intent(intent, observed_at):
+  """
+  Mirrors a PaymentIntent object (from a webhook or a retrieve/list) onto
+  its Payment row. `observed_at` is when Stripe produced that snapshot;
+  older snapshots are ignored. Creates the Payment from the intent's
+  order metadata if we don't have one yet.
+  Returns (payment, status_changed); payment is None if the intent isn't ours.
+  """
+  with transaction.atomic():
+    payment = Payment.objects.select_for_update().select_related('order') \
+      .filter(stripe_payment_intent_id=intent['id']).first()
+    if payment is None:
+      order = _order_for_intent(intent)
+      if order is None:
+        print(f"PaymentIntent {intent['id']} has no matching order")
+        return None, False
+      if Payment.objects.filter(order=order).exists():
+        print(f"Order {order.uuid} already has a payment; ignoring PaymentIntent {intent['id']}")
+        return None, False
+      payment = Payment(order=order, stripe_payment_intent_id=intent['id'], amount_cents=intent.get('amount') or 0)
+      previous_status = None
+    else:
+      previous_status = payment.status
+      if _is_stale(payment, intent['status'], observed_at):
+        return payment, False
+
+    error = intent.get('last_payment_error') or {}
+    payment.status = intent['status']
+    payment.amount_cents = intent.get('amount') or payment.amount_cents
+    payment.amount_received_cents = intent.get('amount_received')
+    payment.last_payment_error = error.get('message')
+    payment.stripe_updated_at = observed_at
+    payment.synced_at = timezone.now()
+    payment.save()
+
+  changed = previous_status != payment.status
+  if changed:
+    print(f"Order {payment.order.uuid} Stripe sync | PI {payment.stripe_payment_intent_id} → {payment.status}")
+  return payment, changed
+
+
+def apply_payment_intent_event(event):
+  """payment_intent.* webhook → mirror, then the payment/delivery business rules."""
+  intent = event['data']['object']
+  payment, changed = apply_payment_intent(intent, _from_unix(event.get('created')))
+  if payment and changed:
+    handle_payment_delivery_sync(payment.order, payment.status)
+  return payment
+
+
+def mirrored_payment_status(order):
+  """The order's PaymentIntent status from the local mirror (no Stripe call), or None."""
+  try:
+    payment = order.payment
+  except Payment.DoesNotExist:
+    return None
+  return payment.status if payment.stripe_payment_intent_id else None
+
+
+def handle_payment_delivery_sync(order, pi_status):
+  """
+  Business logic when payment + delivery status align
+  Examples for your post-paid laundry flow:
+  """
+  # Example 1: Delivery completed + payment succeeded → mark order fully complete
+  if (order.status == 'completed' and pi_status in ['succeeded', 'requires_capture']):
+    if order.status != 'completed':  # idempotent
+      order.status = 'completed'
+      print(f"Order {order.uuid} fully completed (payment+delivery)")
+
+  # Example 2: Delivery canceled + payment pending → cancel/refund payment
+  elif (order.status == 'canceled' and pi_status == 'requires_capture'):
+    try:
+      stripe.PaymentIntent.cancel(
+        order.payment.stripe_payment_intent_id,
+        cancellation_reason='requested_by_customer|abandoned'
+      )
+      print(f"Auto-canceled PI for canceled order {order.uuid}")
+    except stripe.error.StripeError:
+      pass  # let manual refund handle it
+
+  # Example 3: Payment failed + delivery in progress → notify store/customer
+  elif (pi_status in ['requires_payment_method', 'requires_confirmation'] and
+        order.status in ['picked_up', 'delivery_en_route']):
+    print(f"Payment issue detected on active delivery {order.uuid}")
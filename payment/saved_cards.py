@@ -0,0 +1,207 @@
+from datetime import datetime, timezone as dt_timezone
+from uuid import uuid4
+
+import stripe
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from laundrymart import settings
+from payment.models import SavedPaymentMethod
+
+stripe.api_key = settings.STRIPE_SECRET_KEY
+
+SAVED_CARDS_CACHE_PREFIX = 'saved_cards'
+# Webhooks invalidate on every change; the TTL only bounds a missed invalidation
+SAVED_CARDS_CACHE_TTL = 24 * 3600
+
+
+def _version_key(user_id):
+  return f'{SAVED_CARDS_CACHE_PREFIX}:version:{user_id}'
+
+
+def _cache_key(user_id):
+  """
+  Key for the user's current card list version. A reader takes the key
+  before loading rows, so if a change commits meanwhile its cache.set lands
+  on the old version and is never read.
+  """
+  version_key = _version_key(user_id)
+  version = cache.get(version_key)
+  if version is None:
+    version = uuid4().hex
+    cache.add(version_key, version, timeout=SAVED_CARDS_CACHE_TTL)
+    version = cache.get(version_key, version)
+  return f'{SAVED_CARDS_CACHE_PREFIX}:{user_id}:{version}'
+
+
+def _invalidate(user_id):
+  def bump():
+    try:
+      cache.set(_version_key(user_id), uuid4().hex, timeout=SAVED_CARDS_CACHE_TTL)
+    except Exception as e:
+      print(f"Saved card cache unavailable: {str(e)}")
+  # After commit, so a read that starts after the bump sees the new rows
+  transaction.on_commit(bump)
+
+
+def _from_unix(value):
+  return datetime.fromtimestamp(value, tz=dt_timezone.utc) if value else None
+
+
+def _card_fields(pm):
+  card = pm['card']
+  billing = pm.get('billing_details') or {}
+  return {
+    'last4': card['last4'],
+    'card_brand': card['brand'],
+    'exp_month': card['exp_month'],
+    'exp_year': card['exp_year'],
+    'name_on_card': billing.get('name'),
+    'country': card.get('country'),
+  }
+
+
+def _as_card(saved):
+  return {
+    'id': saved.stripe_payment_method_id,
+    'brand': saved.card_brand,
+    'last4': saved.last4,
+    'name_on_card': saved.name_on_card,
+    'exp_month': saved.exp_month,
+    'exp_year': saved.exp_year,
+    'country': saved.country,
+    'is_default': saved.is_default,
+  }
+
+
+def _promote_default(user_id):
+  if SavedPaymentMethod.objects.filter(user_id=user_id, is_default=True).exists():
+    return
+  newest = SavedPaymentMethod.objects.filter(user_id=user_id).order_by('-created_at').first()
+  if newest:
+    newest.is_default = True
+    newest.save(update_fields=['is_default'])
+
+
+def mirror_payment_method(pm, user=None, observed_at=None):
+  """
+  Upserts a Stripe card PaymentMethod into SavedPaymentMethod. The owner is
+  `user` or whoever has the PM's customer id. `observed_at` is when Stripe
+  produced this snapshot (event.created; now for a list/retrieve); older
+  snapshots than the row holds are ignored. Returns the row, or None
+  if the PM isn't a card attached to one of our customers.
+  """
+  if pm.get('type') != 'card' or not pm.get('card'):
+    return None
+  if user is None:
+    if not pm.get('customer'):
+      return None
+    user = User.objects.filter(stripe_customer_id=pm['customer']).first()
+    if user is None:
+      print(f"PaymentMethod {pm['id']} belongs to unknown customer {pm['customer']}")
+      return None
+
+  with transaction.atomic():
+    saved = SavedPaymentMethod.objects.select_for_update() \
+      .filter(user=user, stripe_payment_method_id=pm['id']).first()
+    if saved is None:
+      saved = SavedPaymentMethod(
+        user=user,
+        stripe_payment_method_id=pm['id'],
+        # If this is the user's first payment method, make it the default
+        is_default=not SavedPaymentMethod.objects.filter(user=user).exists(),
+      )
+    elif observed_at and saved.synced_at and observed_at < saved.synced_at:
+      return saved
+    for field, value in _card_fields(pm).items():
+      setattr(saved, field, value)
+    saved.synced_at = observed_at or timezone.now()
+    saved.save()
+    _invalidate(user.id)
+  return saved
+
+
+def remove_payment_method(payment_method_id):
+  """Drops a detached card from the mirror."""
+  with transaction.atomic():
+    rows = list(SavedPaymentMethod.objects.filter(stripe_payment_method_id=payment_method_id))
+    for saved in rows:
+      saved.delete()
+      _promote_default(saved.user_id)
+      _invalidate(saved.user_id)
+  return len(rows)
+
+
+def apply_payment_method_event(event):
+  """payment_method.attached / updated / detached webhook → mirror."""
+  pm = event['data']['object']
+  if event['type'] == 'payment_method.detached' or not pm.get('customer'):
+    remove_payment_method(pm['id'])
+    return None
+  return mirror_payment_method(pm, observed_at=_from_unix(event.get('created')))
+
+
+def refresh_saved_cards(user):
+  """
+  Replaces the user's mirrored cards with Stripe's list (one paged list
+  call). Used to backfill customers and by the sync_saved_cards command.
+  """
+  if not user.stripe_customer_id:
+    return []
+  payment_methods = list(stripe.PaymentMethod.list(
+    customer=user.stripe_customer_id, type='card', limit=100,
+  ).auto_paging_iter())
+
+  with transaction.atomic():
+    for pm in payment_methods:
+      mirror_payment_method(pm, user=user)
+    stale = SavedPaymentMethod.objects.filter(user=user) \
+      .exclude(stripe_payment_method_id__in=[pm['id'] for pm in payment_methods])
+    if stale.exists():
+      stale.delete()
+      _promote_default(user.id)
+    user.stripe_cards_synced_at = timezone.now()
+    user.save(update_fields=['stripe_cards_synced_at'])
+    _invalidate(user.id)
+  return payment_methods
+
+
+def saved_cards(user):
+  """
+  The user's cards as dicts (default first), from the cache or the
+  SavedPaymentMethod mirror. Only a customer whose cards were never mirrored
+  costs a Stripe call, once.
+  """
+  try:
+    key = _cache_key(user.id)
+    cards = cache.get(key)
+  except Exception as e:
+    print(f"Saved card cache unavailable: {str(e)}")
+    key = cards = None
+  if cards is not None:
+    return cards
+
+  if user.stripe_customer_id and user.stripe_cards_synced_at is None:
+    try:
+      refresh_saved_cards(user)
+    except stripe.error.StripeError as e:
+      # Serve whatever we have; the next read tries again
+      print(f"Could not backfill saved cards for user {user.id}: {str(e)}")
+      return [_as_card(saved) for saved in SavedPaymentMethod.objects.filter(user=user)]
+    # The backfill bumped the version; cache under the new one
+    try:
+      key = _cache_key(user.id)
+    except Exception as e:
+      print(f"Saved card cache unavailable: {str(e)}")
+      key = None
+
+  cards = [_as_card(saved) for saved in SavedPaymentMethod.objects.filter(user=user)]
+  if key is None:
+    return cards
+  try:
+    cache.set(key, cards, timeout=SAVED_CARDS_CACHE_TTL)
+  except Exception as e:
+    print(f"Saved card cache unavailable: {str(e)}")
+  return cards
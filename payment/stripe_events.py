@@ -0,0 +1,219 @@
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import LaundrymartStore
+from common_utils import inbox
+from payment.models import StripeWebhookEvent
+from payment.payment_intents import PAYMENT_INTENT_STATUS_RANK, apply_payment_intent_event
+from payment.saved_cards import apply_payment_method_event
+from uber.models import DeliveryQuote
+from vendor_push_notification.utils import vendor_accept_or_reject_notification
+
+STRIPE_EVENT_BATCH_SIZE = 200
+STRIPE_EVENT_LEASE_SECONDS = 60
+STRIPE_EVENT_MAX_ATTEMPTS = 5
+STRIPE_EVENT_RETRY_DELAY_SECONDS = 5
+
+# Same-second payment_method events: a detach is final (Stripe never re-attaches a detached PM)
+PAYMENT_METHOD_EVENT_RANK = {
+  'payment_method.attached': 0,
+  'payment_method.updated': 1,
+  'payment_method.automatically_updated': 1,
+  'payment_method.detached': 2,
+}
+# Quotes past card setup; a checkout.session.completed replay must not move or re-notify them
+QUOTE_SETUP_DONE_STATUSES = ('pending', 'accepted', 'rejected')
+
+
+def _from_unix(value):
+  return datetime.fromtimestamp(value, tz=dt_timezone.utc) if value else None
+
+
+def enqueue_stripe_event(event):
+  """
+  Stores a verified Stripe event (the parsed webhook body). One INSERT;
+  a retry of an event id we already hold is dropped by the unique key.
+  """
+  obj = (event.get('data') or {}).get('object') or {}
+  StripeWebhookEvent.objects.bulk_create([StripeWebhookEvent(
+    event_id=event['id'],
+    event_type=event['type'],
+    object_id=obj.get('id'),
+    stripe_created=_from_unix(event.get('created')),
+    payload=event,
+  )], ignore_conflicts=True)
+
+
+def _latest_per_object(events, rank):
+  """Groups events by Stripe object and splits them into (newest per object, older ones)."""
+  by_object = defaultdict(list)
+  for event in events:
+    by_object[event.object_id].append(event)
+  latest, older = [], []
+  for group in by_object.values():
+    newest = max(group, key=lambda event: (event.payload.get('created') or 0, rank(event), event.id))
+    latest.append(newest)
+    older.extend(event.id for event in group if event is not newest)
+  return latest, older
+
+
+# Typed handlers. Each gets the batch's rows for its event types and returns
+# ({result: [row ids]}, [(rows, error)]); rows in the second list are retried.
+# Handlers must be idempotent: a row can run again after a crash or lease expiry.
+
+def handle_payment_intent_events(events):
+  latest, coalesced = _latest_per_object(
+    events, lambda event: PAYMENT_INTENT_STATUS_RANK.get(event.payload['data']['object'].get('status'), -1)
+  )
+  applied, failed = [], []
+  for event in latest:
+    try:
+      # Older snapshots than the mirror holds are ignored inside
+      apply_payment_intent_event(event.payload)
+      applied.append(event.id)
+    except Exception as e:
+      print(f"Stripe {event.event_type} failed for {event.object_id}: {str(e)}")
+      failed.append(([event], str(e)))
+  return {'applied': applied, 'coalesced': coalesced}, failed
+
+
+def handle_payment_method_events(events):
+  latest, coalesced = _latest_per_object(events, lambda event: PAYMENT_METHOD_EVENT_RANK.get(event.event_type, 1))
+  # A detach stored in an earlier batch is a tombstone: a late attach/update must not resurrect the card
+  detached = set(StripeWebhookEvent.objects.filter(
+    event_type='payment_method.detached', object_id__in=[event.object_id for event in latest],
+  ).values_list('object_id', flat=True))
+
+  applied, failed = [], []
+  for event in latest:
+    payload = event.payload
+    if event.object_id in detached and event.event_type != 'payment_method.detached':
+      payload = dict(payload, type='payment_method.detached')
+    try:
+      apply_payment_method_event(payload)
+      applied.append(event.id)
+    except Exception as e:
+      print(f"Stripe {event.event_type} failed for {event.object_id}: {str(e)}")
+      failed.append(([event], str(e)))
+  return {'applied': applied, 'coalesced': coalesced}, failed
+
+
+def _stores_by_id(store_ids):
+  valid = set()
+  for store_id in store_ids:
+    try:
+      valid.add(uuid.UUID(str(store_id)))
+    except ValueError:
+      continue
+  return {str(store.store_id): store for store in LaundrymartStore.objects.filter(store_id__in=valid)}
+
+
+def handle_checkout_session_events(events):
+  """
+  checkout.session.completed (mode=setup): card saved, so the quote goes to
+  'pending' and the store is notified. One locked quote query and one store
+  query for the whole batch; quotes already past setup are left alone.
+  """
+  quote_events = defaultdict(list)
+  ignored = []
+  for event in events:
+    session = event.payload['data']['object']
+    pending_quote_id = (session.get('metadata') or {}).get('pending_quote_id')
+    if session.get('mode') != 'setup' or not pending_quote_id:
+      ignored.append(event.id)
+      continue
+    quote_events[str(pending_quote_id)].append(event)
+
+  with transaction.atomic():
+    quotes = list(
+      DeliveryQuote.objects.select_for_update()
+      .filter(id__in=list(quote_events)).exclude(status__in=QUOTE_SETUP_DONE_STATUSES)
+    )
+    for quote in quotes:
+      quote.status = 'pending'
+      # A real save, so the vendor dashboard counter signals see the transition
+      quote.save(update_fields=['status'])
+
+  stores = _stores_by_id(quote.external_store_id for quote in quotes)
+  for quote in quotes:
+    laundrymart = stores.get(str(quote.external_store_id))
+    if laundrymart is None:
+      print(f"Store not found for quote {quote.quote_id} (external_store_id: {quote.external_store_id})")
+      continue
+    try:
+      vendor_accept_or_reject_notification(quote, laundrymart)
+      print(
+        f"Vendor notified after successful card setup | "
+        f"Quote: {quote.quote_id} → pending | "
+        f"Store: {laundrymart.laundrymart_name}"
+      )
+    except Exception as e:
+      # The quote is already pending; a retry wouldn't notify again either
+      print(f"Vendor notification failed for quote {quote.quote_id}: {str(e)}")
+
+  found = {str(quote.id) for quote in quotes}
+  missing = [quote_id for quote_id in quote_events if quote_id not in found]
+  if missing:
+    print(f"Quotes not found or already past card setup: {missing}")
+  applied = [event.id for group in quote_events.values() for event in group]
+  return {'applied': applied, 'ignored': ignored}, []
+
+
+STRIPE_EVENT_HANDLERS = {
+  'payment_intent': handle_payment_intent_events,
+  'payment_method': handle_payment_method_events,
+  'checkout.session.completed': handle_checkout_session_events,
+}
+
+
+def _handler_for(event_type):
+  return STRIPE_EVENT_HANDLERS.get(event_type) or STRIPE_EVENT_HANDLERS.get(event_type.split('.')[0])
+
+
+def claim_batch(batch_size=STRIPE_EVENT_BATCH_SIZE, lease_seconds=STRIPE_EVENT_LEASE_SECONDS):
+  return inbox.claim_batch(StripeWebhookEvent, batch_size, lease_seconds)
+
+
+def process_batch(batch_size=STRIPE_EVENT_BATCH_SIZE, lease_seconds=STRIPE_EVENT_LEASE_SECONDS):
+  """
+  Claims one batch of stored events, hands each event type's rows to its
+  handler in one call, and settles the rows with one UPDATE per result.
+  Unknown event types are marked ignored. Returns the number of events claimed.
+  """
+  events = claim_batch(batch_size, lease_seconds)
+  if not events:
+    return 0
+
+  by_handler = defaultdict(list)
+  settled = defaultdict(list)
+  for event in events:
+    handler = _handler_for(event.event_type)
+    if handler is None:
+      settled['ignored'].append(event.id)
+    else:
+      by_handler[handler].append(event)
+
+  for handler, group in by_handler.items():
+    try:
+      results, failed = handler(group)
+    except Exception as e:
+      print(f"Stripe {handler.__name__} batch failed: {str(e)}")
+      results, failed = {}, [(group, str(e))]
+    for result, ids in results.items():
+      settled[result].extend(ids)
+    for rows, error in failed:
+      inbox.retry_later(StripeWebhookEvent, rows, error, STRIPE_EVENT_MAX_ATTEMPTS, STRIPE_EVENT_RETRY_DELAY_SECONDS)
+
+  now = timezone.now()
+  for result, ids in settled.items():
+    inbox.mark_processed(StripeWebhookEvent, ids, result, now)
+  return len(events)
+
+
+def prune_processed_events(older_than=timedelta(days=30)):
+  # Keep ids past Stripe's 3-day retry window so late retries still dedupe
+  return inbox.prune_processed(StripeWebhookEvent, older_than)
@@ -1,3 +1,233 @@
-from django.test import TestCase
+import io
+import json
+import uuid
+from collections import Counter
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import LaundrymartStore, User
+from payment import stripe_events
+from payment.management.commands.benchmark_stripe_webhooks import BENCHMARK_SECRET, sign
+from payment.models import Order, Payment, SavedPaymentMethod, StripeWebhookEvent
+from payment.payment_intents import apply_payment_intent_event
+from payment.saved_cards import apply_payment_method_event, saved_cards
+from uber import webhook_inbox
+from uber.models import DeliveryQuote
+from vendor.models import VendorDailyStats
+
+
+def intent_event(status, created, order=None, intent_id='pi_mirror', amount_received=0):
+  intent = {
+    'id': intent_id, 'object': 'payment_intent', 'status': status, 'amount': 2500,
+    'amount_received': amount_received, 'last_payment_error': None,
+    'metadata': {'order_uuid': str(order.uuid)} if order else {},
+  }
+  return {'id': f'evt_{status}_{created}', 'type': f'payment_intent.{status}', 'created': created, 'data': {'object': intent}}
+
+
+class PaymentIntentMirrorTests(TestCase):
+  def setUp(self):
+    customer = User.objects.create_user(email='mirror-customer@example.com', password=None, is_active=True)
+    store = LaundrymartStore.objects.create(laundrymart_name='Mirror Laundry', lat=40.7128, lng=-74.0060)
+    self.order = Order.objects.create(user=customer, service_provider=store, status='card_saved')
+
+  def test_creates_payment_from_order_metadata(self):
+    payment = apply_payment_intent_event(intent_event('requires_capture', 1700000000, order=self.order))
+    self.assertEqual((payment.order_id, payment.status, payment.amount_cents), (self.order.id, 'requires_capture', 2500))
+
+  def test_ignores_events_older_than_the_mirror(self):
+    apply_payment_intent_event(intent_event('requires_capture', 1700000000, order=self.order))
+    apply_payment_intent_event(intent_event('succeeded', 1700000100, amount_received=2500))
+    apply_payment_intent_event(intent_event('processing', 1700000050))
+    # Same second: the further-along status wins
+    apply_payment_intent_event(intent_event('requires_capture', 1700000100))
+
+    payment = Payment.objects.get(stripe_payment_intent_id='pi_mirror')
+    self.assertEqual((payment.status, payment.amount_received_cents), ('succeeded', 2500))
+
+  def test_delivery_sync_reads_the_mirror_without_calling_stripe(self):
+    apply_payment_intent_event(intent_event('requires_capture', 1700000000, order=self.order))
+    self.order.refresh_from_db()
+    with mock.patch('stripe.PaymentIntent.retrieve') as retrieve, \
+        mock.patch('uber.webhook_inbox.handle_payment_delivery_sync') as sync:
+      webhook_inbox._sync_stripe_payment(self.order)
+    retrieve.assert_not_called()
+    sync.assert_called_once_with(self.order, 'requires_capture')
+
+  def test_reconcile_creates_payments_whose_webhooks_were_missed(self):
+    intent = intent_event('requires_capture', 1700000000, order=self.order, intent_id='pi_missed')['data']['object']
+    listing = mock.Mock()
+    listing.auto_paging_iter.return_value = [intent, dict(intent, id='pi_other_app', metadata={})]
+    with mock.patch('stripe.PaymentIntent.list', return_value=listing), \
+        mock.patch('payment.management.commands.reconcile_payment_intents.handle_payment_delivery_sync') as sync:
+      call_command('reconcile_payment_intents', stdout=io.StringIO())
+
+    payment = Payment.objects.get()
+    self.assertEqual((payment.stripe_payment_intent_id, payment.order_id, payment.status),
+                     ('pi_missed', self.order.id, 'requires_capture'))
+    sync.assert_called_once_with(self.order, 'requires_capture')
+
+
+def card(pm_id, customer='cus_mirror', last4='4242', exp_year=2030):
+  return {
+    'id': pm_id, 'object': 'payment_method', 'type': 'card', 'customer': customer,
+    'card': {'brand': 'visa', 'last4': last4, 'exp_month': 12, 'exp_year': exp_year, 'country': 'US'},
+    'billing_details': {'name': 'Pat Doe'},
+  }
+
+
+def card_event(event_type, pm):
+  return {'id': f'evt_{event_type}_{pm["id"]}', 'type': event_type, 'data': {'object': pm}}
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SavedCardMirrorTests(TestCase):
+  def setUp(self):
+    cache.clear()
+    self.customer = User.objects.create_user(email='cards-customer@example.com', password=None, is_active=True)
+    self.customer.stripe_customer_id = 'cus_mirror'
+    self.customer.save()
+
+  def test_webhooks_maintain_the_mirror(self):
+    with self.captureOnCommitCallbacks(execute=True):
+      apply_payment_method_event(card_event('payment_method.attached', card('pm_1')))
+      apply_payment_method_event(card_event('payment_method.attached', card('pm_2', last4='1111')))
+      apply_payment_method_event(card_event('payment_method.updated', card('pm_1', exp_year=2031)))
+      apply_payment_method_event(card_event('payment_method.detached', dict(card('pm_1'), customer=None)))
+
+    remaining = SavedPaymentMethod.objects.get(user=self.customer)
+    self.assertEqual((remaining.stripe_payment_method_id, remaining.is_default), ('pm_2', True))
+
+  def test_cards_are_served_without_listing_stripe(self):
+    with self.captureOnCommitCallbacks(execute=True):
+      apply_payment_method_event(card_event('payment_method.attached', card('pm_1')))
+    self.customer.stripe_cards_synced_at = timezone.now()
+    self.customer.save()
+
+    with mock.patch('stripe.PaymentMethod.list') as stripe_list:
+      cards = saved_cards(self.customer)
+      self.assertEqual(saved_cards(self.customer), cards)
+    stripe_list.assert_not_called()
+    self.assertEqual([(c['id'], c['name_on_card'], c['is_default']) for c in cards], [('pm_1', 'Pat Doe', True)])
+
+  def test_detach_during_a_cache_miss_is_not_cached_back(self):
+    with self.captureOnCommitCallbacks(execute=True):
+      apply_payment_method_event(card_event('payment_method.attached', card('pm_1')))
+    self.customer.stripe_cards_synced_at = timezone.now()
+    self.customer.save()
+
+    # The reader loads the rows, then the detach commits before its cache.set
+    original_set = cache.set
+    racing = [True]
+    def detach_first(key, value, timeout=None):
+      if racing:
+        racing.pop()
+        with self.captureOnCommitCallbacks(execute=True):
+          apply_payment_method_event(card_event('payment_method.detached', dict(card('pm_1'), customer=None)))
+      return original_set(key, value, timeout=timeout)
+    with mock.patch('payment.saved_cards.cache.set', side_effect=detach_first):
+      self.assertEqual([c['id'] for c in saved_cards(self.customer)], ['pm_1'])
+    self.assertEqual(saved_cards(self.customer), [])
+
+  def test_unmirrored_customer_is_backfilled_once(self):
+    listing = mock.Mock()
+    listing.auto_paging_iter.return_value = [card('pm_9')]
+    with mock.patch('stripe.PaymentMethod.list', return_value=listing) as stripe_list, \
+        self.captureOnCommitCallbacks(execute=True):
+      saved_cards(self.customer)
+    cache.clear()
+    with mock.patch('stripe.PaymentMethod.list') as second_list:
+      self.assertEqual([c['id'] for c in saved_cards(self.customer)], ['pm_9'])
+    stripe_list.assert_called_once()
+    second_list.assert_not_called()
+
+
+@override_settings(
+  CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+  CUSTOMER_CONFIRM_ORDER_STRIPE_WEBHOOK_SECRET=BENCHMARK_SECRET,
+)
+class StripeEventStoreTests(TestCase):
+  def setUp(self):
+    cache.clear()
+    self.customer = User.objects.create_user(email='events-customer@example.com', password=None, is_active=True)
+    self.customer.stripe_customer_id = 'cus_mirror'
+    self.customer.save()
+    self.store = LaundrymartStore.objects.create(
+      laundrymart_name='Events Laundry', lat=40.7128, lng=-74.0060, store_id=uuid.uuid4()
+    )
+
+  def post(self, event, signature=None):
+    body = json.dumps(event)
+    return self.client.post(
+      reverse('webhook-request-sent'), data=body, content_type='application/json',
+      HTTP_STRIPE_SIGNATURE=signature or sign(body),
+    )
+
+  def test_webhook_stores_each_event_once(self):
+    event = dict(card_event('payment_method.attached', card('pm_1')), created=1700000000)
+    self.assertEqual(self.post(event).status_code, 200)
+    self.assertEqual(self.post(event).status_code, 200)
+    self.assertEqual(self.post(event, signature='t=1,v1=forged').status_code, 400)
+
+    stored = StripeWebhookEvent.objects.get()
+    self.assertEqual((stored.event_id, stored.object_id, stored.processed_at), (event['id'], 'pm_1', None))
+    self.assertFalse(SavedPaymentMethod.objects.exists())
+
+  def test_replayed_card_setup_notifies_vendor_once(self):
+    quote = DeliveryQuote.objects.create(customer=self.customer, quote_id='dqt_events', external_store_id=str(self.store.store_id))
+    session = {'id': 'cs_1', 'object': 'checkout.session', 'mode': 'setup', 'metadata': {'pending_quote_id': str(quote.id)}}
+    with mock.patch('payment.stripe_events.vendor_accept_or_reject_notification') as notify:
+      self.post({'id': 'evt_cs_1', 'type': 'checkout.session.completed', 'created': 1700000000, 'data': {'object': session}})
+      stripe_events.process_batch()
+      # Same session redelivered under a new event id
+      self.post({'id': 'evt_cs_2', 'type': 'checkout.session.completed', 'created': 1700000001, 'data': {'object': session}})
+      stripe_events.process_batch()
+
+    quote.refresh_from_db()
+    self.assertEqual(quote.status, 'pending')
+    notify.assert_called_once()
+    self.assertEqual(set(StripeWebhookEvent.objects.values_list('result', flat=True)), {'applied'})
+
+  def test_batched_card_setup_updates_vendor_pending_counter(self):
+    quotes = [
+      DeliveryQuote.objects.create(customer=self.customer, quote_id=f'dqt_count{i}', external_store_id=str(self.store.store_id))
+      for i in range(2)
+    ]
+    for i, quote in enumerate(quotes):
+      session = {'id': f'cs_count{i}', 'object': 'checkout.session', 'mode': 'setup', 'metadata': {'pending_quote_id': str(quote.id)}}
+      self.post({'id': f'evt_count{i}', 'type': 'checkout.session.completed', 'created': 1700000000, 'data': {'object': session}})
+    with mock.patch('payment.stripe_events.vendor_accept_or_reject_notification'):
+      stripe_events.process_batch()
+
+    stats = VendorDailyStats.objects.get(laundrymart=self.store)
+    self.assertEqual(stats.pending_quotes, 2)
+
+    # Vendor accepts one: pending moves to accepted instead of going negative
+    accepted = DeliveryQuote.objects.get(pk=quotes[0].pk)
+    accepted.status = 'accepted'
+    accepted.save(update_fields=['status'])
+    stats.refresh_from_db()
+    self.assertEqual((stats.pending_quotes, stats.accepted_quotes), (1, 1))
+
+  def test_late_attach_does_not_resurrect_detached_card(self):
+    with self.captureOnCommitCallbacks(execute=True):
+      self.post(dict(card_event('payment_method.detached', dict(card('pm_1'), customer=None)), created=1700000100))
+      stripe_events.process_batch()
+      self.post(dict(card_event('payment_method.updated', card('pm_2', exp_year=2031)), created=1700000100))
+      self.post(dict(card_event('payment_method.attached', card('pm_1')), created=1700000000))
+      self.post(dict(card_event('payment_method.attached', card('pm_2')), created=1700000000))
+      self.assertEqual(stripe_events.process_batch(), 3)
+
+    self.assertEqual(list(SavedPaymentMethod.objects.values_list('stripe_payment_method_id', 'exp_year')), [('pm_2', 2031)])
+    results = Counter(StripeWebhookEvent.objects.values_list('result', flat=True))
+    self.assertEqual(results, {'applied': 3, 'coalesced': 1})
+
+  def test_unknown_event_types_are_ignored(self):
+    self.post({'id': 'evt_other', 'type': 'customer.created', 'created': 1700000000, 'data': {'object': {'id': 'cus_x'}}})
+    self.assertEqual(stripe_events.process_batch(), 1)
+    self.assertEqual(StripeWebhookEvent.objects.get().result, 'ignored')
@@ -2,7 +2,9 @@
 import stripe
 from django.conf import settings
 
-from payment.models import PendingStripeOrder, SavedPaymentMethod
+from accounts.models import User
+from payment.models import PendingStripeOrder
+from payment.saved_cards import mirror_payment_method, saved_cards
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
@@ -52,43 +54,10 @@ def create_setup_checkout_session(order, success_url, cancel_url):
 
 def sync_payment_method(user, payment_method_id):
     """Save payment method reference to database"""
-    import stripe
-    from django.conf import settings
-
-    stripe.api_key = settings.STRIPE_SECRET_KEY
-
     try:
       # Retrieve the payment method details from Stripe
       pm = stripe.PaymentMethod.retrieve(payment_method_id)
-
-      # Check if this payment method already exists in our DB
-      existing = SavedPaymentMethod.objects.filter(
-        user=user,
-        stripe_payment_method_id=payment_method_id
-      ).first()
-
-      if existing:
-        # Update the existing record
-        existing.last4 = pm.card.last4
-        existing.card_brand = pm.card.brand
-        existing.exp_month = pm.card.exp_month
-        existing.exp_year = pm.card.exp_year
-        existing.save()
-        return existing
-
-      # Create a new record
-      payment_method = SavedPaymentMethod.objects.create(
-        user=user,
-        stripe_payment_method_id=payment_method_id,
-        last4=pm.card.last4,
-        card_brand=pm.card.brand,
-        exp_month=pm.card.exp_month,
-        exp_year=pm.card.exp_year,
-        # If this is the user's first payment method, make it the default
-        is_default=not SavedPaymentMethod.objects.filter(user=user).exists()
-      )
-
-      return payment_method
+      return mirror_payment_method(pm, user=user)
 
     except Exception as e:
       print(f"Error syncing payment method: {str(e)}")
@@ -134,33 +103,21 @@ def create_setup_intent(stripe_customer_id: str, metadata: dict = None) -> Dict[
 def list_saved_payment_methods(stripe_customer_id: str) -> List[Dict[str, Any]]:
   """
   List all saved card payment methods for a Stripe customer.
+  Served from the SavedPaymentMethod mirror (kept current by payment_method.* webhooks).
 
   Args:
       stripe_customer_id: Stripe Customer ID from user.stripe_customer_id
   Returns:
       List of payment method dicts with card details
   """
-  try:
-    payment_methods = stripe.PaymentMethod.list(
-      customer=stripe_customer_id,
-      type="card"
-    )
-
-    cards = []
-    for pm in payment_methods.data:
-      cards.append({
-        "id": pm.id,
-        "brand": pm.card.brand,
-        "last4": pm.card.last4,
-        "exp_month": pm.card.exp_month,
-        "exp_year": pm.card.exp_year,
-      })
-
-    return cards
-
-  except stripe.error.StripeError as e:
-    print(f"Stripe error listing payment methods: {str(e)}")
+  user = User.objects.filter(stripe_customer_id=stripe_customer_id).first()
+  if user is None:
     return []
+  try:
+    return [
+      {key: card[key] for key in ("id", "brand", "last4", "exp_month", "exp_year")}
+      for card in saved_cards(user)
+    ]
   except Exception as e:
     print(f"Unexpected error listing payment methods: {str(e)}")
-    return []
\ No newline at end of file
+    return []
@@ -3,6 +3,7 @@ from uuid import uuid4
 
 import requests
 import stripe
+from django.conf import settings
 from django.db import transaction
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, render
@@ -17,11 +18,13 @@ from rest_framework.views import APIView
 
 from accounts.models import LaundrymartStore, User
 from laundrymart.permissions import IsCustomer
-from laundrymart.settings import CUSTOMER_CONFIRM_ORDER_STRIPE_WEBHOOK_SECRET
 from payment.models import Order, PendingStripeOrder
+from payment.saved_cards import remove_payment_method, saved_cards
+from payment.stripe_events import enqueue_stripe_event
 from payment.serializers import ConfirmOrderSerializer
 from payment.utils import create_or_get_stripe_customer, create_pending_stripe_order
 from uber.models import DeliveryQuote
+from uber.quote_cache import evict_quote
 from uber.serializers import DeliveryQuoteCreateSerializer, UberCreateQuoteSerializer
 from uber.utils import create_and_save_delivery, save_delivery_quote
 from vendor_push_notification.utils import vendor_accept_or_reject_notification
@@ -40,43 +43,41 @@ class ConfirmOrderAPIView(APIView):
     request=DeliveryQuoteCreateSerializer
   )
   def post(self, request):
-    with transaction.atomic():
-      serializer = DeliveryQuoteCreateSerializer(data=request.data)
-      serializer.is_valid(raise_exception=True)
+    serializer = DeliveryQuoteCreateSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
 
-      service_type = serializer.validated_data.get("service_type")
+    service_type = serializer.validated_data.get("service_type")
 
-      # Ensure Stripe customer exists (create if needed)
-      stripe_customer_result = create_or_get_stripe_customer(request.user)
-      if not stripe_customer_result:
-        return Response({"error": "Failed to initialize payment customer"}, status=500)
+    # Ensure Stripe customer exists (create if needed)
+    stripe_customer_result = create_or_get_stripe_customer(request.user)
+    if not stripe_customer_result:
+      return Response({"error": "Failed to initialize payment customer"}, status=500)
 
-      stripe_customer_id = stripe_customer_result['customer_id']
+    stripe_customer_id = stripe_customer_result['customer_id']
 
-      # Retrieve attached payment methods (optimized: single API call)
-      try:
-        payment_methods = stripe.PaymentMethod.list(
-          customer=stripe_customer_id,
-          type="card",
-          limit=100,
-        )
-        has_saved_cards = len(payment_methods.data) > 0
-      except Exception as e:
-        return Response({"error": f"Failed to retrieve payment methods: {str(e)}"}, status=500)
+    # Saved cards come from the local mirror; a never-mirrored customer's one-off
+    # Stripe backfill runs here, before the transaction
+    try:
+      saved = saved_cards(request.user)
+      has_saved_cards = len(saved) > 0
+    except Exception as e:
+      return Response({"error": f"Failed to retrieve payment methods: {str(e)}"}, status=500)
 
+    with transaction.atomic():
       # Create the pending DeliveryQuote using serializer.save()
       # We inject required fields that are not in request.data: customer and default status
       pending_quote = serializer.save(customer=request.user)
+      evict_quote(pending_quote.quote_id)
 
       if has_saved_cards:
         cards = []
-        for pm in payment_methods.data:
+        for card in saved:
           cards.append({
-            'id': pm.id,
-            'brand': pm.card.brand.capitalize(),
-            'last4': pm.card.last4,
-            'exp_month': pm.card.exp_month,
-            'exp_year': pm.card.exp_year,
+            'id': card['id'],
+            'brand': card['brand'].capitalize(),
+            'last4': card['last4'],
+            'exp_month': card['exp_month'],
+            'exp_year': card['exp_year'],
             # 'pending_quote': str(pending_quote.id),   ← not needed here
           })
 
@@ -219,21 +220,25 @@ class SelectPaymentMethodForQuoteAPIView(APIView):
 
 @require_POST
 @csrf_exempt
-@transaction.atomic
 def stripe_webhook_confirm_order(request):
   """
-  Stripe webhook - handles successful card setup (checkout.session.completed mode=setup)
-  Updates DeliveryQuote to 'pending' and notifies vendor
+  Stripe webhook - verifies the signature, stores the event (keyed by event.id,
+  so Stripe retries are no-ops) and returns 200. process_stripe_webhooks runs the
+  handlers: card setup (checkout.session.completed mode=setup → quote pending +
+  vendor notified), payment_intent.* (PaymentIntent mirror) and payment_method.*
+  (saved-card mirror). See payment.stripe_events.
   """
   payload = request.body
   sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
 
   try:
-    event = stripe.Webhook.construct_event(
-      payload,
+    stripe.WebhookSignature.verify_header(
+      payload.decode("utf-8"),
       sig_header,
-      CUSTOMER_CONFIRM_ORDER_STRIPE_WEBHOOK_SECRET
+      settings.CUSTOMER_CONFIRM_ORDER_STRIPE_WEBHOOK_SECRET,
+      stripe.Webhook.DEFAULT_TOLERANCE,
     )
+    event = json.loads(payload)
   except ValueError:
     print("Invalid payload")
     return HttpResponse(status=400)
@@ -241,54 +246,7 @@ def stripe_webhook_confirm_order(request):
     print("Webhook signature verification failed")
     return HttpResponse(status=400)
 
-  if event["type"] == "checkout.session.completed":
-    session = event["data"]["object"]
-
-    if session.get("mode") != "setup":
-      return HttpResponse(status=200)
-
-    pending_quote_id = session.metadata.get("pending_quote_id")
-    if not pending_quote_id:
-      print("No pending_quote_id in session metadata")
-      return HttpResponse(status=200)
-
-    try:
-      # Lock the quote row to prevent concurrent modifications
-      quote = DeliveryQuote.objects.select_for_update().get(id=pending_quote_id)
-
-      # Mark quote as ready for vendor review
-      quote.status = 'pending'
-      quote.save(update_fields=['status'])
-
-      # Optional: you could also store payment method reference here if needed later
-      # quote.stripe_payment_method_id = session.payment_method   # ← if you add this field
-      # quote.save(update_fields=['status', 'stripe_payment_method_id'])
-
-      # Find the assigned laundry store
-      # (assuming you set external_store_id when creating quote)
-      if quote.external_store_id:
-        try:
-          laundrymart = LaundrymartStore.objects.get(
-            store_id=quote.external_store_id  # or whatever field you use to link
-          )
-          vendor_accept_or_reject_notification(quote, laundrymart)
-
-          print(
-            f"Vendor notified after successful card setup | "
-            f"Quote: {quote.quote_id} → pending | "
-            f"Store: {laundrymart.laundrymart_name}"
-          )
-        except LaundrymartStore.DoesNotExist:
-          print(f"Store not found for quote {quote.quote_id} "
-                         f"(external_store_id: {quote.external_store_id})")
-      else:
-        print(f"No external_store_id set on quote {quote.quote_id}")
-
-    except DeliveryQuote.DoesNotExist:
-      print(f"Quote not found: {pending_quote_id}")
-    except Exception as e:
-      print("Error processing successful card setup webhook")
-
+  enqueue_stripe_event(event)
   return HttpResponse(status=200)
 
 # @csrf_exempt
@@ -496,23 +454,16 @@ def list_cards_from_stripe(request):
     else:
       customer_id = request.user.stripe_customer_id
 
-    # Fetch payment methods directly from Stripe
-    payment_methods = stripe.PaymentMethod.list(
-      customer=customer_id,
-      type="card"
-    )
-
-    # Format card data for the frontend
+    # Saved cards mirror (kept current by payment_method.* webhooks)
     cards = []
-    for pm in payment_methods.data:
+    for card in saved_cards(request.user):
       cards.append({
-        'id': pm.id,
-        'brand': pm.card.brand,
-        'last4': pm.card.last4,
-        'exp_month': pm.card.exp_month,
-        'exp_year': pm.card.exp_year,
-        # Stripe doesn't track which card is default in their API
-        # You would need to store this separately if needed
+        'id': card['id'],
+        'brand': card['brand'],
+        'last4': card['last4'],
+        'exp_month': card['exp_month'],
+        'exp_year': card['exp_year'],
+        'is_default': card['is_default'],
       })
 
     return Response({
@@ -539,22 +490,17 @@ def retrieve_saved_cards(request):
         'success': True,
       }, status=200)
 
-    # List saved payment methods from Stripe
-    payment_methods = stripe.PaymentMethod.list(
-      customer=request.user.stripe_customer_id,
-      type="card"
-    )
-
+    # Saved cards mirror (kept current by payment_method.* webhooks)
     cards = []
-    for pm in payment_methods.data:
+    for card in saved_cards(request.user):
       cards.append({
-        'id': pm.id,
-        'brand': pm.card.brand,
-        'last4': pm.card.last4,
-        'name_on_card': pm.billing_details.name,
-        'exp_month': pm.card.exp_month,
-        'exp_year': pm.card.exp_year,
-        'country': pm.card.country
+        'id': card['id'],
+        'brand': card['brand'],
+        'last4': card['last4'],
+        'name_on_card': card['name_on_card'],
+        'exp_month': card['exp_month'],
+        'exp_year': card['exp_year'],
+        'country': card['country']
       })
 
     return Response({
@@ -591,6 +537,8 @@ def delete_saved_card(request, payment_method_id):
 
     # Detach (delete) the payment method from the customer
     stripe.PaymentMethod.detach(payment_method_id)
+    # Don't wait for the payment_method.detached webhook to hide it
+    remove_payment_method(payment_method_id)
 
     return Response({
       'success': True,
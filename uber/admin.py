@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from uber.models import Delivery, DeliveryQuote, ManifestItem
+from uber.models import Delivery, DeliveryQuote, ManifestItem, UberWebhookEvent
 
 # Register your models here.
 admin.site.register(Delivery)
@@ -9,3 +9,10 @@ class DeliveryQuoteAdmin(admin.ModelAdmin):
     search_fields = ('quote_id', 'external_store_id', 'customer__email')
 admin.site.register(DeliveryQuote, DeliveryQuoteAdmin)
 admin.site.register(ManifestItem)
+
+
+class UberWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event_type', 'delivery_id', 'result', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('result', 'event_type')
+    search_fields = ('delivery_id', 'event_id')
+admin.site.register(UberWebhookEvent, UberWebhookEventAdmin)
@@ -0,0 +1,113 @@
+import asyncio
+import time
+import weakref
+
+import httpx
+from asgiref.sync import sync_to_async
+
+from uber.cache_access_token import UBER_BASE_URL, memoized_uber_access_token, uber_headers
+from uber.client import backoff_delay, get_uber_client
+from uber.quote_cache import aget_cached_quote, aset_cached_quote, quote_cache_key
+
+UBER_HTTP_TIMEOUT = 10
+UBER_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+
+# httpx connections are bound to the event loop that opened them, so keep one
+# pooled client per loop. Under Daphne that is a single long-lived client.
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+  loop = asyncio.get_running_loop()
+  client = _clients.get(loop)
+  if client is None or client.is_closed:
+    client = httpx.AsyncClient(base_url=UBER_BASE_URL, timeout=UBER_HTTP_TIMEOUT, limits=UBER_POOL_LIMITS)
+    _clients[loop] = client
+  return client
+
+
+async def async_uber_headers():
+  token = memoized_uber_access_token()
+  if token:
+    return uber_headers(token)
+  # Token lookup/refresh uses the cache and requests; keep it off the event loop
+  return await sync_to_async(uber_headers)()
+
+
+async def async_request(endpoint, method, path, **kwargs):
+  """
+  UberClient.request for the event loop: same ENDPOINT_POLICIES (timeouts,
+  retry statuses, attempts, backoff) and the same latency/status stats,
+  sent over the per-loop httpx pool. Callers still raise_for_status.
+  """
+  client = get_uber_client()
+  policy = client.policies[endpoint]
+  connect, read = policy.timeout
+  kwargs.setdefault('timeout', httpx.Timeout(read, connect=connect))
+  # Follow the process-wide client's base URL (reset_uber_client points both at a stub/simulator)
+  url = f"{client.base_url}{path}"
+
+  for attempt in range(policy.attempts):
+    last_attempt = attempt == policy.attempts - 1
+    started = time.perf_counter()
+    try:
+      response = await get_async_client().request(method, url, **kwargs)
+    except httpx.TransportError as e:
+      client.record(endpoint, started, type(e).__name__)
+      retriable = isinstance(e, httpx.ConnectTimeout) or (
+        policy.retry_after_send and isinstance(e, (httpx.NetworkError, httpx.TimeoutException))
+      )
+      if last_attempt or not retriable:
+        raise
+      print(f"Uber {endpoint} attempt {attempt + 1} failed ({type(e).__name__}), retrying")
+      await asyncio.sleep(backoff_delay(attempt))
+      continue
+
+    client.record(endpoint, started, response.status_code)
+    if response.status_code in policy.retry_statuses and not last_attempt:
+      print(f"Uber {endpoint} attempt {attempt + 1} got {response.status_code}, retrying")
+      await asyncio.sleep(backoff_delay(attempt, response))
+      continue
+    return response
+
+
+async def create_quote_async(customer_id, payload, headers=None):
+  headers = headers or await async_uber_headers()
+  resp = await async_request('delivery_quotes', 'POST', f"/customers/{customer_id}/delivery_quotes", headers=headers, json=payload)
+  resp.raise_for_status()
+  return resp.json()
+
+
+async def cached_quote_async(customer_id, service_type, payload, ready_dt=None, headers=None, user_id=None):
+  """
+  create_quote_async behind the quote cache: the same customer repeating a
+  request for the same route/ready window/manifest value gets the still-valid
+  quote (same quote_id) instead of another Uber call, until it's saved.
+  """
+  key = quote_cache_key(service_type, payload, ready_dt, user_id)
+  quote = await aget_cached_quote(key)
+  if quote:
+    return quote
+  quote = await create_quote_async(customer_id, payload, headers)
+  await aset_cached_quote(key, quote)
+  return quote
+
+
+async def create_full_service_quotes_async(customer_id, payload_to_vendor, payload_to_customer, ready_dt=None, user_id=None):
+  """
+  Async create_full_service_quotes: both legs are requested concurrently,
+  so latency is the slower leg rather than the sum of both.
+  """
+  quote1, quote2 = await asyncio.gather(
+    cached_quote_async(customer_id, 'full_service:to_vendor', payload_to_vendor, ready_dt, user_id=user_id),  # customer -> vendor
+    cached_quote_async(customer_id, 'full_service:to_customer', payload_to_customer, ready_dt, user_id=user_id),  # vendor -> customer
+  )
+
+  # Combine fees
+  combined_fee = quote1["fee"] + quote2["fee"]
+
+  return {
+    "first_quote": quote1,
+    "second_quote": quote2,
+    "combined_fee": combined_fee
+  }
@@ -1,41 +1,90 @@
 # utils/uber.py or services/uber_client.py
-import requests
+import threading
+import time
+from contextlib import contextmanager
+from uuid import uuid4
+
 from laundrymart import settings
 from django.core.cache import cache
 from django.utils import timezone
 
+from uber.client import get_uber_client
+
 UBER_TOKEN_CACHE_KEY = 'uber_direct:access_token'  # prefixed for clarity
+UBER_TOKEN_LOCK_KEY = f'{UBER_TOKEN_CACHE_KEY}:lock'
 UBER_TOKEN_EXPIRES_MARGIN = 86400  # Refresh 1 day before expiry (safe for 30-day tokens)
-UBER_BASE_URL='https://api.uber.com/v1'
+UBER_TOKEN_LOCK_TIMEOUT = 30  # Lock auto-expires if the refreshing worker dies
+UBER_TOKEN_LOCK_WAIT = 15  # How long other workers wait for the refresh to land
+UBER_BASE_URL=settings.UBER_BASE_URL
 
 UBER_CLIENT_ID=settings.UBER_CLIENT_ID
 UBER_CLIENT_SECRET=settings.UBER_CLIENT_SECRET
 
-def get_uber_access_token():
+# Per-process copy of the cached token, so uber_headers() doesn't cost a Redis GET
+_memo = {}
+_memo_lock = threading.Lock()
+_background_refresh = threading.Lock()
+
+
+def _now():
+  return timezone.now()
+
+
+def _remember(token_data):
+  with _memo_lock:
+    _memo.clear()
+    _memo.update(token_data)
+
+
+def _usable(token_data):
+  return bool(token_data) and token_data.get('expires_at', _now()) > _now()
+
+
+def _needs_refresh(token_data):
+  refresh_at = token_data.get('refresh_at') or token_data['expires_at'] - timezone.timedelta(seconds=UBER_TOKEN_EXPIRES_MARGIN)
+  return refresh_at <= _now()
+
+
+@contextmanager
+def _refresh_lock(blocking=True):
   """
-  Get cached Uber Direct access token, refresh if missing or about to expire.
-  Works perfectly with Redis cache across all workers.
+  Cluster-wide lock around the OAuth call. django-redis exposes a real Redis
+  lock; other cache backends fall back to cache.add (SET NX) with an owner id.
+  Yields whether the lock was acquired.
   """
-  token_data = cache.get(UBER_TOKEN_CACHE_KEY)
+  if hasattr(cache, 'lock'):
+    lock = cache.lock(UBER_TOKEN_LOCK_KEY, timeout=UBER_TOKEN_LOCK_TIMEOUT, blocking_timeout=UBER_TOKEN_LOCK_WAIT)
+    acquired = lock.acquire(blocking=blocking)
+    try:
+      yield acquired
+    finally:
+      if acquired:
+        try:
+          lock.release()
+        except Exception as e:
+          print(f"Uber token lock release failed: {str(e)}")
+    return
 
-  if token_data and token_data.get('expires_at', timezone.now()) > timezone.now():
-    return token_data['access_token']
-  print(UBER_CLIENT_ID, UBER_CLIENT_SECRET)
-
-  # Fetch new token from Uber
-  response = requests.post(
-    'https://auth.uber.com/oauth/v2/token',
-    headers={
-      'Content-Type': 'application/x-www-form-urlencoded',
-    },
-    data={
-      'client_id': UBER_CLIENT_ID,
-      'client_secret': UBER_CLIENT_SECRET,
-      'grant_type': 'client_credentials',
-      'scope': 'eats.deliveries',
-    },
-    timeout=10
-  )
+  owner = uuid4().hex
+  deadline = time.monotonic() + (UBER_TOKEN_LOCK_WAIT if blocking else 0)
+  acquired = cache.add(UBER_TOKEN_LOCK_KEY, owner, timeout=UBER_TOKEN_LOCK_TIMEOUT)
+  while not acquired and time.monotonic() < deadline:
+    time.sleep(0.05)
+    acquired = cache.add(UBER_TOKEN_LOCK_KEY, owner, timeout=UBER_TOKEN_LOCK_TIMEOUT)
+  try:
+    yield acquired
+  finally:
+    if acquired and cache.get(UBER_TOKEN_LOCK_KEY) == owner:
+      cache.delete(UBER_TOKEN_LOCK_KEY)
+
+
+def _fetch_token():
+  response = get_uber_client().fetch_token({
+    'client_id': UBER_CLIENT_ID,
+    'client_secret': UBER_CLIENT_SECRET,
+    'grant_type': 'client_credentials',
+    'scope': 'eats.deliveries',
+  })
 
   # ADD THIS: Check for HTTP errors and parse error response
   if response.status_code != 200:
@@ -48,24 +97,106 @@ def get_uber_access_token():
     raise Exception(f"Invalid JSON from Uber OAuth: {response.text}")
 
   if 'access_token' not in data:
-    raise Exception(f"Missing access_token in Uber response: {data}")
+    raise Exception(f"Missing access_token in Uber OAuth response (keys: {sorted(data)})")
 
   # Store with expiry info
-  expires_at = timezone.now() + timezone.timedelta(seconds=data.get('expires_in', 2592000))
-  cached_data = {
+  expires_in = data.get('expires_in', 2592000)
+  expires_at = _now() + timezone.timedelta(seconds=expires_in)
+  token_data = {
     'access_token': data['access_token'],
     'expires_at': expires_at,
+    'refresh_at': expires_at - timezone.timedelta(seconds=min(UBER_TOKEN_EXPIRES_MARGIN, expires_in // 2)),
   }
 
-  # Cache for slightly less than actual expiry
-  cache_ttl = data.get('expires_in', 2592000) - UBER_TOKEN_EXPIRES_MARGIN
-  cache.set(UBER_TOKEN_CACHE_KEY, cached_data, timeout=cache_ttl)
+  # Keep the entry until real expiry so workers can serve it while one refreshes ahead of time
+  cache.set(UBER_TOKEN_CACHE_KEY, token_data, timeout=expires_in)
+  _remember(token_data)
+  return token_data
+
+
+def refresh_uber_access_token(blocking=True):
+  """
+  Single-flight refresh: only the worker holding the lock calls Uber, the
+  rest wait for it and pick the new token up from the cache. Returns the
+  token data, or None when not blocking and another worker is refreshing.
+  """
+  with _refresh_lock(blocking=blocking) as acquired:
+    # Someone may have refreshed while we were waiting for the lock
+    token_data = cache.get(UBER_TOKEN_CACHE_KEY)
+    if _usable(token_data) and not _needs_refresh(token_data):
+      _remember(token_data)
+      return token_data
+
+    if acquired:
+      return _fetch_token()
+
+    if not blocking:
+      return None
+    if _usable(token_data):
+      _remember(token_data)
+      return token_data
+    # Lock holder never finished (died or Uber is slow); don't leave this request without a token
+    print("Uber token lock wait timed out, fetching token directly")
+    return _fetch_token()
+
+
+def _refresh_in_background():
+  # One background refresh per process at a time
+  if not _background_refresh.acquire(blocking=False):
+    return
+
+  def run():
+    try:
+      refresh_uber_access_token(blocking=False)
+    except Exception as e:
+      print(f"Background Uber token refresh failed: {str(e)}")
+    finally:
+      _background_refresh.release()
+
+  threading.Thread(target=run, daemon=True).start()
+
+
+def memoized_uber_access_token():
+  """The in-process token if it is still valid, without touching the cache."""
+  with _memo_lock:
+    token_data = dict(_memo)
+  if not _usable(token_data):
+    return None
+  if _needs_refresh(token_data):
+    _refresh_in_background()
+  return token_data['access_token']
+
+
+def get_uber_access_token():
+  """
+  Get the Uber Direct access token: in-process memo first, then the shared
+  cache, and a single-flight refresh when neither has a valid token.
+  Tokens inside the refresh margin are still served while a background
+  thread renews them.
+  """
+  token = memoized_uber_access_token()
+  if token:
+    return token
+
+  token_data = cache.get(UBER_TOKEN_CACHE_KEY)
+  if _usable(token_data):
+    _remember(token_data)
+    if _needs_refresh(token_data):
+      _refresh_in_background()
+    return token_data['access_token']
+
+  return refresh_uber_access_token()['access_token']
+
+
+def forget_uber_access_token():
+  """Clear the in-process memo (tests, or after Uber rejects the token)."""
+  with _memo_lock:
+    _memo.clear()
 
-  return data['access_token']
 
-def uber_headers():
+def uber_headers(token=None):
   return {
-    'Authorization': f'Bearer {get_uber_access_token()}',
+    'Authorization': f'Bearer {token or get_uber_access_token()}',
     'Content-Type': 'application/json',
     'Accept': 'application/json',
   }
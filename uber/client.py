@@ -0,0 +1,158 @@
+import random
+import threading
+import time
+from typing import NamedTuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from common_utils.metrics import HistogramRegistry
+from laundrymart import settings
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_BACKOFF_SECONDS = 5.0
+
+
+class EndpointPolicy(NamedTuple):
+  timeout: tuple  # (connect, read) seconds
+  retry_statuses: tuple
+  attempts: int
+  # Retry after connection resets/read timeouts too. Only safe where a
+  # duplicate request is harmless; connect failures are always retried.
+  retry_after_send: bool
+
+
+ENDPOINT_POLICIES = {
+  'oauth_token': EndpointPolicy(timeout=(3.05, 10), retry_statuses=RETRY_STATUSES, attempts=3, retry_after_send=True),
+  'delivery_quotes': EndpointPolicy(timeout=(3.05, 10), retry_statuses=RETRY_STATUSES, attempts=3, retry_after_send=True),
+  # Creating a delivery isn't idempotent: only retry when Uber rejected it outright
+  'deliveries': EndpointPolicy(timeout=(3.05, 15), retry_statuses=(429,), attempts=2, retry_after_send=False),
+}
+
+
+def backoff_delay(attempt, response=None):
+  """Seconds to wait before retry `attempt + 1`; honours Retry-After (requests or httpx response)."""
+  retry_after = response.headers.get('Retry-After') if response is not None else None
+  if retry_after:
+    try:
+      return min(float(retry_after), MAX_BACKOFF_SECONDS)
+    except ValueError:
+      pass
+  # Exponential with jitter: ~0.25s, 0.5s, 1s...
+  return min(0.25 * (2 ** attempt) * (0.5 + random.random() / 2), MAX_BACKOFF_SECONDS)
+
+
+class UberClient:
+  """
+  Process-wide Uber Direct HTTP client. One pooled keep-alive
+  requests.Session (so calls reuse TCP+TLS connections), per-endpoint
+  timeouts and retry/backoff, and a latency histogram per endpoint.
+  Use get_uber_client() rather than instantiating it per call.
+  """
+
+  def __init__(self, base_url=None, auth_url=None, pool_connections=4, pool_maxsize=32, policies=None, sleep=time.sleep):
+    self.base_url = (base_url or settings.UBER_BASE_URL).rstrip('/')
+    self.auth_url = auth_url or settings.UBER_AUTH_URL
+    self.policies = policies or ENDPOINT_POLICIES
+    self.latency = HistogramRegistry()
+    self.status_counts = {}
+    self._status_lock = threading.Lock()
+    self._sleep = sleep
+
+    self.session = requests.Session()
+    # Retries are handled per endpoint in request(); the adapter only sizes the pool
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=Retry(0, read=False))
+    self.session.mount('https://', adapter)
+    self.session.mount('http://', adapter)
+
+  def _count_status(self, endpoint, outcome):
+    with self._status_lock:
+      key = (endpoint, outcome)
+      self.status_counts[key] = self.status_counts.get(key, 0) + 1
+
+  def record(self, endpoint, started, outcome):
+    """Latency + outcome for one attempt; the async client reports here too."""
+    self.latency.observe(endpoint, (time.perf_counter() - started) * 1000)
+    self._count_status(endpoint, outcome)
+
+  def request(self, endpoint, method, url, **kwargs):
+    """
+    Sends the request under `endpoint`'s policy and returns the final
+    response (callers still raise_for_status). Raises the last
+    requests exception if every attempt failed to get a response.
+    """
+    policy = self.policies[endpoint]
+    kwargs.setdefault('timeout', policy.timeout)
+
+    for attempt in range(policy.attempts):
+      last_attempt = attempt == policy.attempts - 1
+      started = time.perf_counter()
+      try:
+        response = self.session.request(method, url, **kwargs)
+      except requests.RequestException as e:
+        self.record(endpoint, started, type(e).__name__)
+        retriable = isinstance(e, requests.ConnectTimeout) or (
+          policy.retry_after_send and isinstance(e, (requests.ConnectionError, requests.Timeout))
+        )
+        if last_attempt or not retriable:
+          raise
+        print(f"Uber {endpoint} attempt {attempt + 1} failed ({type(e).__name__}), retrying")
+        self._sleep(backoff_delay(attempt))
+        continue
+
+      self.record(endpoint, started, response.status_code)
+      if response.status_code in policy.retry_statuses and not last_attempt:
+        print(f"Uber {endpoint} attempt {attempt + 1} got {response.status_code}, retrying")
+        self._sleep(backoff_delay(attempt, response))
+        continue
+      return response
+
+  def post(self, endpoint, path, **kwargs):
+    return self.request(endpoint, 'POST', f"{self.base_url}{path}", **kwargs)
+
+  def fetch_token(self, data):
+    return self.request(
+      'oauth_token', 'POST', self.auth_url,
+      headers={'Content-Type': 'application/x-www-form-urlencoded'},
+      data=data,
+    )
+
+  def create_quote(self, customer_id, payload, headers):
+    resp = self.post('delivery_quotes', f"/customers/{customer_id}/delivery_quotes", headers=headers, json=payload)
+    resp.raise_for_status()
+    return resp.json()
+
+  def create_delivery(self, customer_id, payload, headers):
+    """Returns the raw response; callers decide how to surface Uber errors."""
+    return self.post('deliveries', f"/customers/{customer_id}/deliveries", headers=headers, json=payload)
+
+  def stats(self):
+    with self._status_lock:
+      statuses = {f'{endpoint}:{outcome}': count for (endpoint, outcome), count in sorted(self.status_counts.items(), key=str)}
+    return {'latency': self.latency.snapshot(), 'statuses': statuses}
+
+  def close(self):
+    self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_uber_client():
+  global _client
+  if _client is None:
+    with _client_lock:
+      if _client is None:
+        _client = UberClient()
+  return _client
+
+
+def reset_uber_client(client=None):
+  """Swap the process-wide client (tests point it at a stub server)."""
+  global _client
+  with _client_lock:
+    if _client is not None and _client is not client:
+      _client.close()
+    _client = client
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+
+# Where each Uber delivery status sits in the courier lifecycle. A status
+# can only be replaced by a later timestamp, or the same timestamp and a
+# higher rank (Uber's updated_at is second resolution).
+STATUS_RANK = {
+  'pending': 0,
+  'pickup': 1,
+  'pickup_complete': 2,
+  'dropoff': 3,
+  'delivered': 4,
+  'canceled': 4,
+  'returned': 5,
+}
+
+SEQUENCE_CACHE_PREFIX = 'uber_delivery_seq'
+SEEN_EVENT_CACHE_PREFIX = 'uber_event_seen'
+# Uber stops retrying a webhook well within a day; keep ids a bit longer
+SEEN_EVENT_TTL = 3 * 24 * 3600
+# Deliveries finish within hours; the Delivery row is the backstop after this
+SEQUENCE_TTL = 7 * 24 * 3600
+
+
+def _timestamp(value):
+  if isinstance(value, str):
+    value = parse_datetime(value)
+  return value.timestamp() if isinstance(value, datetime) else 0.0
+
+
+def sequence_key(status, courier_imminent, updated_at):
+  """Comparable (updated_at, status rank, imminent) tuple; higher is newer."""
+  return (_timestamp(updated_at), STATUS_RANK.get(status, -1), int(bool(courier_imminent)))
+
+
+def payload_sequence(payload):
+  return sequence_key(payload.get('status'), payload.get('courier_imminent'), payload.get('updated_at'))
+
+
+def delivery_sequence(delivery):
+  if not delivery.status:
+    return None
+  return sequence_key(delivery.status, delivery.courier_imminent, delivery.updated_at_uber)
+
+
+def mark_event_seen(event_id):
+  """
+  True the first time an event id is seen (atomic across workers), False for
+  a duplicate. Events without an id, or a cache outage, count as first seen.
+  """
+  if not event_id:
+    return True
+  try:
+    return cache.add(f'{SEEN_EVENT_CACHE_PREFIX}:{event_id}', 1, timeout=SEEN_EVENT_TTL)
+  except Exception as e:
+    print(f"Uber event dedupe unavailable: {str(e)}")
+    return True
+
+
+def forget_event(event_id):
+  """Undo mark_event_seen, e.g. when the event couldn't be stored and Uber will resend it."""
+  if not event_id:
+    return
+  try:
+    cache.delete(f'{SEEN_EVENT_CACHE_PREFIX}:{event_id}')
+  except Exception as e:
+    print(f"Uber event dedupe unavailable: {str(e)}")
+
+
+def high_water_marks(delivery_ids):
+  """Newest applied sequence per delivery id, in one cache round trip."""
+  keys = {f'{SEQUENCE_CACHE_PREFIX}:{delivery_id}': delivery_id for delivery_id in delivery_ids if delivery_id}
+  try:
+    found = cache.get_many(list(keys))
+  except Exception as e:
+    print(f"Uber delivery sequence cache unavailable: {str(e)}")
+    return {}
+  return {keys[key]: tuple(sequence) for key, sequence in found.items()}
+
+
+def advance_high_water_mark(delivery_id, sequence):
+  try:
+    cache.set(f'{SEQUENCE_CACHE_PREFIX}:{delivery_id}', sequence, timeout=SEQUENCE_TTL)
+  except Exception as e:
+    print(f"Uber delivery sequence cache unavailable: {str(e)}")
@@ -0,0 +1,266 @@
+import json
+import queue
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from accounts.models import LaundrymartStore, User
+from common_utils.benchmark import isolated_database
+from common_utils.metrics import LatencyHistogram
+from laundrymart.settings import UBER_CUSTOMER_ID
+from payment.models import Order
+from uber import cache_access_token
+from uber.cache_access_token import uber_headers
+from uber.client import UberClient, get_uber_client, reset_uber_client
+from uber.serializers import CreateDeliverySerializer, UberCreateQuoteSerializer
+from uber.models import Delivery, UberWebhookEvent
+from uber.simulator import UberSimulator
+from uber.utils import create_dropoff_quote, create_uber_delivery, save_delivery_quote, save_uber_delivery
+from uber.webhook_inbox import process_batch
+from uber.webhook_signature import sign_webhook_body
+
+# Keep the token/quote caches in-process so the run doesn't need Redis
+BENCHMARK_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+BENCHMARK_SIGNING_KEY = 'uber_benchmark_signing_key'
+
+
+class Command(BaseCommand):
+  help = (
+    "Drive quote -> accept -> Uber delivery -> delivery_status webhooks end to end "
+    "against the local Uber simulator and report order throughput and latency"
+  )
+
+  def add_arguments(self, parser):
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, action='append', dest='error_statuses')
+    parser.add_argument('--status-interval', type=float, default=0.05)
+    parser.add_argument('--duplicate-rate', type=float, default=0.0, help="Fraction of status webhooks redelivered later")
+    parser.add_argument('--seed', type=int, default=1)
+
+  def handle(self, *args, **options):
+    random.seed(options['seed'])
+    self.webhooks = queue.Queue()
+    simulator = UberSimulator(
+      latency_ms=options['latency_ms'],
+      jitter_ms=options['jitter_ms'],
+      error_rate=options['error_rate'],
+      error_statuses=options['error_statuses'] or (503,),
+      webhook=self.webhooks.put,
+      status_interval=options['status_interval'],
+      duplicate_rate=options['duplicate_rate'],
+      seed=options['seed'],
+    )
+
+    with override_settings(CACHES=BENCHMARK_CACHES, UBER_WEBHOOK_SIGNING_KEY=BENCHMARK_SIGNING_KEY), \
+        isolated_database(), simulator:
+      reset_uber_client(UberClient(base_url=simulator.base_url, auth_url=simulator.auth_url))
+      cache_access_token.forget_uber_access_token()
+      try:
+        self._run(simulator, options)
+      finally:
+        reset_uber_client()
+        cache_access_token.forget_uber_access_token()
+
+  def _run(self, simulator, options):
+    store, customers = self._seed()
+    # sqlite (the throwaway test DB) can't take concurrent writers; serialize DB work there
+    self.db_lock = threading.Lock() if connection.vendor == 'sqlite' else nullcontext()
+    self.flow_latency = LatencyHistogram()
+    self.e2e_latency = LatencyHistogram()
+    self.webhook_latency = LatencyHistogram()
+    self.batch_latency = LatencyHistogram()
+    self.batch_sizes = []
+    self.started_at = {}
+    self.awaiting_delivered = set()
+    self.finished = set()
+    failures = Counter()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+      futures = [pool.submit(self._order_flow, store, random.choice(customers), i) for i in range(options['orders'])]
+      pending = set(futures)
+      # Webhooks are applied on this thread while the workers keep creating orders
+      while pending:
+        self._drain_webhooks(timeout=0.05)
+        for future in [future for future in pending if future.done()]:
+          pending.discard(future)
+          error = future.exception()
+          if error:
+            failures[type(error).__name__] += 1
+    created_elapsed = time.perf_counter() - started
+
+    expected = len(self.started_at)
+    deadline = time.monotonic() + 30 + options['status_interval'] * 10
+    while self._completed() < expected and time.monotonic() < deadline:
+      self._drain_webhooks(timeout=0.1)
+    total_elapsed = time.perf_counter() - started
+
+    self._report(options, simulator, expected, failures, created_elapsed, total_elapsed)
+
+  def _seed(self):
+    store = LaundrymartStore.objects.create(
+      laundrymart_name='Benchmark Laundry', lat=40.7128, lng=-74.0060, store_id='46d6e35d-3ca4-4092-8526-24a4bcd814a0',
+      price_per_pound=Decimal('1.75'), service_fee=Decimal('2.50'),
+    )
+    customers = [
+      User.objects.create_user(email=f'bench-customer-{i}@example.com', password=None, is_active=True, full_name=f'Customer {i}')
+      for i in range(50)
+    ]
+    return store, customers
+
+  def _order_flow(self, store, customer, index):
+    """One customer order: quote, save, vendor accepts, Uber delivery, Order."""
+    try:
+      started = time.perf_counter()
+      # Spread dropoffs so the quote cache doesn't short-circuit the run
+      quote_request = UberCreateQuoteSerializer(data={
+        'service_type': 'drop_off',
+        'pickup_address': f'{index} Customer Ave',
+        'dropoff_address': '1 Laundry St',
+        'pickup_latitude': 40.70 + random.random() / 10,
+        'pickup_longitude': -74.05 + random.random() / 10,
+        'dropoff_latitude': float(store.lat),
+        'dropoff_longitude': float(store.lng),
+        'pickup_phone_number': '+15555550101',
+        'dropoff_phone_number': '+15555550102',
+        'manifest_total_value': 2000,
+        'external_store_id': str(store.store_id),
+      })
+      quote_request.is_valid(raise_exception=True)
+      uber_quote = create_dropoff_quote(UBER_CUSTOMER_ID, quote_request.to_uber_payload(), user_id=customer.id)
+
+      with self.db_lock:
+        quote = save_delivery_quote(
+          user=customer, service_type='drop_off', serializer_data=quote_request.validated_data, uber_data=uber_quote
+        )
+        quote.status = 'pending'
+        quote.save(update_fields=['status'])
+
+      delivery_request = CreateDeliverySerializer(data={
+        'quote_id': quote.quote_id,
+        'pickup_name': customer.full_name,
+        'pickup_address': quote.pickup_address,
+        'pickup_phone_number': quote.pickup_phone_number,
+        'dropoff_name': store.laundrymart_name,
+        'dropoff_address': quote.dropoff_address,
+        'dropoff_phone_number': quote.dropoff_phone_number,
+        'pickup_latitude': quote.pickup_latitude,
+        'pickup_longitude': quote.pickup_longitude,
+        'dropoff_latitude': quote.dropoff_latitude,
+        'dropoff_longitude': quote.dropoff_longitude,
+        'manifest_items': [],
+        'external_store_id': quote.external_store_id,
+        'manifest_total_value': 2000,
+      })
+      delivery_request.is_valid(raise_exception=True)
+      validated = delivery_request.validated_data
+      uber_delivery = create_uber_delivery(validated, uber_headers())
+
+      with self.db_lock:
+        delivery = save_uber_delivery(user=customer, validated_data=validated, payload=validated, uber_data=uber_delivery)
+        Order.objects.create(
+          user=customer, service_provider=store, status='card_saved',
+          pickup_address=quote.pickup_address, dropoff_address=quote.dropoff_address,
+          pickup_deivery=delivery, uber_pickup_quote_id=quote.quote_id, uber_pickup_delivery_id=delivery.delivery_uid,
+        )
+        quote.status = 'accepted'
+        quote.save(update_fields=['status'])
+        self.started_at[delivery.delivery_uid] = started
+
+      self.flow_latency.observe((time.perf_counter() - started) * 1000)
+    finally:
+      connection.close()
+
+  def _drain_webhooks(self, timeout):
+    """Posts simulator events to the webhook view, then drains the inbox like process_uber_webhooks."""
+    client = Client()
+    path = reverse('uber-delivery-status-webhook')
+    try:
+      event = self.webhooks.get(timeout=timeout)
+    except queue.Empty:
+      event = None
+    while event:
+      started = time.perf_counter()
+      body = json.dumps(event)
+      with self.db_lock:
+        client.post(path, data=body, content_type='application/json',
+                    HTTP_X_UBER_SIGNATURE=sign_webhook_body(body, BENCHMARK_SIGNING_KEY))
+      self.webhook_latency.observe((time.perf_counter() - started) * 1000)
+      if event['status'] == 'delivered' and event['delivery_id'] in self.started_at.keys() - self.finished:
+        self.awaiting_delivered.add(event['delivery_id'])
+      try:
+        event = self.webhooks.get_nowait()
+      except queue.Empty:
+        event = None
+
+    while True:
+      started = time.perf_counter()
+      with self.db_lock:
+        claimed = process_batch()
+      if not claimed:
+        break
+      self.batch_latency.observe((time.perf_counter() - started) * 1000)
+      self.batch_sizes.append(claimed)
+
+    if self.awaiting_delivered:
+      with self.db_lock:
+        delivered = set(Delivery.objects.filter(
+          delivery_uid__in=self.awaiting_delivered, status='delivered'
+        ).values_list('delivery_uid', flat=True))
+      now = time.perf_counter()
+      for delivery_id in delivered:
+        self.e2e_latency.observe((now - self.started_at[delivery_id]) * 1000)
+      self.awaiting_delivered -= delivered
+      self.finished |= delivered
+
+  def _completed(self):
+    with self.db_lock:
+      return Order.objects.filter(status='completed').count()
+
+  def _format(self, label, histogram):
+    snapshot = histogram.snapshot()
+    if not snapshot['count']:
+      return f"{label}: no samples"
+    return (
+      f"{label}: n={snapshot['count']} | mean {snapshot['mean_ms']:.1f}ms | p50 <={snapshot['p50_ms']:.0f}ms | "
+      f"p95 <={snapshot['p95_ms']:.0f}ms | max {snapshot['max_ms']:.1f}ms"
+    )
+
+  def _report(self, options, simulator, created, failures, created_elapsed, total_elapsed):
+    with self.db_lock:
+      statuses = Counter(Order.objects.values_list('status', flat=True))
+    completed = statuses.get('completed', 0)
+
+    self.stdout.write(self.style.SUCCESS(
+      f"{created}/{options['orders']} orders created in {created_elapsed:.2f}s "
+      f"({created / created_elapsed:.1f} orders/s, concurrency {options['concurrency']}); "
+      f"{completed} delivered end to end in {total_elapsed:.2f}s"
+    ))
+    self.stdout.write(self._format("quote -> delivery created", self.flow_latency))
+    self.stdout.write(self._format("quote -> delivered webhook applied", self.e2e_latency))
+    self.stdout.write(self._format("webhook handler (inbox append)", self.webhook_latency))
+    self.stdout.write(self._format("inbox batch", self.batch_latency))
+    if self.batch_sizes:
+      with self.db_lock:
+        results = Counter(UberWebhookEvent.objects.values_list('result', flat=True))
+      self.stdout.write(f"inbox: {len(self.batch_sizes)} batches, mean {sum(self.batch_sizes) / len(self.batch_sizes):.1f} events; results {dict(results)}")
+    for endpoint, snapshot in get_uber_client().stats()['latency'].items():
+      self.stdout.write(f"uber client {endpoint}: n={snapshot['count']} | p50 <={snapshot['p50_ms']:.0f}ms | p95 <={snapshot['p95_ms']:.0f}ms")
+    self.stdout.write(f"simulator: {simulator.stats()['counts']}")
+    self.stdout.write(f"order statuses: {dict(statuses)}")
+    if failures:
+      self.stdout.write(self.style.WARNING(f"failed flows: {dict(failures)}"))
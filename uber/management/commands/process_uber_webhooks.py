@@ -0,0 +1,16 @@
+from common_utils.inbox_worker import InboxWorkerCommand
+from uber.webhook_inbox import WEBHOOK_BATCH_SIZE, WEBHOOK_LEASE_SECONDS, process_batch, prune_processed_events
+
+
+class Command(InboxWorkerCommand):
+  help = "Drain the Uber webhook inbox: apply delivery_status events to Delivery/Order in batches"
+  label = 'Uber webhook events'
+  default_batch_size = WEBHOOK_BATCH_SIZE
+  default_lease_seconds = WEBHOOK_LEASE_SECONDS
+  default_keep_days = 7
+
+  def process_batch(self, batch_size, lease_seconds):
+    return process_batch(batch_size, lease_seconds)
+
+  def prune_processed_events(self, older_than):
+    return prune_processed_events(older_than)
@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from uber.simulator import UberSimulator
+
+
+class Command(BaseCommand):
+  help = (
+    "Run a local Uber Direct stand-in (OAuth, quotes, deliveries) that fires "
+    "delivery_status webhooks back at this app"
+  )
+
+  def add_arguments(self, parser):
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of quote/delivery calls that fail")
+    parser.add_argument('--error-status', type=int, action='append', dest='error_statuses',
+                        help="Status returned for injected errors (repeatable, default 503)")
+    parser.add_argument('--webhook-url', default='http://127.0.0.1:8000/uber/api/webhook/delivery-status',
+                        help="Where to POST event.delivery_status; pass '' to disable")
+    parser.add_argument('--webhook-signing-key', default=settings.UBER_WEBHOOK_SIGNING_KEY,
+                        help="Signs webhooks; must match the app's UBER_WEBHOOK_SIGNING_KEY")
+    parser.add_argument('--status-interval', type=float, default=2.0, help="Seconds between delivery status events")
+    parser.add_argument('--duplicate-rate', type=float, default=0.0, help="Fraction of status webhooks redelivered later")
+    parser.add_argument('--seed', type=int)
+
+  def handle(self, *args, **options):
+    simulator = UberSimulator(
+      host=options['host'],
+      port=options['port'],
+      latency_ms=options['latency_ms'],
+      jitter_ms=options['jitter_ms'],
+      error_rate=options['error_rate'],
+      error_statuses=options['error_statuses'] or (503,),
+      webhook=options['webhook_url'] or None,
+      webhook_signing_key=options['webhook_signing_key'],
+      status_interval=options['status_interval'],
+      duplicate_rate=options['duplicate_rate'],
+      seed=options['seed'],
+    ).start()
+
+    self.stdout.write(self.style.SUCCESS(f"Uber simulator listening on {simulator.url}"))
+    self.stdout.write(f"  export UBER_BASE_URL={simulator.base_url}")
+    self.stdout.write(f"  export UBER_AUTH_URL={simulator.auth_url}")
+    if simulator.webhook and not simulator.webhook_signing_key:
+      self.stdout.write(self.style.WARNING("No webhook signing key: the app will reject these webhooks"))
+    try:
+      while True:
+        time.sleep(1)
+    except KeyboardInterrupt:
+      self.stdout.write(f"Stopping. {simulator.stats()['counts']}")
+    finally:
+      simulator.stop()
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uber', '0015_deliveryquote_payment_method_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deliveryquote',
+            index=models.Index(fields=['external_store_id', 'status', 'saved_at'], name='uber_delive_externa_ab5b8b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryquote',
+            index=models.Index(fields=['customer', 'status', 'saved_at'], name='uber_delive_custome_d3cc7a_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uber', '0016_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='delivery',
+            name='courier_imminent',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uber', '0017_delivery_courier_imminent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UberWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('event_type', models.CharField(blank=True, max_length=100, null=True)),
+                ('delivery_id', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.CharField(blank=True, choices=[('applied', 'Applied'), ('coalesced', 'Coalesced'), ('failed', 'Failed')], max_length=20, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['processed_at', 'id'], name='uber_uberwe_process_59179b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uber', '0018_uber_webhook_event'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uberwebhookevent',
+            name='result',
+            field=models.CharField(blank=True, choices=[('applied', 'Applied'), ('coalesced', 'Coalesced'), ('stale', 'Stale'), ('failed', 'Failed')], max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uber', '0019_uber_webhook_event_stale_result'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uberwebhookevent',
+            name='lease_token',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+    ]
@@ -57,6 +57,11 @@ class DeliveryQuote(models.Model):
     verbose_name = "Uber Direct Delivery Quote"
     verbose_name_plural = "Uber Direct Delivery Quotes"
     ordering = ['-saved_at']
+    indexes = [
+      # Keyset pagination of the vendor/customer pending lists
+      models.Index(fields=['external_store_id', 'status', 'saved_at']),
+      models.Index(fields=['customer', 'status', 'saved_at']),
+    ]
 
 
   def __str__(self):
@@ -135,6 +140,7 @@ class Delivery(models.Model):
   courier_tip=models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
   courier_phone = models.CharField(max_length=30, blank=True, null=True)
   courier_vehicle_type = models.CharField(max_length=50, blank=True, null=True)
+  courier_imminent = models.BooleanField(default=False)
 
   uber_raw_response = models.JSONField(blank=True, null=True)
 
@@ -168,4 +174,39 @@ class ManifestItem(models.Model):
   dimensions=models.JSONField(blank=True, null=True)
   weight=models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
   price=models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
-  vat_percentage=models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
\ No newline at end of file
+  vat_percentage=models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+
+WEBHOOK_EVENT_RESULT_CHOICES=[
+  ('applied', 'Applied'),
+  ('coalesced', 'Coalesced'),
+  ('stale', 'Stale'),
+  ('failed', 'Failed'),
+]
+class UberWebhookEvent(models.Model):
+  """
+  Inbox row per Uber webhook call. The webhook view only appends here;
+  process_uber_webhooks drains pending rows (processed_at is null) in batches.
+  """
+  event_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
+  event_type = models.CharField(max_length=100, blank=True, null=True)
+  delivery_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
+  payload = models.JSONField()
+  received_at = models.DateTimeField(auto_now_add=True)
+
+  # Set while a worker holds the row; expired leases get picked up again
+  lease_expires_at = models.DateTimeField(blank=True, null=True)
+  # Written by the claiming UPDATE; a worker only processes rows carrying its own token
+  lease_token = models.UUIDField(blank=True, null=True)
+  attempts = models.PositiveIntegerField(default=0)
+  processed_at = models.DateTimeField(blank=True, null=True)
+  result = models.CharField(max_length=20, blank=True, null=True, choices=WEBHOOK_EVENT_RESULT_CHOICES)
+  last_error = models.TextField(blank=True, null=True)
+
+  class Meta:
+    ordering = ['id']
+    indexes = [
+      models.Index(fields=['processed_at', 'id']),
+    ]
+
+  def __str__(self):
+    return f"{self.event_type} {self.delivery_id} ({self.result or 'pending'})"
@@ -0,0 +1,169 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+QUOTE_CACHE_PREFIX = 'uber_quote'
+QUOTE_CACHE_STATS_PREFIX = f'{QUOTE_CACHE_PREFIX}:stats'
+# ~11m cells: same building, so the cached quote's addresses still match the request
+QUOTE_COORD_DECIMALS = 4
+# Requests whose pickup_ready_dt falls in the same window share a quote
+QUOTE_READY_BUCKET_SECONDS = 15 * 60
+# Stop handing a quote out this long before Uber expires it, so the delivery can still be created
+QUOTE_EXPIRY_MARGIN_SECONDS = 120
+QUOTE_MAX_TTL = 15 * 60
+
+STAT_NAMES = ('hits', 'misses', 'stores')
+
+
+def _point(payload, prefix):
+  lat, lng = payload.get(f'{prefix}_latitude'), payload.get(f'{prefix}_longitude')
+  if lat is None or lng is None:
+    # No coordinates: fall back to the normalized address text
+    return ' '.join(str(payload.get(f'{prefix}_address', '')).lower().split())
+  return f'{lat:.{QUOTE_COORD_DECIMALS}f},{lng:.{QUOTE_COORD_DECIMALS}f}'
+
+
+def ready_bucket(ready_dt):
+  if not ready_dt:
+    return 'asap'
+  return str(int(ready_dt.timestamp()) // QUOTE_READY_BUCKET_SECONDS)
+
+
+def quote_cache_key(service_type, payload, ready_dt=None, user_id=None):
+  """
+  Keyed per customer as well as per route: an Uber quote_id can back only
+  one DeliveryQuote, so two customers must never be handed the same one.
+  """
+  parts = [
+    str(user_id or ''),
+    service_type,
+    _point(payload, 'pickup'),
+    _point(payload, 'dropoff'),
+    ready_bucket(ready_dt),
+    str(payload.get('manifest_total_value')),
+    str(payload.get('external_store_id', '')),
+  ]
+  digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+  return f'{QUOTE_CACHE_PREFIX}:{digest}'
+
+
+def _quote_index_key(quote_id):
+  # quote_id -> cache key, so a quote can be evicted once it's been used
+  return f'{QUOTE_CACHE_PREFIX}:id:{quote_id}'
+
+
+def _expires_at(quote):
+  expires = quote.get('expires')
+  if not expires:
+    return None
+  try:
+    return parse_datetime(expires)
+  except (TypeError, ValueError):
+    return None
+
+
+def quote_ttl(quote, now=None):
+  """Seconds the quote may still be served, or 0 if it shouldn't be cached."""
+  expires_at = _expires_at(quote)
+  if expires_at is None:
+    return 0
+  remaining = (expires_at - (now or timezone.now())).total_seconds() - QUOTE_EXPIRY_MARGIN_SECONDS
+  return max(0, min(int(remaining), QUOTE_MAX_TTL))
+
+
+def _bump(name):
+  key = f'{QUOTE_CACHE_STATS_PREFIX}:{name}'
+  try:
+    cache.add(key, 0, timeout=None)
+    cache.incr(key)
+  except Exception as e:
+    print(f"Uber quote cache stats update failed: {str(e)}")
+
+
+# BaseCache.aincr is a get-then-set; run the backend's atomic incr (Redis INCR) instead
+_abump = sync_to_async(_bump)
+
+
+def _fresh(quote):
+  # Re-check on read: the TTL was computed when the quote was stored
+  return quote if quote and quote_ttl(quote) > 0 else None
+
+
+def get_cached_quote(key):
+  try:
+    quote = _fresh(cache.get(key))
+  except Exception as e:
+    print(f"Uber quote cache read failed: {str(e)}")
+    return None
+  _bump('hits' if quote else 'misses')
+  return quote
+
+
+def set_cached_quote(key, quote):
+  ttl = quote_ttl(quote)
+  if not ttl:
+    return
+  try:
+    cache.set_many({key: quote, _quote_index_key(quote['id']): key}, timeout=ttl)
+  except Exception as e:
+    print(f"Uber quote cache write failed: {str(e)}")
+    return
+  _bump('stores')
+
+
+async def aget_cached_quote(key):
+  try:
+    quote = _fresh(await cache.aget(key))
+  except Exception as e:
+    print(f"Uber quote cache read failed: {str(e)}")
+    return None
+  await _abump('hits' if quote else 'misses')
+  return quote
+
+
+async def aset_cached_quote(key, quote):
+  ttl = quote_ttl(quote)
+  if not ttl:
+    return
+  try:
+    await cache.aset_many({key: quote, _quote_index_key(quote['id']): key}, timeout=ttl)
+  except Exception as e:
+    print(f"Uber quote cache write failed: {str(e)}")
+    return
+  await _abump('stores')
+
+
+def evict_quote(quote_id):
+  """Drops a quote once a DeliveryQuote holds it; Uber won't accept it for a second delivery."""
+  if not quote_id:
+    return
+  index_key = _quote_index_key(quote_id)
+  try:
+    key = cache.get(index_key)
+    cache.delete_many([index_key, key] if key else [index_key])
+  except Exception as e:
+    print(f"Uber quote cache eviction failed: {str(e)}")
+
+
+def quote_cache_stats():
+  """
+  Cluster-wide counters (kept in the cache, so every worker contributes).
+  Each hit is one Uber quote call saved.
+  """
+  try:
+    counts = cache.get_many([f'{QUOTE_CACHE_STATS_PREFIX}:{name}' for name in STAT_NAMES])
+  except Exception as e:
+    print(f"Uber quote cache stats read failed: {str(e)}")
+    counts = {}
+  stats = {name: counts.get(f'{QUOTE_CACHE_STATS_PREFIX}:{name}', 0) for name in STAT_NAMES}
+  lookups = stats['hits'] + stats['misses']
+  stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+  stats['uber_calls_saved'] = stats['hits']
+  return stats
+
+
+def reset_quote_cache_stats():
+  cache.delete_many([f'{QUOTE_CACHE_STATS_PREFIX}:{name}' for name in STAT_NAMES])
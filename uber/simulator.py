@@ -0,0 +1,327 @@
+import heapq
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from common_utils.metrics import HistogramRegistry
+from uber.webhook_signature import WEBHOOK_SIGNATURE_HEADER, sign_webhook_body
+
+# Courier progression each simulated delivery walks through: (status, courier_imminent)
+DELIVERY_PROGRESSION = (
+  ('pending', False),
+  ('pickup', False),
+  ('pickup', True),
+  ('pickup_complete', False),
+  ('dropoff', False),
+  ('dropoff', True),
+  ('delivered', False),
+)
+
+QUOTE_PATH = re.compile(r'^/v1/customers/(?P<customer_id>[^/]+)/delivery_quotes/?$')
+DELIVERIES_PATH = re.compile(r'^/v1/customers/(?P<customer_id>[^/]+)/deliveries/?$')
+DELIVERY_PATH = re.compile(r'^/v1/customers/(?P<customer_id>[^/]+)/deliveries/(?P<delivery_id>[^/]+)/?$')
+TOKEN_PATH = '/oauth/v2/token'
+
+
+def _iso(moment):
+  return moment.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class _SimulatorHandler(BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1'
+
+  def do_GET(self):
+    self._dispatch('GET')
+
+  def do_POST(self):
+    self._dispatch('POST')
+
+  def _dispatch(self, method):
+    length = int(self.headers.get('Content-Length') or 0)
+    raw = self.rfile.read(length) if length else b''
+    status, body = self.server.simulator.handle(method, self.path.split('?')[0], raw, self.headers)
+    payload = json.dumps(body).encode()
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(payload)))
+    if status == 429:
+      self.send_header('Retry-After', '0')
+    self.end_headers()
+    self.wfile.write(payload)
+
+  def log_message(self, *args):
+    pass
+
+
+class UberSimulator:
+  """
+  Local Uber Direct stand-in: OAuth token, delivery quotes and delivery
+  creation over real HTTP, with injectable latency/errors. Every created
+  delivery walks DELIVERY_PROGRESSION and fires `event.delivery_status`
+  webhooks at `webhook` (a URL, or a callable taking the event dict);
+  URL webhooks are signed with `webhook_signing_key`.
+
+  Point the app at it with UBER_BASE_URL=<base_url> / UBER_AUTH_URL=<auth_url>,
+  or reset_uber_client(UberClient(base_url=..., auth_url=...)) in-process.
+  """
+
+  def __init__(self, host='127.0.0.1', port=0, latency_ms=0, jitter_ms=0, error_rate=0.0, error_statuses=(503,),
+               webhook=None, status_interval=0.5, duplicate_rate=0.0, quote_ttl=timedelta(minutes=15), seed=None,
+               webhook_signing_key=None):
+    self.latency_ms = latency_ms
+    self.jitter_ms = jitter_ms
+    self.error_rate = error_rate
+    self.error_statuses = tuple(error_statuses)
+    self.webhook = webhook
+    # Signs URL webhooks like Uber does, so the app's signature check passes
+    self.webhook_signing_key = webhook_signing_key
+    self.status_interval = status_interval
+    # Fraction of webhooks redelivered a little later, like Uber retries (arrive duplicated and out of order)
+    self.duplicate_rate = duplicate_rate
+    self.quote_ttl = quote_ttl
+    self.random = random.Random(seed)
+
+    self.quotes = {}
+    self.deliveries = {}
+    self.latency = HistogramRegistry()
+    self.counts = {}
+    self.webhook_failures = 0
+    self._lock = threading.Lock()
+
+    self._events = []
+    self._event_seq = itertools.count()
+    self._events_ready = threading.Condition()
+    self._stopping = False
+    self._webhook_session = requests.Session()
+
+    self.server = ThreadingHTTPServer((host, port), _SimulatorHandler)
+    self.server.daemon_threads = True
+    self.server.simulator = self
+    self._threads = []
+
+  @property
+  def url(self):
+    host, port = self.server.server_address[:2]
+    return f'http://{host}:{port}'
+
+  @property
+  def base_url(self):
+    return f'{self.url}/v1'
+
+  @property
+  def auth_url(self):
+    return f'{self.url}{TOKEN_PATH}'
+
+  def start(self):
+    for target in (self.server.serve_forever, self._dispatch_webhooks):
+      thread = threading.Thread(target=target, daemon=True)
+      thread.start()
+      self._threads.append(thread)
+    return self
+
+  def stop(self):
+    with self._events_ready:
+      self._stopping = True
+      self._events_ready.notify_all()
+    self.server.shutdown()
+    self.server.server_close()
+    self._webhook_session.close()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *exc_info):
+    self.stop()
+
+  def stats(self):
+    with self._lock:
+      counts = dict(sorted(self.counts.items()))
+      webhook_failures = self.webhook_failures
+    return {'counts': counts, 'webhook_failures': webhook_failures, 'latency': self.latency.snapshot()}
+
+  # -- HTTP side --
+
+  def _count(self, name):
+    with self._lock:
+      self.counts[name] = self.counts.get(name, 0) + 1
+
+  def _route(self, method, path):
+    if method == 'POST' and path == TOKEN_PATH:
+      return 'oauth_token', self._token, {}
+    for pattern, endpoint, handler, expected in (
+      (QUOTE_PATH, 'delivery_quotes', self._create_quote, 'POST'),
+      (DELIVERIES_PATH, 'deliveries', self._create_delivery, 'POST'),
+      (DELIVERY_PATH, 'get_delivery', self._get_delivery, 'GET'),
+    ):
+      match = pattern.match(path)
+      if match and method == expected:
+        return endpoint, handler, match.groupdict()
+    return None, None, None
+
+  def handle(self, method, path, raw, headers):
+    started = time.perf_counter()
+    endpoint, handler, params = self._route(method, path)
+    if handler is None:
+      return 404, {'code': 'not_found', 'message': f'{method} {path}'}
+
+    delay_ms = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+    if delay_ms:
+      time.sleep(delay_ms / 1000)
+
+    self._count(endpoint)
+    if endpoint != 'oauth_token' and self.error_rate and self.random.random() < self.error_rate:
+      status = self.random.choice(self.error_statuses)
+      self._count(f'{endpoint}:injected_{status}')
+      self.latency.observe(endpoint, (time.perf_counter() - started) * 1000)
+      return status, {'code': 'simulated_error', 'message': f'Injected {status}'}
+
+    try:
+      body = json.loads(raw) if raw and 'json' in (headers.get('Content-Type') or '') else {}
+    except ValueError:
+      return 400, {'code': 'invalid_params', 'message': 'Body is not valid JSON'}
+    status, response = handler(body, **params)
+    self.latency.observe(endpoint, (time.perf_counter() - started) * 1000)
+    return status, response
+
+  def _token(self, body):
+    return 200, {'access_token': f'sim-{uuid.uuid4().hex}', 'token_type': 'Bearer', 'expires_in': 2592000, 'scope': 'eats.deliveries'}
+
+  def _create_quote(self, body, customer_id):
+    now = datetime.now(dt_timezone.utc)
+    duration = self.random.randint(15, 45)
+    quote = {
+      'kind': 'delivery_quote',
+      'id': f'dqt_{uuid.uuid4().hex}',
+      'created': _iso(now),
+      'expires': _iso(now + self.quote_ttl),
+      'fee': self.random.randint(500, 1500),
+      'currency': 'usd',
+      'currency_type': 'USD',
+      'dropoff_eta': _iso(now + timedelta(minutes=duration)),
+      'duration': duration,
+      'pickup_duration': self.random.randint(5, 15),
+      'dropoff_deadline': _iso(now + timedelta(minutes=duration + 60)),
+    }
+    with self._lock:
+      self.quotes[quote['id']] = quote
+    return 200, quote
+
+  def _create_delivery(self, body, customer_id):
+    with self._lock:
+      quote = self.quotes.get(body.get('quote_id'))
+    if quote is None:
+      return 400, {'code': 'invalid_params', 'message': 'The quote_id is not valid'}
+
+    now = datetime.now(dt_timezone.utc)
+    delivery_id = f'del_{uuid.uuid4().hex[:22]}'
+    delivery = {
+      'kind': 'delivery',
+      'id': delivery_id,
+      'quote_id': quote['id'],
+      'status': 'pending',
+      'complete': False,
+      'created': _iso(now),
+      'updated': _iso(now),
+      'fee': quote['fee'],
+      'currency': quote['currency'],
+      'dropoff_eta': quote['dropoff_eta'],
+      'dropoff_deadline': quote['dropoff_deadline'],
+      'tracking_url': f'{self.url}/track/{delivery_id}',
+      'external_id': body.get('external_id'),
+      'pickup': {'address': body.get('pickup_address'), 'phone_number': body.get('pickup_phone_number')},
+      'dropoff': {'address': body.get('dropoff_address'), 'phone_number': body.get('dropoff_phone_number')},
+    }
+    with self._lock:
+      self.deliveries[delivery_id] = delivery
+    self._schedule_progression(delivery_id)
+    return 200, delivery
+
+  def _get_delivery(self, body, customer_id, delivery_id):
+    with self._lock:
+      delivery = self.deliveries.get(delivery_id)
+    if delivery is None:
+      return 404, {'code': 'delivery_not_found', 'message': 'The requested delivery was not found'}
+    return 200, delivery
+
+  # -- Webhook side --
+
+  def _schedule_progression(self, delivery_id):
+    if self.webhook is None:
+      return
+    now = time.monotonic()
+    with self._events_ready:
+      for step, (status, imminent) in enumerate(DELIVERY_PROGRESSION):
+        heapq.heappush(self._events, (now + (step + 1) * self.status_interval, next(self._event_seq), delivery_id, status, imminent, None))
+      self._events_ready.notify()
+
+  def _redeliver_later(self, event):
+    due = time.monotonic() + self.status_interval * self.random.uniform(1, 3)
+    with self._events_ready:
+      heapq.heappush(self._events, (due, next(self._event_seq), event['delivery_id'], event['status'], event['courier_imminent'], event))
+      self._events_ready.notify()
+
+  def _event(self, delivery_id, status, imminent):
+    now = datetime.now(dt_timezone.utc)
+    with self._lock:
+      delivery = self.deliveries[delivery_id]
+      delivery.update(status=status, updated=_iso(now), complete=status == 'delivered')
+      dropoff_eta = delivery['dropoff_eta']
+    data = {'id': delivery_id, 'status': status, 'dropoff_eta': dropoff_eta}
+    if status != 'pending':
+      data['courier'] = {'name': 'Sim Courier', 'phone_number': '+15555550100', 'vehicle_type': 'car'}
+    return {
+      'id': f'evt_{uuid.uuid4().hex}',
+      'kind': 'event.delivery_status',
+      'event_type': 'event.delivery_status',
+      'created': _iso(now),
+      'delivery_id': delivery_id,
+      'status': status,
+      'courier_imminent': imminent,
+      'updated_at': _iso(now),
+      'data': data,
+    }
+
+  def _send(self, event):
+    if callable(self.webhook):
+      self.webhook(event)
+      return
+    body = json.dumps(event)
+    headers = {'Content-Type': 'application/json'}
+    if self.webhook_signing_key:
+      headers[WEBHOOK_SIGNATURE_HEADER] = sign_webhook_body(body, self.webhook_signing_key)
+    resp = self._webhook_session.post(self.webhook, data=body, headers=headers, timeout=10)
+    resp.raise_for_status()
+
+  def _dispatch_webhooks(self):
+    while True:
+      with self._events_ready:
+        while not self._stopping and (not self._events or self._events[0][0] > time.monotonic()):
+          timeout = self._events[0][0] - time.monotonic() if self._events else None
+          self._events_ready.wait(timeout)
+        if self._stopping:
+          return
+        _, _, delivery_id, status, imminent, event = heapq.heappop(self._events)
+
+      started = time.perf_counter()
+      try:
+        if event is None:
+          event = self._event(delivery_id, status, imminent)
+          if self.duplicate_rate and self.random.random() < self.duplicate_rate:
+            self._redeliver_later(event)
+        else:
+          self._count('webhooks_redelivered')
+        self._send(event)
+        self._count('webhooks_sent')
+      except Exception as e:
+        with self._lock:
+          self.webhook_failures += 1
+        print(f"Simulator webhook for {delivery_id} ({status}) failed: {str(e)}")
+      self.latency.observe('webhook', (time.perf_counter() - started) * 1000)
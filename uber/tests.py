@@ -1,3 +1,384 @@
-from django.test import TestCase
+import io
+import json
+import threading
+from collections import Counter
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import LaundrymartStore, User
+from payment.models import Order
+from uber import async_client, cache_access_token, quote_cache, utils as uber_utils, webhook_inbox
+from uber.client import UberClient, reset_uber_client
+from uber.models import Delivery, UberWebhookEvent
+from uber.simulator import DELIVERY_PROGRESSION, UberSimulator
+from uber.webhook_signature import sign_webhook_body
+from vendor.models import VendorRevenueRollup
+
+
+WEBHOOK_SIGNING_KEY = 'uber_test_signing_key'
+
+
+class StubUberHandler(BaseHTTPRequestHandler):
+  """Replies with the next scripted (status, body) and records each client port."""
+  protocol_version = 'HTTP/1.1'
+
+  def do_POST(self):
+    self.rfile.read(int(self.headers.get('Content-Length', 0)))
+    server = self.server
+    server.ports.append(self.client_address[1])
+    status, body = server.script.pop(0) if server.script else (200, {'id': 'dqt_stub', 'fee': 500})
+    payload = json.dumps(body).encode()
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(payload)))
+    self.end_headers()
+    self.wfile.write(payload)
+
+  def log_message(self, *args):
+    pass
+
+
+class UberClientTests(SimpleTestCase):
+  def setUp(self):
+    self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubUberHandler)
+    self.server.script = []
+    self.server.ports = []
+    threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{self.server.server_port}'
+    self.client = UberClient(base_url=base_url, auth_url=f'{base_url}/oauth', sleep=lambda seconds: None)
+
+  def tearDown(self):
+    self.client.close()
+    self.server.shutdown()
+    self.server.server_close()
+
+  def test_reuses_one_keep_alive_connection(self):
+    for _ in range(3):
+      self.client.create_quote('cust', {}, headers={})
+    self.assertEqual(len(set(self.server.ports)), 1)
+
+  def test_quotes_retry_on_5xx_and_429(self):
+    self.server.script = [(503, {}), (429, {})]
+    quote = self.client.create_quote('cust', {}, headers={})
+    self.assertEqual(quote['id'], 'dqt_stub')
+    self.assertEqual(len(self.server.ports), 3)
+
+  def test_deliveries_do_not_retry_server_errors(self):
+    self.server.script = [(500, {'code': 'internal'})]
+    response = self.client.create_delivery('cust', {}, headers={})
+    self.assertEqual(response.status_code, 500)
+    self.assertEqual(len(self.server.ports), 1)
+
+  async def test_async_quotes_share_the_retry_policy(self):
+    self.server.script = [(503, {}), (429, {})]
+    reset_uber_client(self.client)
+    self.addCleanup(reset_uber_client, None)
+    with mock.patch('uber.async_client.backoff_delay', return_value=0):
+      quote = await async_client.create_quote_async('cust', {}, headers={'Authorization': 'Bearer test'})
+    self.assertEqual(quote['id'], 'dqt_stub')
+    self.assertEqual(len(self.server.ports), 3)
+    self.assertEqual(self.client.stats()['statuses']['delivery_quotes:503'], 1)
+
+  def test_records_latency_per_endpoint(self):
+    self.client.create_quote('cust', {}, headers={})
+    self.client.fetch_token({'grant_type': 'client_credentials'})
+    latency = self.client.stats()['latency']
+    self.assertEqual(latency['delivery_quotes']['count'], 1)
+    self.assertEqual(latency['oauth_token']['count'], 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class UberTokenRefreshTests(SimpleTestCase):
+  def setUp(self):
+    cache.clear()
+    cache_access_token.forget_uber_access_token()
+    self.fetches = 0
+    self.fetch_lock = threading.Lock()
+    self.client = mock.Mock(fetch_token=self.fake_fetch_token)
+    patcher = mock.patch.object(cache_access_token, 'get_uber_client', return_value=self.client)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    self.addCleanup(cache_access_token.forget_uber_access_token)
+
+  def fake_fetch_token(self, data):
+    with self.fetch_lock:
+      self.fetches += 1
+    time.sleep(0.1)
+    return mock.Mock(status_code=200, json=lambda: {'access_token': f'token-{self.fetches}', 'expires_in': 2592000})
+
+  def test_concurrent_misses_fetch_once(self):
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(cache_access_token.get_uber_access_token())) for _ in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(self.fetches, 1)
+    self.assertEqual(set(tokens), {'token-1'})
+
+  def test_memo_skips_cache(self):
+    cache_access_token.get_uber_access_token()
+    with mock.patch.object(cache_access_token.cache, 'get') as cache_get:
+      self.assertEqual(cache_access_token.get_uber_access_token(), 'token-1')
+    cache_get.assert_not_called()
+
+  def test_refreshes_ahead_of_expiry(self):
+    now = timezone.now()
+    cache.set(cache_access_token.UBER_TOKEN_CACHE_KEY, {
+      'access_token': 'old', 'expires_at': now + timedelta(hours=1), 'refresh_at': now - timedelta(minutes=1),
+    })
+    # The still-valid token is served while a background thread renews it
+    self.assertEqual(cache_access_token.get_uber_access_token(), 'old')
+    for _ in range(50):
+      if cache_access_token.memoized_uber_access_token() == 'token-1':
+        break
+      time.sleep(0.05)
+    self.assertEqual(self.fetches, 1)
+    self.assertEqual(cache.get(cache_access_token.UBER_TOKEN_CACHE_KEY)['access_token'], 'token-1')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class QuoteCacheTests(TestCase):
+  payload = {
+    'pickup_address': '1 Main St', 'dropoff_address': '9 Elm St', 'manifest_total_value': 2000,
+    'pickup_latitude': 40.712801, 'pickup_longitude': -74.006001,
+    'dropoff_latitude': 40.730601, 'dropoff_longitude': -73.935201,
+  }
+
+  def setUp(self):
+    cache.clear()
+    self.calls = 0
+    patcher = mock.patch.object(uber_utils, 'get_uber_client', return_value=mock.Mock(create_quote=self.fake_quote))
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    headers = mock.patch.object(uber_utils, 'uber_headers', return_value={})
+    headers.start()
+    self.addCleanup(headers.stop)
+
+  def fake_quote(self, customer_id, payload, headers, expires_in=timedelta(minutes=15)):
+    self.calls += 1
+    return {'id': f'dqt_{self.calls}', 'fee': 799, 'expires': (timezone.now() + expires_in).isoformat()}
+
+  def test_repeat_request_reuses_quote_id(self):
+    first = uber_utils.create_dropoff_quote('cust', self.payload)
+    nearby = dict(self.payload, pickup_latitude=40.71281)
+    second = uber_utils.create_dropoff_quote('cust', nearby)
+    self.assertEqual(first['id'], second['id'])
+    self.assertEqual(self.calls, 1)
+    stats = quote_cache.quote_cache_stats()
+    self.assertEqual((stats['hits'], stats['misses'], stats['uber_calls_saved']), (1, 1, 1))
+    self.assertEqual(stats['hit_rate'], 0.5)
+
+  def test_key_separates_service_type_manifest_and_ready_window(self):
+    ready = timezone.now().replace(minute=0, second=0, microsecond=0)
+    base = quote_cache.quote_cache_key('drop_off', self.payload, ready)
+    self.assertEqual(base, quote_cache.quote_cache_key('drop_off', self.payload, ready + timedelta(minutes=5)))
+    self.assertNotEqual(base, quote_cache.quote_cache_key('drop_off', self.payload, ready + timedelta(minutes=20)))
+    self.assertNotEqual(base, quote_cache.quote_cache_key('pickup', self.payload, ready))
+    self.assertNotEqual(base, quote_cache.quote_cache_key('drop_off', dict(self.payload, manifest_total_value=5000), ready))
+
+  def test_saved_quote_is_not_served_again(self):
+    first_customer = User.objects.create_user(email='quote-one@example.com', password=None, is_active=True)
+    second_customer = User.objects.create_user(email='quote-two@example.com', password=None, is_active=True)
+
+    # Two customers on the same route don't share a quote
+    first = uber_utils.create_dropoff_quote('cust', self.payload, user_id=first_customer.id)
+    other = uber_utils.create_dropoff_quote('cust', self.payload, user_id=second_customer.id)
+    self.assertNotEqual(first['id'], other['id'])
+
+    # Two confirmations in a row by the same customer: each gets a fresh quote
+    uber_utils.save_delivery_quote(user=first_customer, service_type='drop_off', serializer_data={}, uber_data=first)
+    again = uber_utils.create_dropoff_quote('cust', self.payload, user_id=first_customer.id)
+    self.assertNotEqual(again['id'], first['id'])
+    uber_utils.save_delivery_quote(user=first_customer, service_type='drop_off', serializer_data={}, uber_data=again)
+    self.assertEqual(self.calls, 3)
+
+  def test_quotes_near_expiry_are_not_served(self):
+    quote = self.fake_quote('cust', self.payload, {}, expires_in=timedelta(seconds=30))
+    self.assertEqual(quote_cache.quote_ttl(quote), 0)
+    key = quote_cache.quote_cache_key('drop_off', self.payload)
+    cache.set(key, quote)
+    self.assertIsNone(quote_cache.get_cached_quote(key))
+
+
+class UberSimulatorTests(SimpleTestCase):
+  def test_quote_delivery_and_status_webhooks(self):
+    events = []
+    with UberSimulator(webhook=events.append, status_interval=0.01) as simulator:
+      client = UberClient(base_url=simulator.base_url, auth_url=simulator.auth_url, sleep=lambda seconds: None)
+      self.assertEqual(client.fetch_token({}).status_code, 200)
+      quote = client.create_quote('cust', {'manifest_total_value': 100}, headers={})
+      response = client.create_delivery('cust', {'quote_id': quote['id']}, headers={})
+      delivery = response.json()
+      for _ in range(100):
+        if len(events) == len(DELIVERY_PROGRESSION):
+          break
+        time.sleep(0.02)
+      client.close()
+
+    self.assertEqual(delivery['quote_id'], quote['id'])
+    self.assertEqual([(event['status'], event['courier_imminent']) for event in events], list(DELIVERY_PROGRESSION))
+    self.assertTrue(all(event['delivery_id'] == delivery['id'] for event in events))
+
+  def test_injected_errors(self):
+    with UberSimulator(error_rate=1.0, error_statuses=(503,)) as simulator:
+      client = UberClient(base_url=simulator.base_url, auth_url=simulator.auth_url, sleep=lambda seconds: None)
+      response = client.create_delivery('cust', {'quote_id': 'dqt_missing'}, headers={})
+      client.close()
+    self.assertEqual(response.status_code, 503)
+    self.assertEqual(simulator.stats()['counts']['deliveries:injected_503'], 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+@override_settings(UBER_WEBHOOK_SIGNING_KEY=WEBHOOK_SIGNING_KEY)
+class WebhookInboxTests(TestCase):
+  def setUp(self):
+    cache.clear()
+    self.customer = User.objects.create_user(email='inbox-customer@example.com', password=None, is_active=True)
+    self.delivery = Delivery.objects.create(customer=self.customer, delivery_uid='del_inbox', status='pending')
+    store = LaundrymartStore.objects.create(laundrymart_name='Inbox Laundry', lat=40.7128, lng=-74.0060)
+    self.order = Order.objects.create(
+      user=self.customer, service_provider=store, status='card_saved', pickup_deivery=self.delivery
+    )
+
+  def post_event(self, status, delivery_id='del_inbox', imminent=False, updated_at=None, event_id=None,
+                 key=WEBHOOK_SIGNING_KEY):
+    body = json.dumps({
+      'id': event_id, 'event_type': 'event.delivery_status', 'delivery_id': delivery_id, 'status': status,
+      'courier_imminent': imminent, 'updated_at': updated_at,
+      'data': {'courier': {'name': 'Sam', 'phone_number': '+15555550100'}},
+    })
+    headers = {'HTTP_X_UBER_SIGNATURE': sign_webhook_body(body, key)} if key else {}
+    return self.client.post(reverse('uber-delivery-status-webhook'), data=body, content_type='application/json', **headers)
+
+  def test_webhook_only_appends_to_inbox(self):
+    response = self.post_event('pickup')
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(UberWebhookEvent.objects.filter(processed_at__isnull=True).count(), 1)
+    self.delivery.refresh_from_db()
+    self.assertEqual(self.delivery.status, 'pending')
+
+  def test_batch_coalesces_events_per_delivery(self):
+    for status in ('pickup', 'pickup_complete', 'dropoff', 'delivered'):
+      self.post_event(status)
+
+    self.assertEqual(webhook_inbox.process_batch(), 4)
+    self.delivery.refresh_from_db()
+    self.order.refresh_from_db()
+    self.assertEqual((self.delivery.status, self.delivery.courier_name), ('delivered', 'Sam'))
+    self.assertEqual(self.order.status, 'completed')
+    results = Counter(UberWebhookEvent.objects.values_list('result', flat=True))
+    self.assertEqual(results, {'applied': 1, 'coalesced': 3})
+
+  def test_unknown_delivery_is_retried_then_parked(self):
+    self.post_event('pickup', delivery_id='del_not_yet_saved')
+    for attempt in range(webhook_inbox.WEBHOOK_MAX_ATTEMPTS):
+      self.assertEqual(webhook_inbox.process_batch(), 1)
+      # Expire the retry delay so the next batch picks it up again
+      UberWebhookEvent.objects.update(lease_expires_at=timezone.now())
+
+    event = UberWebhookEvent.objects.get()
+    self.assertEqual((event.result, event.attempts), ('failed', webhook_inbox.WEBHOOK_MAX_ATTEMPTS))
+    self.assertEqual(webhook_inbox.process_batch(), 0)
+
+  def test_unsigned_or_forged_webhooks_are_rejected(self):
+    self.assertEqual(self.post_event('canceled', key=None).status_code, 401)
+    self.assertEqual(self.post_event('canceled', key='not_the_signing_key').status_code, 401)
+    with override_settings(UBER_WEBHOOK_SIGNING_KEY=None):
+      self.assertEqual(self.post_event('canceled').status_code, 401)
+    self.assertFalse(UberWebhookEvent.objects.exists())
+
+  def test_duplicate_event_id_is_dropped_at_the_webhook(self):
+    self.post_event('pickup', event_id='evt_1')
+    self.post_event('pickup', event_id='evt_1')
+    self.assertEqual(UberWebhookEvent.objects.count(), 1)
+
+  def test_completed_order_reaches_incremental_vendor_analytics(self):
+    call_command('aggregate_vendor_analytics', stdout=io.StringIO())
+    # Earlier activity: the order's last write and the last rollup run both happened a while ago
+    Order.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+    VendorRevenueRollup.objects.update(refreshed_at=timezone.now() - timedelta(minutes=30))
+
+    for status in ('pickup', 'pickup_complete', 'dropoff', 'delivered'):
+      self.post_event(status)
+    webhook_inbox.process_batch()
+    call_command('aggregate_vendor_analytics', stdout=io.StringIO())
+
+    rollup = VendorRevenueRollup.objects.get(laundrymart=self.order.service_provider, period='day')
+    self.assertEqual(rollup.order_count, 1)
+
+  def test_late_event_does_not_rewind_delivery(self):
+    self.post_event('delivered', updated_at='2026-01-01T10:30:00Z')
+    webhook_inbox.process_batch()
+
+    # Arrives after delivered, but happened before it
+    self.post_event('pickup', updated_at='2026-01-01T10:05:00Z')
+    with mock.patch.object(webhook_inbox, 'apply_delivery_status') as apply:
+      webhook_inbox.process_batch()
+    apply.assert_not_called()
+
+    self.delivery.refresh_from_db()
+    self.assertEqual(self.delivery.status, 'delivered')
+    self.assertEqual(UberWebhookEvent.objects.latest('id').result, 'stale')
+
+  def test_row_backstop_when_sequence_cache_is_cold(self):
+    self.post_event('dropoff', updated_at='2026-01-01T10:20:00Z')
+    webhook_inbox.process_batch()
+    cache.clear()
+
+    self.post_event('pickup', updated_at='2026-01-01T10:05:00Z')
+    webhook_inbox.process_batch()
+    self.delivery.refresh_from_db()
+    self.assertEqual(self.delivery.status, 'dropoff')
+    self.assertEqual(UberWebhookEvent.objects.latest('id').result, 'stale')
+
+  def test_same_timestamp_orders_by_status_rank(self):
+    self.post_event('pickup_complete', updated_at='2026-01-01T10:10:00Z')
+    self.post_event('pickup', imminent=True, updated_at='2026-01-01T10:10:00Z')
+    webhook_inbox.process_batch()
+    self.delivery.refresh_from_db()
+    self.assertEqual(self.delivery.status, 'pickup_complete')
+
+  def test_rows_claimed_by_another_worker_are_not_claimed_again(self):
+    for status in ('pickup', 'dropoff'):
+      self.post_event(status)
+    # Both workers ran the candidate SELECT before either UPDATE (sqlite takes no row locks)
+    seen = list(UberWebhookEvent.objects.values_list('id', flat=True))
+    first = webhook_inbox.claim_batch()
+
+    class SameCandidates:
+      def filter(self, *args, **kwargs):
+        return self
+      order_by = values_list = filter
+
+      def __getitem__(self, item):
+        return seen
+
+    with mock.patch.object(UberWebhookEvent.objects, 'select_for_update', return_value=SameCandidates()):
+      second = webhook_inbox.claim_batch()
+    self.assertEqual(len(first), 2)
+    self.assertEqual(second, [])
+    self.assertEqual(set(UberWebhookEvent.objects.values_list('attempts', flat=True)), {1})
+
+  def test_concurrent_newer_write_is_not_overwritten(self):
+    # This worker read the row before another one applied a newer status
+    before = Delivery.objects.get(pk=self.delivery.pk)
+    webhook_inbox.apply_delivery_status({
+      'delivery_id': 'del_inbox', 'status': 'dropoff', 'updated_at': '2026-01-01T10:20:00Z',
+    })
+
+    with mock.patch.object(Delivery.objects, 'select_for_update', return_value=mock.Mock(get=lambda **kwargs: before)):
+      with self.assertRaises(webhook_inbox.StaleEvent):
+        webhook_inbox.apply_delivery_status({
+          'delivery_id': 'del_inbox', 'status': 'pickup', 'updated_at': '2026-01-01T10:05:00Z',
+        })
+    self.delivery.refresh_from_db()
+    self.assertEqual(self.delivery.status, 'dropoff')
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import UberMetricsAPIView, uber_delivery_status_webhook
+
+urlpatterns = [
+  path('metrics', UberMetricsAPIView.as_view(), name='uber-metrics'),
+  path('webhook/delivery-status', uber_delivery_status_webhook, name='uber-delivery-status-webhook'),
+]
@@ -1,38 +1,34 @@
-import requests
-
 from laundrymart.settings import UBER_CUSTOMER_ID
-from uber.cache_access_token import UBER_BASE_URL, uber_headers
+from uber.cache_access_token import uber_headers
+from uber.client import get_uber_client
 from uber.models import Delivery, DeliveryQuote, ManifestItem
+from uber.quote_cache import evict_quote, get_cached_quote, quote_cache_key, set_cached_quote
 
 
-def create_dropoff_quote(customer_id, payload):
-  resp = requests.post(
-    f"{UBER_BASE_URL}/customers/{customer_id}/delivery_quotes",
-    headers=uber_headers(),
-    json=payload,
-    timeout=10
-  )
-  resp.raise_for_status()
-  return resp.json()
+def create_cached_quote(customer_id, service_type, payload, ready_dt=None, user_id=None):
+  key = quote_cache_key(service_type, payload, ready_dt, user_id)
+  quote = get_cached_quote(key)
+  if quote:
+    return quote
+  quote = get_uber_client().create_quote(customer_id, payload, uber_headers())
+  set_cached_quote(key, quote)
+  return quote
 
 
-def create_pickup_quote(customer_id, payload):
-  resp = requests.post(
-    f"{UBER_BASE_URL}/customers/{customer_id}/delivery_quotes",
-    headers=uber_headers(),
-    json=payload,
-    timeout=10
-  )
-  resp.raise_for_status()
-  return resp.json()
+def create_dropoff_quote(customer_id, payload, user_id=None):
+  return create_cached_quote(customer_id, 'drop_off', payload, user_id=user_id)
+
 
+def create_pickup_quote(customer_id, payload, user_id=None):
+  return create_cached_quote(customer_id, 'pickup', payload, user_id=user_id)
 
-def create_full_service_quotes(customer_id, payload_to_vendor, payload_to_customer):
+
+def create_full_service_quotes(customer_id, payload_to_vendor, payload_to_customer, user_id=None):
   # First quote: customer -> vendor
-  quote1 = create_dropoff_quote(customer_id, payload_to_vendor)
+  quote1 = create_dropoff_quote(customer_id, payload_to_vendor, user_id)
 
   # Second quote: vendor -> customer
-  quote2 = create_pickup_quote(customer_id, payload_to_customer)
+  quote2 = create_pickup_quote(customer_id, payload_to_customer, user_id)
 
   # Combine fees
   combined_fee = quote1["fee"] + quote2["fee"]
@@ -45,6 +41,8 @@ def create_full_service_quotes(customer_id, payload_to_vendor, payload_to_custom
 
 
 def save_delivery_quote(*, user, service_type, serializer_data, uber_data):
+  # The quote is spoken for now; don't hand it to the next request
+  evict_quote(uber_data["id"])
   return DeliveryQuote.objects.create(
     service_type=service_type,
     quote_id=uber_data["id"],
@@ -75,12 +73,7 @@ def create_uber_delivery( payload, headers):
     Low-level call to Uber Direct /deliveries endpoint.
     Returns the parsed JSON response.
     """
-    resp = requests.post(
-      f"{UBER_BASE_URL}/customers/{UBER_CUSTOMER_ID}/deliveries",
-      headers=headers,
-      json=payload,
-      timeout=15,
-    )
+    resp = get_uber_client().create_delivery(UBER_CUSTOMER_ID, payload, headers)
     resp.raise_for_status()
     return resp.json()
 
@@ -96,11 +89,16 @@ def create_and_save_delivery(
   Creates Uber delivery and saves it + manifest items to DB.
   Reusable for both pickup and full_service legs.
   """
-  customer_id = UBER_CUSTOMER_ID
   headers = uber_headers()  # your existing function
 
   uber_data = create_uber_delivery(payload, headers)
+  return save_uber_delivery(
+    user=user, validated_data=validated_data, payload=payload, uber_data=uber_data, is_return_leg=is_return_leg
+  )
+
 
+def save_uber_delivery(*, user, validated_data, payload, uber_data, is_return_leg=False):
+  """Saves an Uber /deliveries response + manifest items (the DB half of create_and_save_delivery)."""
   # Determine which lat/lng to use for dropoff (important for return leg)
   dropoff_lat = (
     validated_data["pickup_latitude"]
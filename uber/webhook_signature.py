@@ -0,0 +1,25 @@
+import hashlib
+import hmac
+
+from django.conf import settings
+
+# Uber Direct signs the raw webhook body with HMAC-SHA256 (hex) using the webhook signing key
+WEBHOOK_SIGNATURE_HEADER = 'X-Uber-Signature'
+
+
+def sign_webhook_body(body, key):
+  if isinstance(body, str):
+    body = body.encode()
+  return hmac.new(key.encode(), body, hashlib.sha256).hexdigest()
+
+
+def valid_webhook_signature(body, signature, key=None):
+  """
+  True when `signature` is the HMAC of the raw body under the signing key
+  (settings.UBER_WEBHOOK_SIGNING_KEY by default). Without a configured key
+  nothing verifies, so an unconfigured deployment accepts no webhooks.
+  """
+  key = key or settings.UBER_WEBHOOK_SIGNING_KEY
+  if not key or not signature:
+    return False
+  return hmac.compare_digest(sign_webhook_body(body, key), signature.strip().lower())